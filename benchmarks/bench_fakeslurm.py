@@ -0,0 +1,148 @@
+"""End-to-end throughput of the SLURM code paths, run against the fake SLURM.
+
+Measures, for each size:
+
+- submission latency of one ``SLURMCluster.schedule`` array submission,
+- worker claim contention: wall time for ``WORKERS`` multi-task workers to
+  claim and run every task of a run through ``run_worker``,
+- status poll cost: one ``sacct`` per job versus the batched status service.
+
+Usage: python benchmarks/bench_fakeslurm.py [SIZE ...]
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import ClassVar
+
+from easysubmit import SLURMCluster, SLURMConfig, Task, TaskConfig
+from easysubmit.base import schedule
+from easysubmit.fakeslurm import install
+from easysubmit.slurm import SLURMJob, SLURMStatusService
+
+SIZES = [10, 1_000, 50_000]
+WORKERS = 8
+# per-job polling forks one sacct per job, so only a sample is timed
+POLL_SAMPLE = 50
+
+
+class BenchConfig(TaskConfig):
+    name: ClassVar[str] = "BenchConfig"
+    index: int = 0
+
+
+class BenchTask(Task):
+    config: BenchConfig
+
+    def run(self):
+        pass
+
+
+def get_cluster() -> SLURMCluster:
+    config = SLURMConfig(
+        job_name="bench",
+        output="{BASE_DIR}/slurm-%A_%a.out",
+        modules=[],
+        venv=sys.prefix,
+    )
+    return SLURMCluster(config, status_ttl=0.5)
+
+
+def hold(script: str) -> str:
+    # keep the submitted elements pending so only submission is measured
+    return script.replace("#!/bin/sh", "#!/bin/sh\n#SBATCH --hold", 1)
+
+
+def wait(job: SLURMJob, interval: float = 0.5) -> str:
+    while True:
+        status = job.get_status()
+        if status not in {"PENDING", "RUNNING", "UNKNOWN"}:
+            return status
+        time.sleep(interval)
+
+
+def bench_submission(cluster: SLURMCluster, size: int) -> float:
+    start = time.perf_counter()
+    job = cluster.schedule(["true"], hold, array=list(range(size)))
+    elapsed = time.perf_counter() - start
+    job.cancel()
+    return elapsed
+
+
+def bench_claims(cluster: SLURMCluster, base_dir: Path, size: int) -> float:
+    configs = ({"name": "BenchConfig", "index": i} for i in range(size))
+    os.environ["BENCH_BASE_DIR"] = str(base_dir)
+    start = time.perf_counter()
+    job = schedule(
+        cluster,
+        list(configs),
+        base_dir=base_dir,
+        max_task_count=size,
+        worker_count=WORKERS,
+    )
+    wait(job)
+    return time.perf_counter() - start
+
+
+def bench_status(cluster: SLURMCluster, size: int) -> tuple[float, float]:
+    job = cluster.schedule(["true"], hold, array=list(range(size)))
+    job_ids = [f"{job.id}_{i}" for i in range(size)]
+    # one sacct call per job, as SLURMJob.get_status used to do
+    sample = job_ids[:POLL_SAMPLE]
+    timings = []
+    for job_id in sample:
+        start = time.perf_counter()
+        SLURMJob(job_id, SLURMStatusService(ttl=0)).get_status()
+        timings.append(time.perf_counter() - start)
+    per_job = statistics.mean(timings) * size
+    # every job answered from one shared snapshot
+    service = SLURMStatusService(ttl=60)
+    start = time.perf_counter()
+    service.watch(*job_ids)
+    for job_id in job_ids:
+        SLURMJob(job_id, service).get_status()
+    batched = time.perf_counter() - start
+    job.cancel()
+    return per_job, batched
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    # schedule() parses the command line of the driver script
+    del sys.argv[1:]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        install(tmp / "bin", tmp / "state")
+        os.environ["PATH"] = f"{tmp / 'bin'}{os.pathsep}{os.environ['PATH']}"
+        os.environ["FAKESLURM_STATE"] = str(tmp / "state")
+        # measure single submissions, not chunking against the site limit
+        os.environ["FAKESLURM_MAX_ARRAY_SIZE"] = str(max(sizes) + 1)
+        cluster = get_cluster()
+        print(
+            f"{'tasks':>8}  {'submit (s)':>10}  {'claim+run (s)':>13}  "
+            f"{'tasks/s':>9}  {'poll per job (s)':>16}  {'poll batched (s)':>16}"
+        )
+        for size in sizes:
+            submit = bench_submission(cluster, size)
+            claims = bench_claims(cluster, tmp / f"base-{size}", size)
+            per_job, batched = bench_status(cluster, size)
+            print(
+                f"{size:>8}  {submit:>10.3f}  {claims:>13.3f}  "
+                f"{size / claims:>9.1f}  {per_job:>16.3f}  {batched:>16.3f}"
+            )
+
+
+def worker():
+    schedule(get_cluster(), [], base_dir=os.environ["BENCH_BASE_DIR"])
+
+
+if __name__ == "__main__":
+    if "--worker" in sys.argv:
+        worker()
+    else:
+        main()
@@ -0,0 +1,67 @@
+"""Cost of config fingerprints for large nested configs.
+
+Usage: python benchmarks/bench_fingerprint.py [WIDTH ...]
+"""
+
+from __future__ import annotations
+
+import sys
+import timeit
+from typing import Any, ClassVar
+
+from easysubmit import TaskConfig
+from easysubmit.helpers import get_fingerprint
+
+WIDTHS = [10, 100, 1_000]
+NUMBER = 200
+
+
+class BenchConfig(TaskConfig):
+    name: ClassVar[str] = "BenchConfig"
+    params: dict[str, Any] | None = None
+    layers: list[int] | None = None
+
+
+def nested(width: int) -> dict[str, Any]:
+    return {
+        f"group_{i}": {
+            "lr": 0.001 * i,
+            "tags": [f"tag-{j}" for j in range(10)],
+            "schedule": {"warmup": i, "decay": [0.9, 0.99, 0.999]},
+        }
+        for i in range(width)
+    }
+
+
+def per_call(stmt, number: int = NUMBER) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    widths = [int(arg) for arg in sys.argv[1:]] or WIDTHS
+    print(
+        f"{'width':>6}  {'get_fingerprint (us)':>20}  "
+        f"{'first access (us)':>17}  {'cached access (us)':>18}  {'hash (us)':>9}"
+    )
+    for width in widths:
+        params = nested(width)
+        data = {"name": "BenchConfig", "params": params, "layers": list(range(width))}
+        raw = per_call(lambda: get_fingerprint(data))
+        config = BenchConfig(params=params, layers=list(range(width)))
+
+        def first_access():
+            config.__dict__.pop("_fingerprint", None)
+            return config.fingerprint
+
+        first = per_call(first_access)
+        # the fingerprint is only kept while no field can change in place
+        frozen = BenchConfig(layers=tuple(range(width)))
+        cached = per_call(lambda: frozen.fingerprint, number=100_000)
+        hashed = per_call(lambda: hash(frozen), number=100_000)
+        print(
+            f"{width:>6}  {raw:>20.1f}  {first:>17.1f}  {cached:>18.3f}  {hashed:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Startup time of a worker: the submitting script versus easysubmit.worker.
+
+Both run one task of a run with the local cluster environment, in a fresh
+interpreter. The script imports DRIVER_IMPORTS (or the modules given on the
+command line, e.g., numpy pandas) like a typical driver script would, then
+calls ``schedule``, which runs the worker; ``python -m easysubmit.worker``
+only imports the module defining the task.
+
+Usage: python benchmarks/bench_worker_import.py [MODULE ...]
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from easysubmit.store import FileTaskStore
+
+REPEAT = 10
+
+# stand-in for the imports of a driver script that workers do not need
+DRIVER_IMPORTS = [
+    "asyncio",
+    "csv",
+    "decimal",
+    "email.mime.multipart",
+    "http.client",
+    "logging.handlers",
+    "sqlite3",
+    "xml.etree.ElementTree",
+]
+
+TASKS_MODULE = """\
+from typing import ClassVar
+
+from easysubmit import Task, TaskConfig
+
+
+class BenchConfig(TaskConfig):
+    name: ClassVar[str] = "BenchConfig"
+    index: int = 0
+
+
+class BenchTask(Task):
+    config: BenchConfig
+
+    def run(self):
+        pass
+"""
+
+DRIVER = """\
+{imports}
+from easysubmit import LocalCluster
+from easysubmit.base import schedule
+
+import bench_tasks
+
+schedule(LocalCluster(), [], base_dir={base_dir!r})
+"""
+
+
+def setup(tmp: Path, modules: list[str]) -> tuple[FileTaskStore, str]:
+    (tmp / "bench_tasks.py").write_text(TASKS_MODULE, encoding="utf-8")
+    imports = "\n".join(f"import {module}" for module in modules)
+    driver = DRIVER.format(imports=imports, base_dir=str(tmp / "base"))
+    (tmp / "driver.py").write_text(driver, encoding="utf-8")
+    (tmp / "base").mkdir()
+    store = FileTaskStore(tmp / "base")
+    fingerprint = "bench-task"
+    store.add_task(fingerprint, {"name": "BenchConfig", "index": 0})
+    manifest = {
+        "run_id": "bench",
+        "tasks": [fingerprint],
+        "imports": {"modules": ["bench_tasks"], "path": str(tmp)},
+    }
+    store.add_manifest("bench", manifest)
+    return store, fingerprint
+
+
+def bench(command: list[str], cwd: Path, store: FileTaskStore, fp: str) -> float:
+    env = {
+        **os.environ,
+        "EASYSUBMIT_JOB_ID": "1",
+        "EASYSUBMIT_ARRAY_JOB_ID": "1",
+        "EASYSUBMIT_ARRAY_TASK_ID": "0",
+    }
+    timings = []
+    for _ in range(REPEAT):
+        # queued again, so that every worker claims and runs it
+        store.release(fp)
+        store.set_state(fp, "queued")
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, env=env, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    modules = sys.argv[1:] or DRIVER_IMPORTS
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store, fingerprint = setup(tmp, modules)
+        base_dir = str(tmp / "base")
+        commands = {
+            # interpreter startup alone, for reference
+            "python -c pass": [sys.executable, "-c", "pass"],
+            "driver script": [
+                sys.executable,
+                "driver.py",
+                "--worker",
+                "--run-id=bench",
+            ],
+            "easysubmit.worker": [
+                sys.executable,
+                "-m",
+                "easysubmit.worker",
+                base_dir,
+                "--cluster=local",
+                "--run-id=bench",
+            ],
+        }
+        print(f"driver imports: {', '.join(modules)}")
+        print(f"{'command':>18}  {'median startup (ms)':>20}")
+        for name, command in commands.items():
+            median = bench(command, tmp, store, fingerprint)
+            print(f"{name:>18}  {median * 1e3:>20.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Worker startup time as the number of task files in base_dir grows.
+
+Usage: python benchmarks/bench_worker_startup.py [SIZE ...]
+"""
+
+from __future__ import annotations
+
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import ClassVar
+
+from easysubmit import Cluster, Job, Task, TaskConfig
+from easysubmit.base import run_worker
+
+SIZES = [100, 1_000, 10_000, 100_000]
+RUN_SIZE = 20
+REPEAT = 20
+
+
+class BenchConfig(TaskConfig):
+    name: ClassVar[str] = "BenchConfig"
+    index: int = 0
+
+
+class BenchTask(Task):
+    config: BenchConfig
+
+    def run(self):
+        pass
+
+
+class BenchCluster(Cluster):
+    def __init__(self, index: int):
+        self.index = index
+
+    def get_job(self, job_id: str | None = None) -> Job:
+        return Job("1")
+
+    def get_array_task_id(self) -> int | None:
+        return self.index
+
+
+def populate(base_dir: Path, size: int) -> list[str]:
+    fingerprints = []
+    for i in range(size):
+        config = BenchConfig(index=i)
+        path = base_dir / f"{config.fingerprint}-task.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(config.to_dict(), f)
+        fingerprints.append(config.fingerprint)
+    return fingerprints
+
+
+def bench(size: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        base_dir = Path(tmp)
+        fingerprints = populate(base_dir, size)
+        # the run being worked on is the most recent batch of tasks
+        tasks = fingerprints[-RUN_SIZE:]
+        with open(base_dir / "manifest-bench.json", "w", encoding="utf-8") as f:
+            json.dump({"run_id": "bench", "tasks": tasks}, f)
+        timings = []
+        for i in range(REPEAT):
+            index = i % len(tasks)
+            claim = base_dir / f"{tasks[index]}-worker.txt"
+            claim.unlink(missing_ok=True)
+            start = time.perf_counter()
+            run_worker(BenchCluster(index), base_dir, "bench")
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"{'tasks in base_dir':>18}  {'median startup (ms)':>20}")
+    for size in sizes:
+        print(f"{size:>18}  {bench(size) * 1e3:>20.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-from easysubmit.entities import Cluster, Job, Task, TaskConfig, AutoTask
+from easysubmit.entities import AutoTask, Cluster, Job, JobGroup, Task, TaskConfig
+from easysubmit.local import LocalCluster
 from easysubmit.slurm import SLURMCluster, SLURMConfig
 
 __version__ = "0.2.4"
@@ -8,7 +9,9 @@ __all__ = [
     "TaskConfig",
     "AutoTask",
     "Job",
+    "JobGroup",
     "Cluster",
     "SLURMCluster",
     "SLURMConfig",
+    "LocalCluster",
 ]
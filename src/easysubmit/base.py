@@ -2,24 +2,78 @@ from __future__ import annotations
 
 import argparse
 import functools
+import importlib
+import itertools
 import json
+import math
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+import traceback
 import uuid
-from collections.abc import Sequence
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from contextlib import ExitStack
 from pathlib import Path
+from typing import Any, NoReturn
 
 import __main__
-from easysubmit.entities import AutoTask, Cluster, TaskConfig
-from easysubmit.helpers import get_fingerprint
+from easysubmit.cache import ResultCache, get_result_cache
+from easysubmit.checkpoint import (
+    PREEMPTION_SIGNAL_ENV,
+    Preempted,
+    deferred_preemption,
+    delete_checkpoint,
+    get_checkpoint_path,
+    get_preemption_signals,
+    load_checkpoint,
+    preemptible,
+    save_checkpoint,
+    supports_checkpoint,
+)
+from easysubmit.entities import AutoTask, Cluster, Job, JobGroup, Task, TaskConfig
+from easysubmit.heartbeat import (
+    DEFAULT_MAX_RETRIES,
+    Heartbeat,
+    get_lost_tasks,
+    recover_lost_tasks,
+)
+from easysubmit.helpers import capture, get_fingerprint
+from easysubmit.inputs import default_input_cache
 from easysubmit.profiler import (
-    enable_profiling,
-    is_profiler_avilable,
+    PROFILER_BACKENDS,
     SCALENE_DEPENDENCY_MISSING_ERROR,
+    ScaleneProfiler,
+    TaskProfiler,
+    get_profile_dir,
+    get_task_profiler,
+    is_profiler_avilable,
 )
+from easysubmit.store import TaskStore, get_task_store
+from easysubmit.timing import (
+    SUBMIT_FILE,
+    TimingLog,
+    get_job_exec_time,
+    get_job_start_time,
+    get_timing_dir,
+)
+from easysubmit.usage import collect_usage, suggest_resources
+
+# times a preempted job is requeued, after that the preemption signal stops the
+# worker like any other and `schedule` retries its tasks as lost ones
+MAX_REQUEUES = 3
+
+# exit status of a forked task (or job step) stopped by the preemption signal
+PREEMPTED_EXIT_CODE = 75
 
 
 class AppArgs:
     worker: bool
     run_id: str | None
+    task: str | None
     profile: bool
 
 
@@ -36,6 +90,12 @@ def _parse_args() -> AppArgs:
         help="run id",
         default=None,
     )
+    parser.add_argument(
+        "--task",
+        type=str,
+        help="run a task claimed by the worker, as a job step",
+        default=None,
+    )
     # add profilers
     parser.add_argument(
         "--profile",
@@ -64,56 +124,468 @@ def _validate_profilers(profilers: bool | str | Sequence[str]) -> Sequence[str]
 
 def schedule(
     cluster: Cluster,
-    configs: Sequence[TaskConfig | dict],
+    configs: Iterable[TaskConfig | dict],
     base_dir: Path | str | None = None,
-    max_task_count: int = 20,
+    max_task_count: int | None = None,
     profilers: bool | Sequence[str] | None = None,
-) -> None:
+    worker_count: int | None = None,
+    parallel: int | bool = False,
+    sweep: str | None = None,
+    store: TaskStore | str | None = None,
+    autosize: bool = False,
+    cache: ResultCache | str | bool | None = None,
+    retries: int = DEFAULT_MAX_RETRIES,
+    profiler: str = "scalene",
+    fork: bool | Sequence[str] = False,
+    steps: bool = False,
+) -> Job | None:
     profilers = _validate_profilers(profilers)
 
+    if fork and worker_count is None and not parallel:
+        msg = "fork needs multi-task workers, set worker_count or parallel"
+        raise ValueError(msg)
+
+    if steps and fork:
+        msg = "steps and fork cannot be used together"
+        raise ValueError(msg)
+
+    if steps and worker_count is None:
+        # a single allocation, whose worker runs the tasks on all its nodes
+        worker_count = 1
+
+    if profiler not in PROFILER_BACKENDS:
+        msg = f"unknown profiler: {profiler}, expected one of {PROFILER_BACKENDS}"
+        raise ValueError(msg)
+
     base_dir = Path(base_dir) if base_dir else Path.cwd() / "easysubmit"
 
     base_dir.mkdir(parents=True, exist_ok=True)
 
+    # workers started with `python -m easysubmit.worker` open these again
+    store_spec, cache_spec = store, cache
+
+    store = get_task_store(base_dir, store)
+
+    cache = get_result_cache(base_dir, cache)
+
     args = _parse_args()
 
-    if args.worker:
-        run_worker(cluster, base_dir, args.run_id, args.profile)
+    if args.worker and args.task:
+        # started by the worker of the run, see `run_step`
+        run_step(cluster, base_dir, args.run_id, args.task, store=store, cache=cache)
+    elif args.worker:
+        run_worker(
+            cluster, base_dir, args.run_id, args.profile, store=store, cache=cache
+        )
         return
 
-    tasks = [AutoTask(config) for config in configs]
+    if cache is not None:
+        cache.evict()
 
-    # write the configs to a json files
-    task_fingerprints = []
+    # configs are consumed lazily, only as far as needed to fill this batch
+    offset = store.get_value(f"sweep-{sweep}", {}).get("offset", 0) if sweep else 0
 
-    for task in tasks:
-        if len(task_fingerprints) >= max_task_count:
-            break
-        task_config_path = base_dir / f"{task.config.fingerprint}-task.json"
-        try:
-            with open(task_config_path, "x", encoding="utf-8") as f:
-                json.dump(task.config.to_dict(), f, indent=4)
-        except FileExistsError:
-            continue
-        job_path = base_dir / f"{task.config.fingerprint}-worker.txt"
-        if job_path.exists():
-            continue  # job already exists
-        task_fingerprints.append(task.config.fingerprint)
+    configs = itertools.islice(configs, offset, None)
+
+    # mem/time suggested by the usage of earlier tasks of each config class
+    suggestions: dict[str, dict[str, str]] = {}
+
+    if autosize:
+        collect_usage(cluster, store)
+
+    # tasks of this batch in dependency order, each after the tasks it needs
+    tasks: dict[str, TaskConfig] = {}
+    # fingerprints of the dependencies of each task of this batch
+    requires: dict[str, list[str]] = {}
 
-    task_count = min(len(task_fingerprints), max_task_count)
+    def add(config: TaskConfig, dependents: tuple[str, ...] = ()) -> None:
+        fingerprint = config.fingerprint
+        if fingerprint in dependents:
+            msg = f"dependency cycle through task {fingerprint}"
+            raise ValueError(msg)
+        if fingerprint in tasks:
+            return
+        if not store.add_task(fingerprint, config.to_dict()):
+            if backoff.get(fingerprint, now) > now:
+                return
+            if fingerprint not in recovered and not _should_requeue(
+                store, cache, fingerprint
+            ):
+                return
+            _requeue_task(store, fingerprint)
+        dependencies = [
+            _get_dependency(store, dependency)
+            for dependency in config.get_dependencies()
+        ]
+        # dependencies that are not done yet run in this batch too
+        for dependency in dependencies:
+            add(dependency, (*dependents, fingerprint))
+        requires[fingerprint] = [dependency.fingerprint for dependency in dependencies]
+        tasks[fingerprint] = config
+
+    # tasks whose worker died (node failure, time limit, ...) go first
+    lost = recover_lost_tasks(
+        cluster, store, max_retries=retries, max_count=max_task_count or None
+    )
+
+    # queued again by `recover_lost_tasks`, but not submitted yet
+    recovered = set(lost)
+
+    # lost tasks that are waiting for their next retry
+    backoff = {
+        fingerprint: entry["retry_at"]
+        for fingerprint, entry in get_lost_tasks(store).items()
+        if entry["retry_at"] is not None
+    }
+
+    now = time.time()
+
+    with store.batch():
+        for fingerprint in lost:
+            add(TaskConfig.from_dict(store.get_task(fingerprint)))
 
-    if task_count == 0:
+        for config in configs:
+            if max_task_count and len(tasks) >= max_task_count:
+                break
+            offset += 1
+            add(AutoTask(config).config)
+
+    if not tasks:
         msg = "no tasks to run"
         raise RuntimeError(msg)
 
+    def get_resources(config: TaskConfig) -> dict[str, Any]:
+        resources = config.get_resources()
+        if autosize:
+            suggested = _suggest_resources(store, config.name, suggestions)
+            if worker_count is not None or parallel:
+                # workers run many tasks each, so keep the time limit
+                suggested = {k: v for k, v in suggested.items() if k != "time"}
+            # resources declared by the task take precedence
+            resources = {**suggested, **resources}
+        return resources
+
+    resources = {fp: get_resources(config) for fp, config in tasks.items()}
+
+    command, imports = _get_worker_command(
+        cluster, base_dir, store_spec, cache_spec, tasks.values()
+    )
+
+    # a single-task worker runs a whole chain of tasks, if they need the same
+    # resources, rather than waiting in the queue for each of them
+    if worker_count is None and not parallel:
+        units = _pack_chains(list(tasks), requires, resources)
+    else:
+        units = [[fingerprint] for fingerprint in tasks]
+
+    # one right-sized array per resource profile and level of the dependency
+    # graph, so small tasks are not held back by the requests of the largest
+    # ones and each level starts as soon as the tasks it needs are done
+    jobs = _submit_graph(
+        cluster,
+        store,
+        base_dir,
+        units,
+        requires,
+        resources,
+        profilers,
+        profiler,
+        worker_count,
+        parallel,
+        command,
+        imports,
+        fork,
+        steps,
+    )
+
+    if sweep:
+        # the next call with the same sweep continues after this batch
+        store.set_value(f"sweep-{sweep}", {"sweep": sweep, "offset": offset})
+
+    return jobs[0] if len(jobs) == 1 else JobGroup(jobs)
+
+
+def _should_requeue(
+    store: TaskStore, cache: ResultCache | None, fingerprint: str
+) -> bool:
+    # whether a task that is already in the store has to run again; tasks
+    # that are queued or running are left to the workers they were submitted
+    # to (lost ones are queued again by `recover_lost_tasks`)
+    state = store.get_state(fingerprint)
+    if state == "completed":
+        # with a cache, completed means there is a (not yet evicted) result
+        return cache is not None and not cache.has_result(fingerprint)
+    return state == "failed"
+
+
+def _suggest_resources(
+    store: TaskStore, name: str, suggestions: dict[str, dict[str, str]]
+) -> dict[str, str]:
+    if name not in suggestions:
+        suggestions[name] = suggest_resources(store, name)
+    return suggestions[name]
+
+
+def _get_dependency(store: TaskStore, dependency: TaskConfig | str) -> TaskConfig:
+    if isinstance(dependency, TaskConfig):
+        return dependency
+    try:
+        return TaskConfig.from_dict(store.get_task(dependency))
+    except KeyError:
+        msg = f"unknown dependency: {dependency}"
+        raise ValueError(msg) from None
+
+
+def _pack_chains(
+    fingerprints: list[str],
+    requires: dict[str, list[str]],
+    resources: dict[str, dict[str, Any]],
+) -> list[list[str]]:
+    # tasks that need only the previous one, which no other task needs, are
+    # run by the same worker; not if they declare a time limit, since the
+    # worker would need the sum of them
+    dependents: dict[str, list[str]] = {}
+    for fingerprint in fingerprints:
+        for dependency in requires[fingerprint]:
+            dependents.setdefault(dependency, []).append(fingerprint)
+    units: list[list[str]] = []
+    unit_of: dict[str, list[str]] = {}
+    for fingerprint in fingerprints:
+        dependencies = requires[fingerprint]
+        previous = dependencies[0] if len(dependencies) == 1 else None
+        if (
+            previous in unit_of
+            and dependents[previous] == [fingerprint]
+            and resources[previous] == resources[fingerprint]
+            and "time" not in resources[fingerprint]
+        ):
+            unit = unit_of[previous]
+            unit.append(fingerprint)
+        else:
+            unit = [fingerprint]
+            units.append(unit)
+        unit_of[fingerprint] = unit
+    return units
+
+
+def _get_worker_command(
+    cluster: Cluster,
+    base_dir: Path,
+    store: TaskStore | str | None,
+    cache: ResultCache | str | bool | None,
+    configs: Iterable[TaskConfig],
+) -> tuple[list[str], dict[str, Any] | None]:
+    # the command starting a worker (without the run id) and the modules it
+    # imports to find the task classes; workers only import those modules
+    # unless the cluster, store, cache or task classes can only be rebuilt
+    # by running this script again
+    script = ["python", __main__.__file__, "--worker"]
+    cluster_args = cluster.get_worker_args()
+    if cluster_args is None or isinstance(store, TaskStore):
+        return script, None
+    if isinstance(cache, ResultCache):
+        return script, None
+    modules = set()
+    for config_class in {type(config) for config in configs}:
+        task_class = AutoTask.dispatch.get(config_class, Task)
+        modules.update((config_class.__module__, task_class.__module__))
+    if "__main__" in modules or Task.__module__ in modules:
+        # defined in this script, or without a task class
+        return script, None
+    command = ["python", "-m", "easysubmit.worker", str(base_dir), *cluster_args]
+    if store is not None:
+        command.append(f"--store={store}")
+    if cache is True:
+        command.append("--cache")
+    elif cache:
+        command.append(f"--cache={cache}")
+    # modules next to this script are found from its directory, as here
+    main_file = getattr(__main__, "__file__", None)
+    path = str(Path(main_file).absolute().parent) if main_file else None
+    return command, {"modules": sorted(modules), "path": path}
+
+
+def import_task_modules(imports: dict[str, Any] | None) -> None:
+    # register the task classes of a run, see `_get_worker_command`
+    if imports is None:
+        return
+    if imports["path"] is not None and imports["path"] not in sys.path:
+        sys.path.insert(0, imports["path"])
+    for module in imports["modules"]:
+        importlib.import_module(module)
+
+
+def _submit_graph(
+    cluster: Cluster,
+    store: TaskStore,
+    base_dir: Path,
+    units: list[list[str]],
+    requires: dict[str, list[str]],
+    resources: dict[str, dict[str, Any]],
+    profilers: Sequence[str] | None,
+    profiler: str,
+    worker_count: int | None,
+    parallel: int | bool,
+    command: list[str],
+    imports: dict[str, Any] | None = None,
+    fork: bool | Sequence[str] = False,
+    steps: bool = False,
+) -> list[Job]:
+    # units are tasks run one after the other by the same worker, in
+    # dependency order; only the first task of a unit has dependencies
+    # outside of it
+    unit_of = {fp: i for i, unit in enumerate(units) for fp in unit}
+    # units each unit needs, jobs still running tasks it needs and its level
+    needs: list[list[int]] = []
+    waits: list[list[str]] = []
+    levels: list[int] = []
+    for unit in units:
+        needs.append(sorted({unit_of[fp] for fp in requires[unit[0]] if fp in unit_of}))
+        waits.append([])
+        for fingerprint in requires[unit[0]]:
+            if fingerprint in unit_of or store.get_state(fingerprint) != "running":
+                continue
+            job_id = store.get_claim(fingerprint)
+            if job_id is not None:
+                waits[-1].append(job_id)
+        levels.append(max((levels[i] + 1 for i in needs[-1]), default=0))
+    buckets: dict[tuple[int, str], list[int]] = {}
+    for i, unit in enumerate(units):
+        key = json.dumps(resources[unit[0]], sort_keys=True, default=str)
+        buckets.setdefault((levels[i], key), []).append(i)
+    jobs: list[Job] = []
+    # job (position in jobs) and array index of each submitted unit
+    submitted: dict[int, tuple[int, int]] = {}
+    for level, key in sorted(buckets, key=lambda bucket: bucket[0]):
+        members = buckets[level, key]
+        if level:
+            # in the order of the units they need, so that element i can
+            # start once element i of the previous level is done
+            members.sort(key=lambda i: min(submitted[j] for j in needs[i]))
+        parents = sorted({submitted[j][0] for i in members for j in needs[i]})
+        external = sorted({job_id for i in members for job_id in waits[i]})
+        aligned = (
+            worker_count is None
+            and not parallel
+            and len(parents) == 1
+            and not external
+            and not isinstance(jobs[parents[0]], JobGroup)
+            and all(
+                len(needs[i]) == 1 and submitted[needs[i][0]] == (parents[0], index)
+                for index, i in enumerate(members)
+            )
+        )
+        if aligned:
+            dependency = f"aftercorr:{jobs[parents[0]].id}"
+        else:
+            job_ids = [job.id for p in parents for job in _iter_jobs(jobs[p])]
+            job_ids.extend(external)
+            dependency = f"afterok:{':'.join(job_ids)}" if job_ids else None
+        job = _submit_run(
+            cluster,
+            store,
+            base_dir,
+            [units[i] for i in members],
+            requires,
+            resources[units[members[0]][0]],
+            profilers,
+            profiler,
+            worker_count,
+            parallel,
+            command,
+            imports,
+            fork,
+            steps,
+            dependency,
+        )
+        for index, i in enumerate(members):
+            submitted[i] = (len(jobs), index)
+        jobs.append(job)
+    return jobs
+
+
+def _iter_jobs(job: Job) -> Iterator[Job]:
+    if isinstance(job, JobGroup):
+        yield from job
+    else:
+        yield job
+
+
+def _submit_run(
+    cluster: Cluster,
+    store: TaskStore,
+    base_dir: Path,
+    units: list[list[str]],
+    requires: dict[str, list[str]],
+    resources: dict[str, Any],
+    profilers: Sequence[str] | None,
+    profiler: str,
+    worker_count: int | None,
+    parallel: int | bool,
+    command: list[str],
+    imports: dict[str, Any] | None = None,
+    fork: bool | Sequence[str] = False,
+    steps: bool = False,
+    dependency: str | None = None,
+) -> Job:
+    # the cluster splits the array if it is larger than the site allows
+    task_count = len(units)
+
     run_id: str = get_fingerprint(uuid.uuid4().hex)
 
-    manifest = {"run_id": run_id, "tasks": task_fingerprints}
+    # array element i runs tasks[i], so workers can open their task directly
+    manifest = {"run_id": run_id, "tasks": [unit[0] for unit in units]}
+
+    # tasks run by the same worker after tasks[i], in order
+    chains = {unit[0]: unit[1:] for unit in units if len(unit) > 1}
+    if chains:
+        manifest["chains"] = chains
+
+    # workers only start tasks once the tasks they need are completed
+    dependencies = {fp: requires[fp] for unit in units for fp in unit if requires[fp]}
+    if dependencies:
+        manifest["dependencies"] = dependencies
+
+    if imports is not None:
+        manifest["imports"] = imports
+
+    if dependency is not None:
+        # elements that can never start (a task they need failed) are
+        # cancelled rather than left pending
+        resources = {
+            **resources,
+            "dependency": dependency,
+            "kill_on_invalid_dep": "yes",
+        }
+
+    if parallel:
+        # packed workers run up to `parallel` tasks at a time (True sizes the
+        # pool from the cpus of the allocation), so fewer workers are needed
+        manifest["parallel"] = parallel
+        if worker_count is None:
+            worker_count = 1 if parallel is True else math.ceil(task_count / parallel)
+
+    if fork:
+        # each task runs in a process forked from the worker, after the
+        # worker imported these modules (and those of the tasks) once
+        manifest["fork"] = [] if fork is True else list(fork)
 
-    with open(base_dir / f"manifest-{run_id}.json", "w", encoding="utf-8") as f:
-        json.dump(manifest, f)
+    if steps:
+        # the worker runs each task as a job step on a node of its allocation
+        manifest["steps"] = True
 
-    if profilers:
+    if worker_count is not None:
+        # each worker keeps running tasks until none are left or time runs out
+        task_count = min(task_count, worker_count)
+        manifest["workers"] = task_count
+
+    if profilers and profiler != "scalene":
+        # the worker profiles its tasks and writes a profile per job
+        manifest["profile"] = {"backend": profiler, "profilers": list(profilers)}
+
+    store.add_manifest(run_id, manifest)
+
+    if profilers and profiler == "scalene":
         profile_file_name = "job-${{SLURM_JOB_ID}}-scalene.html"
         # --profile-interval
         cmd_args = [
@@ -129,62 +601,845 @@ def schedule(
             "---",
             __main__.__file__,
             "--worker",
-            "--run-id",
-            run_id,
+            f"--run-id={run_id}",
             "--profile",
         ]
         if not is_profiler_avilable():
             raise ImportError(SCALENE_DEPENDENCY_MISSING_ERROR)
     else:
-        cmd_args = ["python", __main__.__file__, "--worker", "--run-id", run_id]
+        # run ids may start with "-", which argparse takes for an option
+        cmd_args = [*command, f"--run-id={run_id}"]
 
-    return cluster.schedule(
+    submit_time = time.time()
+
+    job = cluster.schedule(
         # run this script as a worker
         cmd_args,
         functools.partial(_format_hook, base_dir=base_dir),
         array=list(range(task_count)),
+        **resources,
+    )
+
+    # the queue wait of the workers is measured from here
+    with TimingLog(get_timing_dir(base_dir, run_id) / SUBMIT_FILE) as timing:
+        timing.write(
+            "submit",
+            time=submit_time,
+            duration=time.time() - submit_time,
+            job_id=job.id,
+            workers=task_count,
+        )
+
+    return job
+
+
+def _claim_task(
+    store: TaskStore, fingerprint: str, job_id: str, timing: TimingLog | None = None
+) -> TaskConfig | None:
+    start_time = time.monotonic()
+    config = None
+    if store.claim(fingerprint, job_id):
+        # a first heartbeat before the task is running, so that recovery finds
+        # the claim even if the worker dies before its Heartbeat starts
+        store.set_heartbeat(fingerprint, job_id)
+        store.set_state(fingerprint, "running")
+        config = TaskConfig.from_dict(store.get_task(fingerprint))
+    if timing is not None:
+        timing.write(
+            "claim",
+            fingerprint=fingerprint,
+            duration=time.monotonic() - start_time,
+            claimed=config is not None,
+        )
+    return config
+
+
+def _is_ready(
+    store: TaskStore, dependencies: dict[str, list[str]], fingerprint: str
+) -> bool:
+    return all(
+        store.get_state(dependency) == "completed"
+        for dependency in dependencies.get(fingerprint, [])
     )
 
 
+# array elements in a row with nothing left to take, after which a worker
+# that finished its own tasks stops looking for more, see `_iter_candidates`
+MAX_STEAL_MISSES = 4
+
+
+def _iter_candidates(
+    fingerprints: list[str],
+    index: int | None,
+    step: int,
+    store: TaskStore | None = None,
+) -> Iterator[str]:
+    if index is None or not 0 <= index < len(fingerprints):
+        yield from fingerprints
+        return
+    # tasks assigned to this array element first (tasks[index], then every
+    # step-th task after it)
+    yield from fingerprints[index::step]
+    # then those of the next elements, last first, as their own workers reach
+    # them last; once one of them is already claimed, the rest of that
+    # element's tasks are taken too, so the search moves on without trying to
+    # claim them and ends after MAX_STEAL_MISSES such elements in a row
+    misses = 0
+    for offset in range(1, min(step, len(fingerprints))):
+        misses += 1
+        for fingerprint in reversed(fingerprints[(index + offset) % step :: step]):
+            if store is not None and store.get_claim(fingerprint) is not None:
+                break
+            misses = 0
+            yield fingerprint
+        if misses >= MAX_STEAL_MISSES:
+            return
+
+
+def _run_task(
+    config: TaskConfig,
+    profiler: TaskProfiler | None = None,
+    checkpoint: Path | None = None,
+) -> Any:
+    task = AutoTask(config)
+
+    # only tasks implementing checkpoint/restore resume, others start over
+    checkpoint = checkpoint if supports_checkpoint(task) else None
+
+    with ExitStack() as stack:
+        # node-local copies, which the input cache keeps while the task runs
+        task.inputs = _stage_inputs(config, stack)
+
+        if checkpoint is not None:
+            try:
+                state = load_checkpoint(checkpoint)
+            except FileNotFoundError:
+                pass
+            else:
+                task.restore(state)
+
+        try:
+            with preemptible():
+                if profiler is not None:
+                    with profiler.profile():
+                        value = task.run()
+                else:
+                    value = task.run()
+        except Preempted:
+            if checkpoint is not None:
+                save_checkpoint(checkpoint, task.checkpoint())
+            raise
+
+    if checkpoint is not None:
+        delete_checkpoint(checkpoint)
+
+    return value
+
+
+def _stage_inputs(config: TaskConfig, stack: ExitStack) -> dict[str, Path]:
+    inputs = config.get_inputs()
+    if not inputs:
+        return {}
+    # copying may take long, a copy cut short by preemption is discarded
+    with preemptible():
+        return stack.enter_context(default_input_cache.stage(inputs))
+
+
+def _run_cached_task(
+    config: TaskConfig,
+    fingerprint: str,
+    cache: ResultCache | None,
+    profiler: TaskProfiler | None = None,
+    checkpoint: Path | None = None,
+) -> None:
+    # the result is cached before the task is marked completed, so a completed
+    # task without a cached result has been evicted
+    try:
+        value = _run_task(config, profiler, checkpoint)
+    except Preempted:
+        raise
+    except BaseException:
+        if cache is not None:
+            cache.set_failure(fingerprint, traceback.format_exc())
+        raise
+    if cache is not None:
+        cache.set_result(fingerprint, value)
+
+
+def _requeue_task(store: TaskStore, fingerprint: str) -> None:
+    # state first, so that a worker claiming it right away sets it to running
+    store.set_state(fingerprint, "queued")
+    store.delete_heartbeat(fingerprint)
+    store.release(fingerprint)
+
+
+def _run_claimed_task(
+    store: TaskStore,
+    fingerprint: str,
+    config: TaskConfig,
+    job_id: str,
+    profiler: TaskProfiler | None = None,
+    cache: ResultCache | None = None,
+    checkpoint: Path | None = None,
+    timing: TimingLog | None = None,
+) -> None:
+    try:
+        with Heartbeat(store, fingerprint, job_id):
+            if timing is None:
+                _run_cached_task(config, fingerprint, cache, profiler, checkpoint)
+            else:
+                with timing.phase("run", fingerprint=fingerprint):
+                    _run_cached_task(config, fingerprint, cache, profiler, checkpoint)
+    except Preempted:
+        _requeue_task(store, fingerprint)
+        raise
+    except BaseException:
+        store.set_state(fingerprint, "failed")
+        raise
+    store.set_state(fingerprint, "completed")
+
+
 def run_worker(
     cluster: Cluster,
     base_dir: Path,
     run_id: str,
     profile: bool = False,
+    store: TaskStore | str | None = None,
+    cache: ResultCache | str | bool | None = None,
 ) -> None:
-    with open(base_dir / f"manifest-{run_id}.json", "r", encoding="utf-8") as f:
-        manifest = json.load(f)
+    job_id = cluster.current_job.id
 
-    fingerprints = manifest["tasks"]
+    if cluster.get_restart_count() >= MAX_REQUEUES:
+        # also for the processes and job steps started by this worker
+        os.environ.pop(PREEMPTION_SIGNAL_ENV, None)
 
-    job_id = cluster.current_job.id
+    # phases of this worker, see `easysubmit.timing.summarize_timings`
+    with TimingLog(get_timing_dir(base_dir, run_id) / f"{job_id}.jsonl") as timing:
+        timing.write(
+            "start", start_time=get_job_start_time(), exec_time=get_job_exec_time()
+        )
 
-    config = None
+        try:
+            with timing.phase("worker"):
+                _run_worker(
+                    cluster, base_dir, run_id, job_id, timing, profile, store, cache
+                )
+        except Preempted:
+            # its tasks were queued again (and the job too, if the cluster can)
+            sys.exit(PREEMPTED_EXIT_CODE)
 
-    for task_path in base_dir.glob("*-task.json"):
-        config = TaskConfig.from_json(task_path)
 
-        if config.fingerprint not in fingerprints:
-            config = None
-            continue
+def run_step(
+    cluster: Cluster,
+    base_dir: Path,
+    run_id: str,
+    fingerprint: str,
+    store: TaskStore | str | None = None,
+    cache: ResultCache | str | bool | None = None,
+) -> NoReturn:
+    """Run a task claimed by the worker of the current job, as a job step.
+
+    The worker started this process on one of the nodes of its allocation and
+    learns how the task ended from its exit status, see `_drain_processes`.
+    """
+    store = get_task_store(base_dir, store)
+
+    cache = get_result_cache(base_dir, cache)
+
+    manifest = store.get_manifest(run_id)
+
+    import_task_modules(manifest.get("imports"))
+
+    _run_child_task(
+        store.get_task(fingerprint),
+        str(base_dir),
+        fingerprint,
+        store,
+        cluster.current_job.id,
+        cache,
+        manifest.get("profile"),
+        str(get_profile_dir(base_dir, run_id)),
+    )
+
+
+def _run_worker(
+    cluster: Cluster,
+    base_dir: Path,
+    run_id: str,
+    job_id: str,
+    timing: TimingLog,
+    profile: bool = False,
+    store: TaskStore | str | None = None,
+    cache: ResultCache | str | bool | None = None,
+) -> None:
+    store = get_task_store(base_dir, store)
+
+    cache = get_result_cache(base_dir, cache)
+
+    with timing.phase("manifest"):
+        manifest = store.get_manifest(run_id)
+
+    with timing.phase("modules"):
+        import_task_modules(manifest.get("imports"))
+        for module in manifest.get("fork", []):
+            importlib.import_module(module)
+
+    profiler: TaskProfiler | None = None
+    if profile:
+        # the worker runs under scalene
+        profiler = ScaleneProfiler()
+    elif "profile" in manifest:
+        profiler = get_task_profiler(
+            manifest["profile"]["backend"], manifest["profile"]["profilers"]
+        )
+
+    try:
+        # signals received outside of tasks stop the worker from claiming more
+        with deferred_preemption() as preempted:
+            _run_tasks(
+                cluster,
+                base_dir,
+                job_id,
+                timing,
+                manifest,
+                profiler,
+                store,
+                cache,
+                preempted,
+            )
+    finally:
+        if profiler is not None:
+            profile_dir = get_profile_dir(base_dir, run_id)
+            profiler.save(profile_dir / f"{job_id}.json")
+
+
+def _run_tasks(
+    cluster: Cluster,
+    base_dir: Path,
+    job_id: str,
+    timing: TimingLog,
+    manifest: dict[str, Any],
+    profiler: TaskProfiler | None,
+    store: TaskStore,
+    cache: ResultCache | None,
+    preempted: list[int] | None = None,
+) -> None:
+    # signals received while no task was running, see `deferred_preemption`
+    preempted = [] if preempted is None else preempted
+
+    # the manifest lists the task of array element i at position i
+    fingerprints: list[str] = manifest["tasks"]
+
+    # number of array elements sharing the tasks (only set for multi-task runs)
+    worker_count: int | None = manifest.get("workers")
+
+    index = cluster.current_array_task_id
+
+    # tasks that need other tasks, which must be completed first
+    dependencies: dict[str, list[str]] = manifest.get("dependencies", {})
+
+    # tasks run after tasks[i] by the same worker
+    chains: dict[str, list[str]] = manifest.get("chains", {})
 
-        job_path = base_dir / f"{config.fingerprint}-worker.txt"
+    candidates = (
+        fingerprint
+        # single-task workers each have one task of their own
+        for fingerprint in _iter_candidates(
+            fingerprints, index, worker_count or len(fingerprints), store
+        )
+        # left queued (for the next `schedule`) if a task it needs failed
+        if _is_ready(store, dependencies, fingerprint)
+    )
+
+    try:
+        if worker_count is None:
+            for head in candidates:
+                ran = False
+                # a requeued job resumes its chain after the completed tasks
+                for fingerprint in [head, *chains.get(head, [])]:
+                    if preempted or not _is_ready(store, dependencies, fingerprint):
+                        break
+                    config = _claim_task(store, fingerprint, job_id, timing)
+                    if config is None:
+                        continue
+                    if preempted:
+                        # received while claiming, the task has not started
+                        _requeue_task(store, fingerprint)
+                        break
+                    checkpoint = get_checkpoint_path(base_dir, fingerprint)
+                    _run_claimed_task(
+                        store,
+                        fingerprint,
+                        config,
+                        job_id,
+                        profiler,
+                        cache,
+                        checkpoint,
+                        timing,
+                    )
+                    ran = True
+                if ran or preempted:
+                    break
+            _raise_if_preempted(preempted)
+            return
+
+        deadline = cluster.get_deadline()
+
+        parallel: int | bool = manifest.get("parallel", False)
+
+        if parallel is True:
+            parallel = cluster.get_cpu_count()
+
+        if manifest.get("steps"):
+            # `parallel` steps at a time on each node of the allocation
+            slots = parallel or 1
+            durations, failed = _drain_processes(
+                store,
+                base_dir,
+                candidates,
+                job_id,
+                deadline,
+                cluster.get_node_count() * slots,
+                cache,
+                timing,
+                start=functools.partial(_start_step, cluster, slots),
+                preempted=preempted,
+            )
+        elif "fork" in manifest:
+            durations, failed = _drain_processes(
+                store,
+                base_dir,
+                candidates,
+                job_id,
+                deadline,
+                parallel or 1,
+                cache,
+                timing,
+                manifest.get("profile"),
+                get_profile_dir(base_dir, manifest["run_id"]),
+                preempted=preempted,
+            )
+        elif parallel and parallel > 1:
+            durations, failed = _drain_parallel(
+                store,
+                base_dir,
+                candidates,
+                job_id,
+                deadline,
+                parallel,
+                cache,
+                timing,
+                manifest.get("profile"),
+                get_profile_dir(base_dir, manifest["run_id"]),
+                manifest.get("imports"),
+                preempted,
+            )
+        else:
+            durations, failed = _drain(
+                store,
+                base_dir,
+                candidates,
+                job_id,
+                deadline,
+                profiler,
+                cache,
+                timing,
+                preempted,
+            )
+        _raise_if_preempted(preempted)
+    except Preempted:
+        # the running tasks were checkpointed and queued again, so put this
+        # job back in the queue to pick them up
         try:
-            with open(job_path, "x", encoding="utf-8") as f:
-                f.write(str(job_id))
-        except FileExistsError:
-            config = None
+            cluster.current_job.requeue()
+        except NotImplementedError:
+            pass  # the tasks run again with the next `schedule`
+        raise
+
+    if failed:
+        msg = f"{len(failed)} of {len(durations)} tasks failed: {', '.join(failed)}"
+        raise RuntimeError(msg)
+
+
+def _raise_if_preempted(preempted: list[int]) -> None:
+    if preempted:
+        raise Preempted(signal.Signals(preempted[0]).name)
+
+
+def _out_of_time(deadline: float | None, durations: list[float]) -> bool:
+    # whether the longest task seen so far would not finish before the deadline
+    if deadline is None or not durations:
+        return False
+    return time.time() + max(durations) > deadline
+
+
+def _drain(
+    store: TaskStore,
+    base_dir: Path,
+    candidates: Iterator[str],
+    job_id: str,
+    deadline: float | None,
+    profiler: TaskProfiler | None = None,
+    cache: ResultCache | None = None,
+    timing: TimingLog | None = None,
+    preempted: list[int] | None = None,
+) -> tuple[list[float], list[str]]:
+    durations: list[float] = []
+    failed: list[str] = []
+    preempted = [] if preempted is None else preempted
+    for fingerprint in candidates:
+        if preempted or _out_of_time(deadline, durations):
+            break
+        config = _claim_task(store, fingerprint, job_id, timing)
+        if config is None:
             continue
+        if preempted:
+            # received while claiming, the task has not started
+            _requeue_task(store, fingerprint)
+            break
+        checkpoint = get_checkpoint_path(base_dir, fingerprint)
+        start_time = time.monotonic()
+        try:
+            _run_claimed_task(
+                store, fingerprint, config, job_id, profiler, cache, checkpoint, timing
+            )
+        except Exception:  # noqa: BLE001
+            # a failed task (already marked so) does not stop the worker
+            traceback.print_exc()
+            failed.append(fingerprint)
+        durations.append(time.monotonic() - start_time)
+    return durations, failed
 
-        break
 
-    if config is None:
-        return
+def _init_pool_process(
+    imports: dict[str, Any] | None = None, pids: Any | None = None
+) -> None:
+    # pool processes only stop for preemption while they run a task
+    for sig in get_preemption_signals():
+        signal.signal(sig, signal.SIG_IGN)
+    if pids is not None:
+        # the first free slot, so the worker can pass signals on to this process
+        with pids.get_lock():
+            pids[pids[:].index(0)] = os.getpid()
+    # processes that are not forked start without the task classes
+    import_task_modules(imports)
 
-    task = AutoTask(config)
 
-    if profile:
-        with enable_profiling():
-            task.run()
+def _get_task_output(base_dir: str | Path, fingerprint: str) -> tuple[Path, Path]:
+    # stdout and stderr of tasks run in other processes, next to the task
+    return (
+        Path(base_dir) / f"{fingerprint}-task.out",
+        Path(base_dir) / f"{fingerprint}-task.err",
+    )
+
+
+def _run_isolated_task(
+    config: dict,
+    base_dir: str,
+    fingerprint: str,
+    store: TaskStore,
+    job_id: str,
+    cache: ResultCache | None = None,
+    profile: dict[str, Any] | None = None,
+    profile_dir: str | None = None,
+) -> None:
+    # runs a task in a process of its own, the result is cached from there
+    # rather than sent back to the worker
+    checkpoint = get_checkpoint_path(base_dir, fingerprint)
+    # tasks in other processes are profiled one by one
+    profiler = (
+        None
+        if profile is None
+        else get_task_profiler(profile["backend"], profile["profilers"])
+    )
+    try:
+        with Heartbeat(store, fingerprint, job_id):
+            _run_cached_task(
+                TaskConfig.from_dict(config),
+                fingerprint,
+                cache,
+                profiler,
+                checkpoint,
+            )
+    except Exception:
+        traceback.print_exc()
+        raise
+    finally:
+        if profiler is not None and profile_dir is not None:
+            profiler.save(Path(profile_dir) / f"{job_id}-{fingerprint}.json")
+
+
+def _run_task_captured(
+    config: dict,
+    base_dir: str,
+    fingerprint: str,
+    store: TaskStore,
+    job_id: str,
+    cache: ResultCache | None = None,
+    profile: dict[str, Any] | None = None,
+    profile_dir: str | None = None,
+) -> float:
+    # runs in a pool process
+    outfile, errfile = _get_task_output(base_dir, fingerprint)
+    start_time = time.monotonic()
+    with capture(outfile, errfile):
+        _run_isolated_task(
+            config, base_dir, fingerprint, store, job_id, cache, profile, profile_dir
+        )
+    return time.monotonic() - start_time
+
+
+def _run_child_task(
+    config: dict,
+    base_dir: str,
+    fingerprint: str,
+    store: TaskStore,
+    job_id: str,
+    cache: ResultCache | None = None,
+    profile: dict[str, Any] | None = None,
+    profile_dir: str | None = None,
+) -> NoReturn:
+    # runs in a process forked from the worker (or a job step it started) and
+    # reports how the task ended with its exit status, see `_drain_processes`;
+    # anything raised other than Preempted leaves it at 1
+    code = 1
+    try:
+        for sig in get_preemption_signals():
+            signal.signal(sig, signal.SIG_DFL)
+        # at the file descriptor level, so output of extensions (and of
+        # processes they start) is captured too
+        outfile, errfile = _get_task_output(base_dir, fingerprint)
+        for path, fd in ((outfile, 1), (errfile, 2)):
+            with open(path, "wb") as f:
+                os.dup2(f.fileno(), fd)
+        _run_isolated_task(
+            config, base_dir, fingerprint, store, job_id, cache, profile, profile_dir
+        )
+        code = 0
+    except Preempted:
+        code = PREEMPTED_EXIT_CODE
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # skips cleanup of the worker (atexit, finally blocks up the stack)
+        os._exit(code)
+
+
+def _start_step(cluster: Cluster, slots: int, fingerprint: str) -> subprocess.Popen:
+    # this worker, started again with --task as a step on a free node
+    spec = getattr(__main__, "__spec__", None)
+    if spec is not None:
+        args = [sys.executable, "-m", spec.name, *sys.argv[1:]]
     else:
-        task.run()
+        args = [sys.executable, *sys.argv]
+    command = cluster.get_step_command([*args, f"--task={fingerprint}"], slots)
+    return subprocess.Popen(command)
+
+
+def _drain_processes(
+    store: TaskStore,
+    base_dir: Path,
+    candidates: Iterator[str],
+    job_id: str,
+    deadline: float | None,
+    parallel: int = 1,
+    cache: ResultCache | None = None,
+    timing: TimingLog | None = None,
+    profile: dict[str, Any] | None = None,
+    profile_dir: Path | None = None,
+    start: Callable[[str], subprocess.Popen] | None = None,
+    preempted: list[int] | None = None,
+) -> tuple[list[float], list[str]]:
+    # runs each task in a process of its own, up to `parallel` at a time; a
+    # task that crashes the process or leaks memory does not affect the
+    # others; processes are forked, so modules imported by the worker are not
+    # imported again, or started with `start`, e.g., as job steps
+    if start is None and not hasattr(os, "fork"):
+        msg = "fork is not supported on this platform"
+        raise RuntimeError(msg)
+    durations: list[float] = []
+    failed: list[str] = []
+    # pid -> (fingerprint, start time, process if started with `start`)
+    running: dict[int, tuple[str, float, subprocess.Popen | None]] = {}
+    # signals received by this process, passed on to the running tasks
+    preempted = [] if preempted is None else preempted
+
+    def reap() -> None:
+        pid, wait_status = os.waitpid(-1, 0)
+        if pid not in running:
+            return
+        fingerprint, start_time, process = running.pop(pid)
+        duration = time.monotonic() - start_time
+        durations.append(duration)
+        code = os.waitstatus_to_exitcode(wait_status)
+        if process is not None:
+            # reaped here, so Popen must not wait for it again
+            process.returncode = code
+        # killed by a signal (e.g., out of memory) before it could clean up
+        if code != 0:
+            store.delete_heartbeat(fingerprint)
+        if code == 0:
+            status = "ok"
+            store.set_state(fingerprint, "completed")
+        elif code == PREEMPTED_EXIT_CODE or (code < 0 and preempted):
+            status = "Preempted"
+            _requeue_task(store, fingerprint)
+        else:
+            status = signal.Signals(-code).name if code < 0 else f"exit {code}"
+            msg = f"task {fingerprint} failed: {status}"
+            print(msg, file=sys.stderr)
+            store.set_state(fingerprint, "failed")
+            failed.append(fingerprint)
+        if timing is not None:
+            timing.write(
+                "run", fingerprint=fingerprint, duration=duration, status=status
+            )
+
+    def forward(signum: int, frame: Any) -> None:
+        preempted.append(signum)
+        for pid in list(running):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    previous = {sig: signal.signal(sig, forward) for sig in get_preemption_signals()}
+    try:
+        for fingerprint in candidates:
+            while len(running) >= parallel:
+                reap()
+            if preempted or _out_of_time(deadline, durations):
+                break
+            config = _claim_task(store, fingerprint, job_id, timing)
+            if config is None:
+                continue
+            if preempted:
+                _requeue_task(store, fingerprint)
+                break
+            # or the child writes what is still buffered here once more
+            sys.stdout.flush()
+            sys.stderr.flush()
+            if start is not None:
+                process = start(fingerprint)
+                running[process.pid] = (fingerprint, time.monotonic(), process)
+                continue
+            pid = os.fork()
+            if pid == 0:
+                _run_child_task(
+                    config.to_dict(),
+                    str(base_dir),
+                    fingerprint,
+                    store,
+                    job_id,
+                    cache,
+                    profile,
+                    str(profile_dir) if profile_dir is not None else None,
+                )
+            running[pid] = (fingerprint, time.monotonic(), None)
+        while running:
+            reap()
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    _raise_if_preempted(preempted)
+    return durations, failed
+
+
+def _drain_parallel(
+    store: TaskStore,
+    base_dir: Path,
+    candidates: Iterator[str],
+    job_id: str,
+    deadline: float | None,
+    parallel: int,
+    cache: ResultCache | None = None,
+    timing: TimingLog | None = None,
+    profile: dict[str, Any] | None = None,
+    profile_dir: Path | None = None,
+    imports: dict[str, Any] | None = None,
+    preempted: list[int] | None = None,
+) -> tuple[list[float], list[str]]:
+    durations: list[float] = []
+    failed: list[str] = []
+    running: dict[Future, str] = {}
+    # signals received by this process, passed on to the pool processes
+    preempted = [] if preempted is None else preempted
+
+    def collect(futures: set[Future]) -> None:
+        for future in futures:
+            fingerprint = running.pop(future)
+            # duration of tasks that did not finish is not known here
+            duration, status = None, "ok"
+            try:
+                duration = future.result()
+                durations.append(duration)
+            except Preempted:
+                status = "Preempted"
+                _requeue_task(store, fingerprint)
+            except Exception as e:  # noqa: BLE001
+                # raised by the task in a pool process, whatever it is
+                status = type(e).__name__
+                msg = f"task {fingerprint} failed: {e!r}"
+                print(msg, file=sys.stderr)
+                store.set_state(fingerprint, "failed")
+                failed.append(fingerprint)
+                durations.append(0.0)
+            else:
+                store.set_state(fingerprint, "completed")
+            if timing is not None:
+                timing.write(
+                    "run", fingerprint=fingerprint, duration=duration, status=status
+                )
+
+    # pids of the pool processes, each sets its own as it starts
+    pids = multiprocessing.Array("i", parallel)
+
+    with ProcessPoolExecutor(
+        max_workers=parallel, initializer=_init_pool_process, initargs=(imports, pids)
+    ) as executor:
+
+        def forward(signum: int, frame: Any) -> None:
+            preempted.append(signum)
+            # without the lock, which a starting pool process may hold
+            for pid in pids.get_obj()[:]:
+                if not pid:
+                    continue
+                try:
+                    os.kill(pid, signum)
+                except ProcessLookupError:
+                    pass
+
+        previous = {
+            sig: signal.signal(sig, forward) for sig in get_preemption_signals()
+        }
+        try:
+            for fingerprint in candidates:
+                if len(running) >= parallel:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    collect(done)
+                if preempted or _out_of_time(deadline, durations):
+                    break
+                config = _claim_task(store, fingerprint, job_id, timing)
+                if config is None:
+                    continue
+                if preempted:
+                    _requeue_task(store, fingerprint)
+                    break
+                future = executor.submit(
+                    _run_task_captured,
+                    config.to_dict(),
+                    str(base_dir),
+                    fingerprint,
+                    store,
+                    job_id,
+                    cache,
+                    profile,
+                    str(profile_dir) if profile_dir is not None else None,
+                )
+                running[future] = fingerprint
+            collect(wait(running).done)
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+    _raise_if_preempted(preempted)
+    return durations, failed
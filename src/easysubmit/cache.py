@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any
+
+__all__ = [
+    "JSONSerializer",
+    "PickleSerializer",
+    "ResultCache",
+    "Serializer",
+    "get_result_cache",
+]
+
+
+class Serializer:
+    # file extension of serialized results
+    extension: str = "bin"
+
+    def dumps(self, obj: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class PickleSerializer(Serializer):
+    extension = "pkl"
+
+    def dumps(self, obj: Any) -> bytes:
+        return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+class JSONSerializer(Serializer):
+    extension = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data.decode("utf-8"))
+
+
+SERIALIZERS: dict[str, type[Serializer]] = {
+    "pickle": PickleSerializer,
+    "json": JSONSerializer,
+}
+
+
+class ResultCache:
+    """Return values and completion status of tasks keyed by fingerprint.
+
+    Each entry is one file in ``path`` holding ``{"status": "completed",
+    "value": ...}`` or ``{"status": "failed", "error": ...}``. Entries older
+    than ``max_age`` seconds are treated as missing, and ``evict`` removes
+    them along with the least recently written entries until the cache is no
+    larger than ``max_size`` bytes.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        serializer: Serializer | str = "pickle",
+        max_size: int | None = None,
+        max_age: float | None = None,
+    ):
+        self.path = Path(path)
+        if isinstance(serializer, str):
+            serializer = SERIALIZERS[serializer]()
+        self.serializer = serializer
+        self.max_size = max_size
+        self.max_age = max_age
+
+    def _get_path(self, fingerprint: str) -> Path:
+        return self.path / f"{fingerprint}.{self.serializer.extension}"
+
+    def _is_expired(self, path: Path) -> bool:
+        if self.max_age is None:
+            return False
+        return time.time() - path.stat().st_mtime > self.max_age
+
+    def _write(self, fingerprint: str, entry: dict[str, Any]) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        path = self._get_path(fingerprint)
+        # write and rename so readers never see a partial entry
+        tmp = path.with_name(f".{path.name}.{os.getpid()}")
+        tmp.write_bytes(self.serializer.dumps(entry))
+        tmp.replace(path)
+
+    def set_result(self, fingerprint: str, value: Any) -> None:
+        self._write(fingerprint, {"status": "completed", "value": value})
+
+    def set_failure(self, fingerprint: str, error: str) -> None:
+        self._write(fingerprint, {"status": "failed", "error": error})
+
+    def get_entry(self, fingerprint: str) -> dict[str, Any] | None:
+        path = self._get_path(fingerprint)
+        try:
+            if self._is_expired(path):
+                return None
+            return self.serializer.loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
+
+    def has_result(self, fingerprint: str) -> bool:
+        # whether the task completed and its result is still cached
+        entry = self.get_entry(fingerprint)
+        return entry is not None and entry["status"] == "completed"
+
+    def get_result(self, fingerprint: str) -> Any:
+        entry = self.get_entry(fingerprint)
+        if entry is None or entry["status"] != "completed":
+            raise KeyError(fingerprint)
+        return entry["value"]
+
+    def delete(self, fingerprint: str) -> None:
+        self._get_path(fingerprint).unlink(missing_ok=True)
+
+    def evict(self) -> int:
+        # returns the number of entries removed
+        if not self.path.exists():
+            return 0
+        entries = []
+        for path in self.path.glob(f"*.{self.serializer.extension}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        removed = 0
+        now = time.time()
+        size = sum(entry[1] for entry in entries)
+        for mtime, entry_size, path in entries:
+            expired = self.max_age is not None and now - mtime > self.max_age
+            too_large = self.max_size is not None and size > self.max_size
+            if not expired and not too_large:
+                # entries are oldest first, the rest are newer and fit
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+            removed += 1
+        return removed
+
+
+def get_result_cache(
+    base_dir: str | Path, cache: ResultCache | str | bool | None
+) -> ResultCache | None:
+    if isinstance(cache, ResultCache):
+        return cache
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return ResultCache(Path(base_dir) / "results")
+    if cache in SERIALIZERS:
+        return ResultCache(Path(base_dir) / "results", serializer=cache)
+    msg = f"unknown result cache: {cache}"
+    raise ValueError(msg)
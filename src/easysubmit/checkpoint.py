@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import os
+import pickle
+import signal
+import threading
+from collections.abc import Generator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from easysubmit.entities import Task
+
+__all__ = [
+    "PREEMPTION_SIGNAL_ENV",
+    "Preempted",
+    "deferred_preemption",
+    "delete_checkpoint",
+    "get_checkpoint_path",
+    "get_preemption_signals",
+    "load_checkpoint",
+    "preemptible",
+    "save_checkpoint",
+    "supports_checkpoint",
+]
+
+# name (or number) of the signal announcing that the job is about to be stopped,
+# e.g., "USR1" with `SLURMConfig(signal="B:USR1@300")`; any other signal, such
+# as the TERM of `scancel`, stops the worker and fails its tasks
+PREEMPTION_SIGNAL_ENV = "EASYSUBMIT_PREEMPTION_SIGNAL"
+
+
+class Preempted(BaseException):
+    """Raised in a worker when its job is about to be stopped.
+
+    Derives from BaseException, like KeyboardInterrupt, so that tasks
+    catching Exception do not swallow it.
+    """
+
+
+def get_preemption_signals() -> tuple[int, ...]:
+    name = os.environ.get(PREEMPTION_SIGNAL_ENV)
+    if not name:
+        return ()
+    if name.isdigit():
+        return (int(name),)
+    name = name.upper()
+    sig = getattr(signal, name if name.startswith("SIG") else f"SIG{name}", None)
+    return () if sig is None else (sig,)
+
+
+def supports_checkpoint(task: Task) -> bool:
+    return type(task).checkpoint is not Task.checkpoint
+
+
+def get_checkpoint_path(base_dir: str | Path, fingerprint: str) -> Path:
+    return Path(base_dir) / "checkpoints" / f"{fingerprint}.pkl"
+
+
+def save_checkpoint(path: Path, state: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # write and rename so a worker stopped while saving keeps the old one
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    tmp.write_bytes(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+    tmp.replace(path)
+
+
+def load_checkpoint(path: Path) -> Any:
+    # raises FileNotFoundError if there is no checkpoint
+    return pickle.loads(path.read_bytes())
+
+
+def delete_checkpoint(path: Path) -> None:
+    path.unlink(missing_ok=True)
+
+
+def _raise_preempted(signum: int, frame: Any) -> None:
+    # once is enough, the job is stopped anyway
+    for sig in get_preemption_signals():
+        signal.signal(sig, signal.SIG_IGN)
+    raise Preempted(signal.Signals(signum).name)
+
+
+@contextmanager
+def preemptible() -> Generator[None, None, None]:
+    # raise Preempted in the main thread on the preemption signal
+    if threading.current_thread() is not threading.main_thread():
+        # signal handlers can only be set from the main thread
+        yield
+        return
+    signals = get_preemption_signals()
+    previous = {sig: signal.signal(sig, _raise_preempted) for sig in signals}
+    try:
+        yield
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+
+
+@contextmanager
+def deferred_preemption() -> Generator[list[int], None, None]:
+    # records the preemption signal in the list it yields rather than letting
+    # them stop the process, so a worker between tasks (or claiming one) can
+    # stop claiming and requeue; `preemptible` takes over while a task runs
+    preempted: list[int] = []
+    if threading.current_thread() is not threading.main_thread():
+        yield preempted
+        return
+
+    def record(signum: int, frame: Any) -> None:
+        preempted.append(signum)
+
+    previous = {sig: signal.signal(sig, record) for sig in get_preemption_signals()}
+    try:
+        yield preempted
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
@@ -1,16 +1,21 @@
 from __future__ import annotations
 
-from collections.abc import Sequence
 import json
+import os
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
+from dataclasses import fields
 from pathlib import Path
 from typing import Any, Callable, ClassVar
 
+from nightjar import AutoModule, BaseConfig, BaseModule
+from nightjar.types import to_dict
 from typing_extensions import Literal
-from nightjar import AutoModule, BaseModule, BaseConfig
+
 from easysubmit.helpers import get_fingerprint
 
 __all__ = [
     "Job",
+    "JobGroup",
     "Cluster",
     "Task",
     "TaskConfig",
@@ -37,12 +42,62 @@ class Cluster:
         # Job of the current job array (i.e., the first job in the array)
         return self.get_array_job()
 
+    @property
+    def current_array_task_id(self) -> int | None:
+        # Index of the current job within its array (None outside of an array)
+        return self.get_array_task_id()
+
     def get_job(self, job_id: str | None = None) -> Job:
         raise NotImplementedError
 
     def get_array_job(self, job_id: str | None = None) -> Job:
         raise NotImplementedError
 
+    def get_array_task_id(self) -> int | None:
+        # None outside of an array, also for clusters that know no arrays
+        return None
+
+    def get_deadline(self) -> float | None:
+        # Unix time at which the current job will be stopped (None if unknown)
+        return None
+
+    def get_cpu_count(self) -> int:
+        # Number of cpus available to the current job
+        return os.cpu_count() or 1
+
+    def get_usage(self, job_ids: Sequence[str]) -> dict[str, dict[str, Any]]:
+        # Resource usage of finished jobs keyed by job id: state, elapsed and
+        # total_cpu (seconds) and max_rss (bytes); jobs without data are left out
+        return {}
+
+    def get_node_count(self) -> int:
+        # Number of nodes allocated to the current job
+        return 1
+
+    def get_restart_count(self) -> int:
+        # Number of times the current job was requeued
+        return 0
+
+    def get_step_command(self, args: Sequence[str], slots: int = 1) -> list[str]:
+        # Command running `args` as a step on one node of the current job,
+        # which runs `slots` steps at a time on each of its nodes
+        raise NotImplementedError
+
+    def get_worker_args(self) -> list[str] | None:
+        # Arguments of `python -m easysubmit.worker` that rebuild this cluster
+        # in a worker (None if workers must run the submitting script again)
+        return None
+
+    async def as_completed(
+        self, jobs: Iterable[Job], timeout: float | None = None
+    ) -> AsyncIterator[Job]:
+        # yield the jobs as they finish, raises asyncio.TimeoutError if they
+        # did not all finish within `timeout` seconds
+        from easysubmit.poller import default_job_poller
+
+        async for job in default_job_poller.as_completed(jobs, timeout):
+            yield job
+
 
 class Job:
     def __init__(self, id: int | str):
@@ -68,23 +123,163 @@ class Job:
     ) -> Literal["PENDING", "RUNNING", "COMPLETED", "FAILED", "CANCELLED", "UNKNOWN"]:
         raise NotImplementedError
 
+    def get_array_states(self) -> dict[str, str]:
+        # state of each array element (or of the job itself) keyed by job id
+        return {self.id: self.get_status()}
+
+    @classmethod
+    def get_statuses(cls, jobs: Sequence[Job]) -> dict[str, str]:
+        # status of several jobs of this class keyed by job id, override to
+        # query them all at once
+        return {job.id: job.get_status() for job in jobs}
+
     def cancel(self):
         raise NotImplementedError
 
+    def requeue(self):
+        # put the job back in the queue, e.g., after it was preempted
+        raise NotImplementedError
+
+    async def wait(self, timeout: float | None = None) -> str:
+        # wait until the job finished and return its status, raises
+        # asyncio.TimeoutError after `timeout` seconds
+        from easysubmit.poller import default_job_poller
+
+        return await default_job_poller.wait(self, timeout)
+
+
+# status of a group of jobs is the first status any of its jobs has
+JOB_STATUS_PRECEDENCE = ["PENDING", "RUNNING", "CANCELLED", "FAILED", "COMPLETED"]
+
+
+def collapse_job_statuses(statuses: Iterable[str]) -> str:
+    statuses = set(statuses)
+    for status in JOB_STATUS_PRECEDENCE:
+        if status in statuses:
+            return status
+    return "UNKNOWN"
+
+
+class JobGroup(Job):
+    """Several jobs (e.g., the chunks of one large array) handled as one."""
+
+    def __init__(self, jobs: Sequence[Job]):
+        self.jobs = list(jobs)
+        super().__init__(",".join(job.id for job in self.jobs))
+
+    def get_status(self) -> str:
+        return collapse_job_statuses(job.get_status() for job in self.jobs)
+
+    def get_array_states(self) -> dict[str, str]:
+        states = {}
+        for job in self.jobs:
+            states.update(job.get_array_states())
+        return states
+
+    def cancel(self):
+        for job in self.jobs:
+            job.cancel()
+
+    def requeue(self):
+        for job in self.jobs:
+            job.requeue()
+
+    def __iter__(self) -> Iterator[Job]:
+        return iter(self.jobs)
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def __repr__(self):
+        return f"JobGroup(jobs={self.jobs!r})"
+
+
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+def _is_plain(value: Any) -> bool:
+    if isinstance(value, _PLAIN_TYPES):
+        return True
+    if isinstance(value, (list, tuple)) and not hasattr(value, "_fields"):
+        return all(map(_is_plain, value))
+    if type(value) is dict:
+        return all(isinstance(k, str) and _is_plain(v) for k, v in value.items())
+    return False
+
+
+def _is_frozen(value: Any) -> bool:
+    # whether a value cannot change in place
+    if value is None or isinstance(value, (str, int, float, bytes)):
+        return True
+    if isinstance(value, (tuple, frozenset)):
+        return all(map(_is_frozen, value))
+    return False
+
 
 class TaskConfig(BaseConfig, dispatch="name"):
     name: ClassVar[str]
+    # cluster config overrides for this task, e.g., {"mem": "64GB"}, tasks
+    # with equal resources are submitted together (see `get_resources`)
+    resources: ClassVar[dict[str, Any] | None] = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # subclasses are turned into dataclasses too, which would replace
+        # these with field-wise equality and no hash unless set on the class
+        cls.__eq__ = TaskConfig.__eq__
+        cls.__hash__ = TaskConfig.__hash__
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        # changing a field changes the fingerprint
+        self.__dict__.pop("_fingerprint", None)
 
     @property
     def fingerprint(self) -> str:
-        return get_fingerprint(self.to_dict())
+        try:
+            return self.__dict__["_fingerprint"]
+        except KeyError:
+            pass
+        fingerprint = get_fingerprint(self._to_fingerprint_dict())
+        # only kept while no field can be modified in place (e.g., a dict or
+        # list), which would not go through `__setattr__`
+        if all(_is_frozen(getattr(self, field.name)) for field in fields(self)):
+            self.__dict__["_fingerprint"] = fingerprint
+        return fingerprint
+
+    def _to_fingerprint_dict(self) -> dict[str, Any]:
+        # same as `to_dict` without copying values that are already plain json
+        data = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            data[field.name] = value if _is_plain(value) else to_dict(value)
+        data["name"] = self.name
+        return data
+
+    def get_resources(self) -> dict[str, Any]:
+        # override to compute the resources from the field values
+        return dict(self.resources or {})
+
+    def get_dependencies(self) -> list[TaskConfig | str]:
+        # configs (or fingerprints) of tasks that must complete before this
+        # one starts, override to derive them from the field values
+        return []
+
+    def get_inputs(self) -> dict[str, str | Path]:
+        # files or directories (by name) the task reads, which workers copy
+        # to node-local disk once per node (see `Task.inputs`), override to
+        # derive them from the field values
+        return {}
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, TaskConfig):
-            raise NotImplementedError
+            return NotImplemented
         # both id and fingerprint must be equal
         return self.fingerprint == other.fingerprint
 
+    def __hash__(self) -> int:
+        return hash(self.fingerprint)
+
     @classmethod
     def from_json(cls, path: str | Path) -> TaskConfig:
         with open(path, "r", encoding="utf-8") as f:
@@ -94,10 +289,22 @@ class TaskConfig(BaseConfig, dispatch="name"):
 
 class Task(BaseModule):
     config: TaskConfig
+    # local copies of the inputs of the config by name, set by the worker
+    # before `run` (see `TaskConfig.get_inputs`)
+    inputs: dict[str, Path]
 
     def run(self):
         raise NotImplementedError
 
+    def checkpoint(self) -> Any:
+        # state to resume from when the worker is stopped while the task runs
+        # (e.g., preempted); tasks that do not override this start over
+        raise NotImplementedError
+
+    def restore(self, state: Any) -> None:
+        # called before `run` with the state returned by `checkpoint`
+        raise NotImplementedError
+
 
 class AutoTask(AutoModule):
     def __new__(cls, config: Any) -> Task:
@@ -0,0 +1,762 @@
+"""Local stand-in for the SLURM command line tools.
+
+``python -m easysubmit.fakeslurm install BIN_DIR`` writes ``sbatch``,
+``sacct``, ``squeue``, ``scancel``, ``scontrol``, ``sacctmgr`` and ``srun``
+executables to ``BIN_DIR``. Putting that directory first on ``PATH`` lets
+the SLURM backend (and anything else calling those tools) run against the
+local machine: batch scripts are parsed for the ``#SBATCH`` directives that
+``build_sbatch_script`` emits, array elements run as local subprocesses
+with the usual ``SLURM_*`` environment, and job states are kept in a
+SQLite database under ``FAKESLURM_STATE`` for ``sacct``/``squeue`` to
+answer from. Site limits are set with ``FAKESLURM_MAX_ARRAY_SIZE`` and
+``FAKESLURM_MAX_SUBMIT_JOBS``. ``--signal`` is sent ahead of the time limit
+and ``scontrol requeue`` puts jobs back in the queue. Jobs wait for their
+``--dependency`` and are cancelled if it can never be satisfied, as with
+``--kill-on-invalid-dep=yes``. Jobs of several ``--nodes`` run on the local
+machine too, and ``srun`` runs job steps there.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import os
+import shlex
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+
+from easysubmit.slurm import parse_slurm_array_arg, parse_slurm_time
+
+__all__ = [
+    "get_state_dir",
+    "install",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY,
+    array_job_id INTEGER NOT NULL,
+    array_task_id INTEGER,
+    name TEXT NOT NULL,
+    script TEXT NOT NULL,
+    workdir TEXT NOT NULL,
+    output TEXT,
+    error TEXT,
+    time_limit INTEGER,
+    throttle INTEGER,
+    signal TEXT,
+    dependency TEXT,
+    cpus INTEGER,
+    nodes INTEGER,
+    state TEXT NOT NULL,
+    pid INTEGER,
+    submit_time REAL NOT NULL,
+    start_time REAL,
+    end_time REAL,
+    exit_code INTEGER,
+    max_rss INTEGER,
+    total_cpu REAL,
+    restart_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_array_job_id ON jobs (array_job_id);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+"""
+
+# first job id handed out, like a freshly installed controller
+FIRST_JOB_ID = 1000
+
+POLL_INTERVAL = 0.05
+
+ACTIVE_STATES = ("PENDING", "RUNNING")
+
+# default MaxArraySize of slurm.conf
+DEFAULT_MAX_ARRAY_SIZE = 1001
+
+
+def get_state_dir() -> Path:
+    state_dir = os.environ.get("FAKESLURM_STATE")
+    if state_dir is None:
+        user = os.environ.get("USER", "user")
+        state_dir = Path(tempfile.gettempdir()) / f"fakeslurm-{user}"
+    state_dir = Path(state_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    return state_dir
+
+
+def get_max_running() -> int:
+    # number of job elements allowed to run at once on this "cluster"
+    if "FAKESLURM_MAX_RUNNING" in os.environ:
+        return int(os.environ["FAKESLURM_MAX_RUNNING"])
+    return os.cpu_count() or 1
+
+
+def get_max_array_size() -> int:
+    if "FAKESLURM_MAX_ARRAY_SIZE" in os.environ:
+        return int(os.environ["FAKESLURM_MAX_ARRAY_SIZE"])
+    return DEFAULT_MAX_ARRAY_SIZE
+
+
+def get_max_submit_jobs() -> int | None:
+    # number of pending and running job elements allowed per user
+    if "FAKESLURM_MAX_SUBMIT_JOBS" in os.environ:
+        return int(os.environ["FAKESLURM_MAX_SUBMIT_JOBS"])
+    return None
+
+
+@contextmanager
+def _connect(immediate: bool = False) -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(get_state_dir() / "jobs.db", timeout=60)
+    try:
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        if immediate:
+            conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def install(bin_dir: str | Path, state_dir: str | Path | None = None) -> Path:
+    """Write the fake SLURM executables to ``bin_dir``."""
+    bin_dir = Path(bin_dir)
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    state_dir = Path(state_dir) if state_dir else get_state_dir()
+    state_dir.mkdir(parents=True, exist_ok=True)
+    state = shlex.quote(str(state_dir.absolute()))
+    python = shlex.quote(sys.executable)
+    for command in COMMANDS:
+        path = bin_dir / command
+        shim = [
+            "#!/bin/sh",
+            f"export FAKESLURM_STATE={state}",
+            f'exec {python} -m easysubmit.fakeslurm {command} "$@"',
+            "",
+        ]
+        path.write_text("\n".join(shim), encoding="utf-8")
+        path.chmod(0o755)
+    return bin_dir
+
+
+def _format_elapsed(seconds: float | None) -> str:
+    if seconds is None:
+        return "00:00:00"
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    elapsed = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{days}-{elapsed}" if days else elapsed
+
+
+def _format_timestamp(value: float | None) -> str:
+    if value is None:
+        return "Unknown"
+    return datetime.datetime.fromtimestamp(value).isoformat(timespec="seconds")
+
+
+def _expand_filename(pattern: str, row: sqlite3.Row) -> str:
+    array_task_id = row["array_task_id"]
+    replacements = {
+        "%%": "%",
+        "%j": str(row["job_id"]),
+        "%A": str(row["array_job_id"]),
+        "%a": str(array_task_id if array_task_id is not None else 4294967294),
+        "%x": row["name"],
+        "%N": "localhost",
+        "%u": os.environ.get("USER", "user"),
+    }
+    result = []
+    i = 0
+    while i < len(pattern):
+        token = pattern[i : i + 2]
+        if token in replacements:
+            result.append(replacements[token])
+            i += 2
+        else:
+            result.append(pattern[i])
+            i += 1
+    return "".join(result)
+
+
+def _job_id(row: sqlite3.Row) -> str:
+    if row["array_task_id"] is None:
+        return str(row["job_id"])
+    return f"{row['array_job_id']}_{row['array_task_id']}"
+
+
+def _select_jobs(
+    conn: sqlite3.Connection, job_ids: Sequence[str] | None
+) -> list[sqlite3.Row]:
+    if not job_ids:
+        return conn.execute("SELECT * FROM jobs ORDER BY job_id").fetchall()
+    rows = {}
+    for job_id in job_ids:
+        if "_" in job_id:
+            array_job_id, array_task_id = job_id.split("_", 1)
+            query = "SELECT * FROM jobs WHERE array_job_id = ? AND array_task_id = ?"
+            params: tuple = (int(array_job_id), int(array_task_id))
+        else:
+            query = "SELECT * FROM jobs WHERE job_id = ? OR array_job_id = ?"
+            params = (int(job_id), int(job_id))
+        for row in conn.execute(query, params):
+            rows[row["job_id"]] = row
+    return [rows[key] for key in sorted(rows)]
+
+
+def _parse_options(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="sbatch", add_help=False)
+    parser.add_argument("-a", "--array")
+    parser.add_argument("-J", "--job-name")
+    parser.add_argument("-o", "--output")
+    parser.add_argument("-e", "--error")
+    parser.add_argument("-t", "--time")
+    parser.add_argument("-N", "--nodes", type=int)
+    parser.add_argument("-n", "--ntasks", type=int)
+    parser.add_argument("--ntasks-per-node", type=int)
+    parser.add_argument("-c", "--cpus-per-task", type=int)
+    parser.add_argument("-D", "--chdir")
+    parser.add_argument("-H", "--hold", action="store_true")
+    parser.add_argument("--signal")
+    parser.add_argument("-d", "--dependency")
+    options, _ = parser.parse_known_args(argv)
+    return options
+
+
+def _read_directives(script: str) -> list[str]:
+    directives = []
+    for line in script.splitlines():
+        if line.startswith("#!"):
+            continue
+        if not line.startswith("#"):
+            # sbatch stops looking for directives at the first command
+            if line.strip():
+                break
+            continue
+        if line.startswith("#SBATCH"):
+            directives.extend(shlex.split(line[len("#SBATCH") :]))
+    return directives
+
+
+def _print_error(message: str) -> None:
+    print(f"sbatch: error: {message}", file=sys.stderr)
+
+
+def sbatch(argv: Sequence[str]) -> int:
+    if not argv:
+        _print_error("no batch script given")
+        return 1
+    path = Path(argv[-1])
+    script = path.read_text(encoding="utf-8")
+    # command line options take precedence over the script directives
+    options = _parse_options([*_read_directives(script), *argv[:-1]])
+    array: list[int | None] = [None]
+    throttle = None
+    if options.array:
+        array_arg = options.array
+        if "%" in array_arg:
+            array_arg, throttle = array_arg.split("%", 1)
+            throttle = int(throttle)
+        array = list(parse_slurm_array_arg(array_arg))
+        if max(array) >= get_max_array_size():
+            _print_error("Batch job submission failed: Invalid job array specification")
+            return 1
+    cpus = options.cpus_per_task or options.ntasks_per_node or options.ntasks or 1
+    now = time.time()
+    max_submit_jobs = get_max_submit_jobs()
+    with _connect(immediate=True) as conn:
+        if max_submit_jobs is not None:
+            (queued,) = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state IN (?, ?)", ACTIVE_STATES
+            ).fetchone()
+            if queued + len(array) > max_submit_jobs:
+                _print_error("AssocMaxSubmitJobLimit")
+                _print_error(
+                    "Batch job submission failed: Job violates accounting/QOS"
+                    " policy (job submit limit, user's size and/or time limits)"
+                )
+                return 1
+        (last,) = conn.execute("SELECT MAX(job_id) FROM jobs").fetchone()
+        array_job_id = (last or FIRST_JOB_ID - 1) + 1
+        # slurm copies the script at submission, the original may be deleted
+        scripts = get_state_dir() / "scripts"
+        scripts.mkdir(exist_ok=True)
+        saved = scripts / f"{array_job_id}.sh"
+        saved.write_text(script, encoding="utf-8")
+        conn.executemany(
+            "INSERT INTO jobs (job_id, array_job_id, array_task_id, name, script,"
+            " workdir, output, error, time_limit, throttle, signal, dependency,"
+            " cpus, nodes, state, submit_time)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'PENDING', ?)",
+            [
+                (
+                    array_job_id + offset,
+                    array_job_id,
+                    array_task_id,
+                    options.job_name or path.name,
+                    str(saved),
+                    options.chdir or str(Path.cwd()),
+                    options.output,
+                    options.error,
+                    parse_slurm_time(options.time),
+                    throttle,
+                    options.signal,
+                    options.dependency,
+                    cpus,
+                    options.nodes or 1,
+                    now,
+                )
+                for offset, array_task_id in enumerate(array)
+            ],
+        )
+    if not options.hold:
+        _spawn_runner(array_job_id)
+    print(f"Submitted batch job {array_job_id}")
+    return 0
+
+
+def _spawn_runner(array_job_id: int) -> None:
+    subprocess.Popen(
+        [sys.executable, "-m", "easysubmit.fakeslurm", "_run", str(array_job_id)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def _parse_signal(value: str | None) -> tuple[bool, int, int] | None:
+    # "[B:]SIG[@lead]" to (batch shell only, signal number, seconds ahead)
+    if not value:
+        return None
+    batch_only = value.startswith("B:")
+    value = value[2:] if batch_only else value
+    name, _, lead = value.partition("@")
+    name = name.upper()
+    signum = (
+        int(name)
+        if name.isdigit()
+        else signal.Signals[name if name.startswith("SIG") else f"SIG{name}"]
+    )
+    return batch_only, int(signum), int(lead) if lead else 60
+
+
+def _start(row: sqlite3.Row) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update(
+        {
+            "SLURM_JOB_ID": str(row["job_id"]),
+            "SLURM_JOB_NAME": row["name"],
+            "SLURM_JOB_NODELIST": "localhost",
+            "SLURM_SUBMIT_DIR": row["workdir"],
+            "SLURM_CPUS_ON_NODE": str(row["cpus"]),
+            "SLURM_JOB_NUM_NODES": str(row["nodes"] or 1),
+            "SLURM_JOB_START_TIME": str(int(time.time())),
+            "SLURM_RESTART_COUNT": str(row["restart_count"]),
+        }
+    )
+    if row["time_limit"] is not None:
+        env["SLURM_JOB_END_TIME"] = str(int(time.time()) + row["time_limit"])
+    if row["array_task_id"] is not None:
+        env["SLURM_ARRAY_JOB_ID"] = str(row["array_job_id"])
+        env["SLURM_ARRAY_TASK_ID"] = str(row["array_task_id"])
+    default = "slurm-%A_%a.out" if row["array_task_id"] is not None else "slurm-%j.out"
+    output = Path(row["workdir"]) / _expand_filename(row["output"] or default, row)
+    error = output
+    if row["error"]:
+        error = Path(row["workdir"]) / _expand_filename(row["error"], row)
+    with open(output, "ab") as stdout, open(error, "ab") as stderr:
+        proc = subprocess.Popen(
+            ["/bin/sh", row["script"]],
+            cwd=row["workdir"],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=stdout,
+            stderr=stderr,
+            start_new_session=True,
+        )
+    return proc
+
+
+def _check_dependency(
+    conn: sqlite3.Connection, dependency: str | None, array_task_id: int | None
+) -> str:
+    # "ready", "waiting" or "never" (a job it needs failed), for the afterok,
+    # aftercorr and afterany types joined with ","
+    if not dependency:
+        return "ready"
+    result = "ready"
+    for part in dependency.split(","):
+        kind, _, job_ids = part.partition(":")
+        for job_id in job_ids.split(":"):
+            if kind == "aftercorr" and "_" not in job_id:
+                job_id = f"{job_id}_{array_task_id}"
+            for row in _select_jobs(conn, [job_id]):
+                if row["state"] in ACTIVE_STATES:
+                    result = "waiting"
+                elif row["state"] != "COMPLETED" and kind != "afterany":
+                    return "never"
+    return result
+
+
+def _kill(pid: int, sig: int = signal.SIGTERM) -> None:
+    try:
+        os.killpg(pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run(array_job_id: int) -> int:
+    # runs detached from sbatch and drives all elements of one submission
+    # the Popen objects are kept alive, otherwise the subprocess module may
+    # reap finished children before os.wait4 gets their resource usage
+    running: dict[int, tuple[subprocess.Popen, float | None]] = {}
+    # signals still to be sent: job id -> (time, batch shell only, signal)
+    signals: dict[int, tuple[float, bool, int]] = {}
+    while True:
+        started = []
+        with _connect(immediate=True) as conn:
+            (busy,) = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = 'RUNNING'"
+            ).fetchone()
+            slots = get_max_running() - busy
+            pending = conn.execute(
+                "SELECT * FROM jobs WHERE array_job_id = ? AND state = 'PENDING'"
+                " ORDER BY job_id",
+                (array_job_id,),
+            ).fetchall()
+            if not pending and not running:
+                return 0
+            if pending and pending[0]["throttle"]:
+                slots = min(slots, pending[0]["throttle"] - len(running))
+            # requeued elements start again once their process is gone
+            pending = [row for row in pending if row["job_id"] not in running]
+            ready = []
+            for row in pending:
+                dependency = _check_dependency(
+                    conn, row["dependency"], row["array_task_id"]
+                )
+                if dependency == "never":
+                    conn.execute(
+                        "UPDATE jobs SET state = 'CANCELLED', end_time = ?"
+                        " WHERE job_id = ?",
+                        (time.time(), row["job_id"]),
+                    )
+                elif dependency == "ready":
+                    ready.append(row)
+            pending = ready
+            for row in pending[: max(slots, 0)]:
+                proc = _start(row)
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET state = 'RUNNING', pid = ?, start_time = ?"
+                    " WHERE job_id = ?",
+                    (proc.pid, now, row["job_id"]),
+                )
+                deadline = None
+                if row["time_limit"] is not None:
+                    deadline = now + row["time_limit"]
+                running[row["job_id"]] = (proc, deadline)
+                started.append(row["job_id"])
+                spec = _parse_signal(row["signal"])
+                if spec is not None and deadline is not None:
+                    batch_only, signum, lead = spec
+                    signals[row["job_id"]] = (deadline - lead, batch_only, signum)
+        finished = {}
+        for job_id, (signal_time, batch_only, signum) in list(signals.items()):
+            if job_id not in running:
+                del signals[job_id]
+            elif time.time() >= signal_time:
+                del signals[job_id]
+                pid = running[job_id][0].pid
+                if batch_only:
+                    try:
+                        os.kill(pid, signum)
+                    except ProcessLookupError:
+                        pass
+                else:
+                    _kill(pid, signum)
+        for job_id, (proc, deadline) in list(running.items()):
+            wpid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+            if wpid == 0:
+                if deadline is not None and time.time() > deadline:
+                    _kill(proc.pid)
+                    _, status, usage = os.wait4(proc.pid, 0)
+                    proc.returncode = os.waitstatus_to_exitcode(status)
+                    finished[job_id] = ("TIMEOUT", status, usage)
+                continue
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            finished[job_id] = (None, status, usage)
+        if finished:
+            with _connect(immediate=True) as conn:
+                for job_id, (state, status, usage) in finished.items():
+                    del running[job_id]
+                    exit_code = os.waitstatus_to_exitcode(status)
+                    if state is None:
+                        state = "COMPLETED" if exit_code == 0 else "FAILED"
+                    conn.execute(
+                        "UPDATE jobs SET state = ?, end_time = ?, exit_code = ?,"
+                        " max_rss = ?, total_cpu = ? WHERE job_id = ?"
+                        " AND state = 'RUNNING'",
+                        (
+                            state,
+                            time.time(),
+                            exit_code,
+                            usage.ru_maxrss,
+                            usage.ru_utime + usage.ru_stime,
+                            job_id,
+                        ),
+                    )
+        if not started and not finished:
+            time.sleep(POLL_INTERVAL)
+
+
+SACCT_FIELDS = {
+    "jobid": _job_id,
+    "jobidraw": lambda row: str(row["job_id"]),
+    "jobname": lambda row: row["name"],
+    "state": lambda row: row["state"],
+    "exitcode": lambda row: f"{row['exit_code'] or 0}:0",
+    "elapsed": lambda row: _format_elapsed(
+        (row["end_time"] or time.time()) - row["start_time"]
+        if row["start_time"]
+        else None
+    ),
+    "timelimit": lambda row: _format_elapsed(row["time_limit"]),
+    "submit": lambda row: _format_timestamp(row["submit_time"]),
+    "start": lambda row: _format_timestamp(row["start_time"]),
+    "end": lambda row: _format_timestamp(row["end_time"]),
+    "nodelist": lambda row: "localhost" if row["start_time"] else "None assigned",
+    "alloccpus": lambda row: str(row["cpus"]),
+    "maxrss": lambda row: "",
+    "totalcpu": lambda row: _format_elapsed(row["total_cpu"] or 0),
+}
+
+# accounting of the batch step, only reported when steps are not excluded
+SACCT_STEP_FIELDS = {
+    **SACCT_FIELDS,
+    "jobid": lambda row: f"{_job_id(row)}.batch",
+    "jobidraw": lambda row: f"{row['job_id']}.batch",
+    "jobname": lambda row: "batch",
+    "maxrss": lambda row: f"{row['max_rss']}K" if row["max_rss"] else "",
+}
+
+
+def _print_table(
+    rows: list[list[str]], header: list[str], noheader: bool, parsable: bool
+) -> None:
+    if parsable:
+        lines = rows if noheader else [header, *rows]
+        for line in lines:
+            print("|".join(line))
+        return
+    widths = [max(10, len(column)) for column in header]
+    if not noheader:
+        print(" ".join(c.rjust(w) for c, w in zip(header, widths)))
+        print(" ".join("-" * w for w in widths))
+    for line in rows:
+        print(" ".join(c.rjust(w) for c, w in zip(line, widths)))
+
+
+def sacct(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(prog="sacct", add_help=False)
+    parser.add_argument("-j", "--jobs")
+    parser.add_argument("-X", "--allocations", action="store_true")
+    parser.add_argument("-n", "--noheader", action="store_true")
+    parser.add_argument("-P", "--parsable2", action="store_true")
+    parser.add_argument("-p", "--parsable", action="store_true")
+    parser.add_argument("-o", "--format", default="JobID,JobName,State,ExitCode")
+    options, _ = parser.parse_known_args(argv)
+    fields = [field.strip() for field in options.format.split(",") if field.strip()]
+    for field in fields:
+        if field.lower() not in SACCT_FIELDS:
+            msg = f"sacct: error: Invalid field requested: {field}"
+            print(msg, file=sys.stderr)
+            return 1
+    job_ids = options.jobs.split(",") if options.jobs else None
+    with _connect() as conn:
+        selected = _select_jobs(conn, job_ids)
+    rows = []
+    for row in selected:
+        rows.append([SACCT_FIELDS[f.lower()](row) for f in fields])
+        if not options.allocations and row["start_time"]:
+            rows.append([SACCT_STEP_FIELDS[f.lower()](row) for f in fields])
+    parsable = options.parsable2 or options.parsable
+    _print_table(rows, fields, options.noheader, parsable)
+    return 0
+
+
+SQUEUE_FIELDS = {
+    "i": _job_id,
+    "A": lambda row: str(row["job_id"]),
+    "F": lambda row: str(row["array_job_id"]),
+    "K": lambda row: str(row["array_task_id"] or "N/A"),
+    "j": lambda row: row["name"],
+    "T": lambda row: row["state"],
+    "t": lambda row: {"PENDING": "PD", "RUNNING": "R"}.get(row["state"], "CG"),
+    "M": SACCT_FIELDS["elapsed"],
+    "l": SACCT_FIELDS["timelimit"],
+    "N": lambda row: "localhost" if row["start_time"] else "",
+    "u": lambda row: os.environ.get("USER", "user"),
+}
+
+
+def _format_squeue_row(fmt: str, row: sqlite3.Row) -> str:
+    result = []
+    i = 0
+    while i < len(fmt):
+        if fmt[i] != "%":
+            result.append(fmt[i])
+            i += 1
+            continue
+        # skip field width specifications such as %.18i
+        j = i + 1
+        while j < len(fmt) and (fmt[j].isdigit() or fmt[j] == "."):
+            j += 1
+        code = fmt[j] if j < len(fmt) else ""
+        result.append(SQUEUE_FIELDS.get(code, lambda row: "")(row))
+        i = j + 1
+    return "".join(result)
+
+
+def squeue(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(prog="squeue", add_help=False)
+    parser.add_argument("-j", "--jobs")
+    parser.add_argument("-h", "--noheader", action="store_true")
+    parser.add_argument("-r", "--array", action="store_true")
+    # all jobs belong to the current user
+    parser.add_argument("-u", "--user")
+    parser.add_argument("-o", "--format", default="%.18i %.8j %.8T %.10M")
+    options, _ = parser.parse_known_args(argv)
+    job_ids = options.jobs.split(",") if options.jobs else None
+    with _connect() as conn:
+        selected = _select_jobs(conn, job_ids)
+    if not options.noheader:
+        print("JOBID NAME STATE TIME")
+    for row in selected:
+        if row["state"] not in ACTIVE_STATES:
+            continue
+        print(_format_squeue_row(options.format, row))
+    return 0
+
+
+def scancel(argv: Sequence[str]) -> int:
+    job_ids = [arg for arg in argv if not arg.startswith("-")]
+    with _connect(immediate=True) as conn:
+        rows = _select_jobs(conn, job_ids)
+        for row in rows:
+            if row["state"] not in ACTIVE_STATES:
+                continue
+            conn.execute(
+                "UPDATE jobs SET state = 'CANCELLED', end_time = ? WHERE job_id = ?",
+                (time.time(), row["job_id"]),
+            )
+            if row["pid"]:
+                _kill(row["pid"])
+    return 0
+
+
+def scontrol(argv: Sequence[str]) -> int:
+    if argv[:1] == ["requeue"]:
+        return _requeue(",".join(argv[1:]).split(","))
+    if list(argv[:2]) != ["show", "config"]:
+        msg = "scontrol: error: only 'show config' and 'requeue' are supported"
+        print(msg, file=sys.stderr)
+        return 1
+    max_submit_jobs = get_max_submit_jobs()
+    config = {
+        "ClusterName": "fakeslurm",
+        "MaxArraySize": get_max_array_size(),
+        "MaxJobCount": max_submit_jobs or 10000,
+    }
+    for key, value in config.items():
+        print(f"{key:<24}= {value}")
+    return 0
+
+
+def _requeue(job_ids: Sequence[str]) -> int:
+    # running jobs are killed and pending again, finished ones just pending
+    pids, runners = [], set()
+    with _connect(immediate=True) as conn:
+        for row in _select_jobs(conn, [job_id for job_id in job_ids if job_id]):
+            if row["state"] == "PENDING":
+                continue
+            conn.execute(
+                "UPDATE jobs SET state = 'PENDING', pid = NULL, start_time = NULL,"
+                " end_time = NULL, exit_code = NULL,"
+                " restart_count = restart_count + 1 WHERE job_id = ?",
+                (row["job_id"],),
+            )
+            if row["state"] == "RUNNING":
+                # its runner starts it again once the process is gone
+                pids.append(row["pid"])
+            else:
+                runners.add(row["array_job_id"])
+    # after the commit, the caller may be one of the processes killed
+    for array_job_id in runners:
+        _spawn_runner(array_job_id)
+    for pid in pids:
+        _kill(pid)
+    return 0
+
+
+def sacctmgr(argv: Sequence[str]) -> int:
+    # answers "show assoc|qos ... format=MaxSubmit|MaxSubmitPU" with the limit
+    if "show" not in argv:
+        print("sacctmgr: error: only 'show' is supported", file=sys.stderr)
+        return 1
+    max_submit_jobs = get_max_submit_jobs()
+    print("" if max_submit_jobs is None else max_submit_jobs)
+    return 0
+
+
+def srun(argv: Sequence[str]) -> int:
+    # runs the step in place, on the local machine; options must be given as
+    # a single argument (e.g., --nodes=1) and are ignored
+    args = list(argv)
+    while args and args[0].startswith("-"):
+        args.pop(0)
+    if not args:
+        print("srun: error: no command given", file=sys.stderr)
+        return 1
+    os.execvp(args[0], args)
+
+
+COMMANDS = {
+    "sbatch": sbatch,
+    "sacct": sacct,
+    "squeue": squeue,
+    "scancel": scancel,
+    "scontrol": scontrol,
+    "sacctmgr": sacctmgr,
+    "srun": srun,
+}
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv:
+        print(f"usage: fakeslurm {{install,{','.join(COMMANDS)}}} ...")
+        return 2
+    command, *args = argv
+    if command == "install":
+        if not args:
+            print("usage: fakeslurm install BIN_DIR [STATE_DIR]")
+            return 2
+        install(*args[:2])
+        return 0
+    if command == "_run":
+        return run(int(args[0]))
+    return COMMANDS[command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
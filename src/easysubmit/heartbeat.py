@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from typing_extensions import Self
+
+from easysubmit.entities import Cluster
+from easysubmit.store import TaskStore
+
+__all__ = [
+    "Heartbeat",
+    "get_lost_tasks",
+    "recover_lost_tasks",
+    "set_progress",
+]
+
+# seconds between two heartbeats of a running task
+HEARTBEAT_INTERVAL = 60.0
+
+# a running task without a heartbeat for this long is considered lost
+STALE_AFTER = 10 * HEARTBEAT_INTERVAL
+
+# lost tasks are retried at once, then after RETRY_BACKOFF, 2x, 4x, ... that
+RETRY_BACKOFF = 300.0
+
+DEFAULT_MAX_RETRIES = 3
+
+# {fingerprint: {"attempts": ..., "retry_at": ..., "job_id": ...}}, retry_at
+# is None once the task was submitted again
+LOST_TASKS_KEY = "lost-tasks"
+
+# heartbeat of the task running in this process, see `set_progress`
+_current: Heartbeat | None = None
+
+
+class Heartbeat:
+    """Records that a task is still running, every ``interval`` seconds.
+
+    Used as a context manager around running a task. The heartbeat is
+    removed when the task finishes, so a heartbeat that is left behind
+    belongs to a worker that died.
+    """
+
+    def __init__(
+        self,
+        store: TaskStore,
+        fingerprint: str,
+        job_id: str,
+        interval: float = HEARTBEAT_INTERVAL,
+    ):
+        self.store = store
+        self.fingerprint = fingerprint
+        self.job_id = job_id
+        self.interval = interval
+        self.progress: Any = None
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def beat(self) -> None:
+        self.store.set_heartbeat(self.fingerprint, self.job_id, self.progress)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.beat()
+            except (OSError, sqlite3.Error):
+                # e.g., the store is briefly unavailable, try again next time
+                continue
+
+    def __enter__(self) -> Self:
+        global _current
+        self.beat()
+        self._thread = threading.Thread(
+            target=self._run, name="easysubmit-heartbeat", daemon=True
+        )
+        self._thread.start()
+        _current = self
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        global _current
+        _current = None
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.store.delete_heartbeat(self.fingerprint)
+
+
+def set_progress(progress: Any) -> None:
+    # report the progress of the running task (any json value) with its
+    # next heartbeat; does nothing outside of a worker
+    if _current is not None:
+        _current.progress = progress
+
+
+def get_lost_tasks(store: TaskStore) -> dict[str, dict[str, Any]]:
+    return store.get_value(LOST_TASKS_KEY, {})
+
+
+def recover_lost_tasks(
+    cluster: Cluster,
+    store: TaskStore,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    stale_after: float = STALE_AFTER,
+    backoff: float = RETRY_BACKOFF,
+    max_count: int | None = None,
+) -> list[str]:
+    """Release the claims of running tasks whose worker is gone.
+
+    A task is lost when its heartbeat is older than ``stale_after`` seconds
+    or its job already finished (e.g., it was cancelled, its node failed or
+    it ran out of time). Lost tasks are queued again up to ``max_retries``
+    times, after which their state is "lost". Returns (at most
+    ``max_count`` of) the lost tasks that are due to be submitted again;
+    until then (during the backoff, or if more than ``max_count`` are due)
+    they are not submitted even if their configs are scheduled again.
+    """
+    now = time.time()
+    lost = get_lost_tasks(store)
+    running = {}
+    for fingerprint in store.iter_heartbeats():
+        heartbeat = store.get_heartbeat(fingerprint)
+        if heartbeat is None:
+            continue
+        if store.get_state(fingerprint) != "running":
+            # finished while its heartbeat was being removed
+            store.delete_heartbeat(fingerprint)
+            continue
+        running[fingerprint] = heartbeat
+    job_ids = sorted({heartbeat["job_id"] for heartbeat in running.values()})
+    # jobs that finished, whatever the reason
+    finished = cluster.get_usage(job_ids) if job_ids else {}
+    for fingerprint, heartbeat in running.items():
+        stale = now - heartbeat["time"] > stale_after
+        if not stale and heartbeat["job_id"] not in finished:
+            continue
+        entry = lost.setdefault(fingerprint, {"attempts": 0})
+        entry["attempts"] += 1
+        entry["job_id"] = heartbeat["job_id"]
+        # the first retry is immediate
+        delay = (
+            0.0 if entry["attempts"] == 1 else backoff * 2 ** (entry["attempts"] - 2)
+        )
+        entry["retry_at"] = now + delay
+        store.delete_heartbeat(fingerprint)
+        store.release(fingerprint)
+        retry = entry["attempts"] <= max_retries
+        store.set_state(fingerprint, "queued" if retry else "lost")
+    due = []
+    for fingerprint, entry in list(lost.items()):
+        state = store.get_state(fingerprint)
+        if state == "completed":
+            del lost[fingerprint]
+        elif (
+            state == "queued"
+            and entry["retry_at"] is not None
+            and entry["retry_at"] <= now
+            and (max_count is None or len(due) < max_count)
+        ):
+            entry["retry_at"] = None
+            due.append(fingerprint)
+    store.set_value(LOST_TASKS_KEY, lost)
+    return due
@@ -3,6 +3,7 @@ from __future__ import annotations
 import base64
 import hashlib
 import json
+import math
 import sys
 from contextlib import contextmanager, redirect_stderr, redirect_stdout
 from pathlib import Path
@@ -65,6 +66,7 @@ def get_fingerprint(obj: Any) -> str:
         sort_keys=True,  # Ensures key order consistency
         separators=(",", ":"),  # Ensures compact, consistent spacing
         ensure_ascii=False,  # Allows unicode characters
+        check_circular=False,  # Configs are trees, skip the cycle bookkeeping
     )
 
     # 2. Encode the string to bytes (required by hash functions)
@@ -83,3 +85,10 @@ def get_fingerprint(obj: Any) -> str:
 
     # 5. Decode the Base64 bytes into a string
     return base64_encoded.decode("utf-8").rstrip("=")
+
+
+def get_percentile(values: list[float], percentile: float) -> float:
+    # nearest-rank percentile
+    values = sorted(values)
+    rank = math.ceil(percentile / 100 * len(values))
+    return values[max(rank, 1) - 1]
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import getpass
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Iterator, Mapping
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from easysubmit.helpers import get_fingerprint
+from easysubmit.slurm import parse_slurm_memory
+
+try:
+    import fcntl
+except ImportError:  # e.g., on Windows
+    fcntl = None
+
+__all__ = [
+    "InputCache",
+    "default_input_cache",
+    "get_input_cache_dir",
+    "get_input_key",
+]
+
+# directory of the cache on node-local disk, e.g., /scratch/$USER/inputs
+INPUT_CACHE_ENV = "EASYSUBMIT_INPUT_CACHE"
+
+# size limit of the cache, in bytes or with a unit, e.g., "200G"
+INPUT_CACHE_SIZE_ENV = "EASYSUBMIT_INPUT_CACHE_SIZE"
+
+
+def get_input_cache_dir() -> Path:
+    if os.environ.get(INPUT_CACHE_ENV):
+        return Path(os.environ[INPUT_CACHE_ENV])
+    # shared by the jobs on a node, so not the per-job $TMPDIR of some sites
+    tmp = Path("/tmp") if os.name == "posix" else Path(tempfile.gettempdir())
+    return tmp / f"easysubmit-inputs-{getpass.getuser()}"
+
+
+def _lock(fd: int, shared: bool = False, blocking: bool = True) -> None:
+    # raises BlockingIOError if not `blocking` and the lock is held; without
+    # fcntl (e.g., on Windows) nothing is locked, so tasks starting together
+    # may copy an input twice and `evict` may remove inputs in use
+    if fcntl is None:
+        return
+    operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    if not blocking:
+        operation |= fcntl.LOCK_NB
+    fcntl.flock(fd, operation)
+
+
+def get_input_key(path: str | Path) -> str:
+    """Identify a file or directory without reading its contents.
+
+    The key is the fingerprint of the path and of the size and modification
+    time of each file, so replacing or changing any file of the input gives
+    it a new key (and a new copy), while its contents are only read once per
+    node, when they are copied.
+    """
+    path = Path(path).absolute()
+    files = []
+    if path.is_dir():
+        for root, _, names in os.walk(path, followlinks=True):
+            for name in names:
+                file = Path(root, name)
+                stat = file.stat()
+                files.append(
+                    [str(file.relative_to(path)), stat.st_size, stat.st_mtime_ns]
+                )
+        files.sort()
+    else:
+        stat = path.stat()
+        files.append(["", stat.st_size, stat.st_mtime_ns])
+    return get_fingerprint({"path": str(path), "files": files})
+
+
+def _get_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+class InputCache:
+    """Node-local copies of the input files and directories of tasks.
+
+    Each input is copied once into ``path/<key>/``, with the key from
+    `get_input_key` (computed once per input by each process), so tasks on
+    the same node share one copy. Tasks hold a
+    shared lock on the entries they use; copying an entry and `evict` take it
+    exclusively, so an entry is neither copied twice nor removed while in
+    use. ``evict`` removes the least recently used entries until the cache is
+    no larger than ``max_size`` bytes (by default $EASYSUBMIT_INPUT_CACHE_SIZE
+    or half the size of the filesystem of the cache).
+    """
+
+    def __init__(self, path: str | Path | None = None, max_size: int | None = None):
+        self.path = Path(path) if path is not None else get_input_cache_dir()
+        self.max_size = max_size
+        # keys of the inputs staged by this process (a worker and its tasks
+        # run in one job), inputs are not expected to change while it runs
+        self._keys: dict[Path, str] = {}
+
+    def get_max_size(self) -> int:
+        if self.max_size is not None:
+            return self.max_size
+        max_size = parse_slurm_memory(os.environ.get(INPUT_CACHE_SIZE_ENV))
+        if max_size is not None:
+            return max_size
+        return shutil.disk_usage(self.path).total // 2
+
+    def _open_lock(self, key: str) -> int:
+        # lock files are never removed, or two processes could each lock a
+        # different file of the same entry
+        return os.open(self.path / f"{key}.lock", os.O_CREAT | os.O_RDWR, 0o600)
+
+    def _copy(self, source: Path, key: str) -> None:
+        entry = self.path / key
+        # copied beside the entry and renamed, a copy cut short is never used
+        tmp = self.path / f".{key}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.rmtree(entry, ignore_errors=True)
+        tmp.mkdir()
+        try:
+            if source.is_dir():
+                shutil.copytree(source, tmp / source.name)
+            else:
+                shutil.copy2(source, tmp / source.name)
+            tmp.rename(entry)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        # an entry is complete once it has its metadata, whose modification
+        # time is when the entry was last used
+        meta = self.path / f"{key}.json"
+        data = {"source": str(source), "size": _get_size(entry)}
+        tmp_meta = meta.with_name(f".{meta.name}.{os.getpid()}")
+        tmp_meta.write_text(json.dumps(data), encoding="utf-8")
+        tmp_meta.replace(meta)
+
+    def _stage(self, source: str | Path, stack: ExitStack) -> Path:
+        source = Path(source).absolute()
+        key = self._keys.get(source)
+        if key is None:
+            key = self._keys[source] = get_input_key(source)
+        meta = self.path / f"{key}.json"
+        fd = self._open_lock(key)
+        # closing the file releases the lock
+        stack.callback(os.close, fd)
+        while True:
+            _lock(fd, shared=True)
+            if meta.exists():
+                os.utime(meta)
+                return self.path / key / source.name
+            _lock(fd)
+            if not meta.exists():
+                self._copy(source, key)
+            # shared again, `evict` may remove the entry in between, in which
+            # case it is copied once more
+
+    @contextmanager
+    def stage(self, inputs: Mapping[str, str | Path]) -> Iterator[dict[str, Path]]:
+        """Local copies of ``inputs`` (name to path), kept until exit."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with ExitStack() as stack:
+            paths = {name: self._stage(path, stack) for name, path in inputs.items()}
+            self.evict()
+            yield paths
+
+    def evict(self) -> int:
+        # returns the number of entries removed
+        if not self.path.exists():
+            return 0
+        entries = []
+        for meta in self.path.glob("*.json"):
+            try:
+                mtime = meta.stat().st_mtime
+                size = json.loads(meta.read_text(encoding="utf-8"))["size"]
+            except (FileNotFoundError, ValueError, KeyError):
+                continue
+            entries.append((mtime, size, meta.stem))
+        entries.sort()
+        removed = 0
+        size = sum(entry[1] for entry in entries)
+        max_size = self.get_max_size()
+        for _, entry_size, key in entries:
+            if size <= max_size:
+                # entries are least recently used first, the rest fit
+                break
+            fd = self._open_lock(key)
+            try:
+                try:
+                    _lock(fd, blocking=False)
+                except BlockingIOError:
+                    continue  # in use
+                (self.path / f"{key}.json").unlink(missing_ok=True)
+                shutil.rmtree(self.path / key, ignore_errors=True)
+            finally:
+                os.close(fd)
+            size -= entry_size
+            removed += 1
+        return removed
+
+
+# used by workers, see `TaskConfig.get_inputs`
+default_input_cache = InputCache()
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import itertools
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from typing import Callable
+
+from easysubmit.entities import Cluster, Job
+from easysubmit.slurm import (
+    collapse_slurm_states,
+    parse_slurm_array_arg,
+    parse_slurm_time,
+)
+
+__all__ = [
+    "LocalCluster",
+    "LocalJob",
+    "get_local_array_job_id",
+    "get_local_array_task_id",
+    "get_local_job_id",
+]
+
+_job_counter = itertools.count(1)
+
+
+def get_local_job_id() -> str | None:
+    # EASYSUBMIT_JOB_ID will be set to the id of the current local job.
+    if "EASYSUBMIT_JOB_ID" not in os.environ:
+        return None
+    return os.environ["EASYSUBMIT_JOB_ID"].strip()
+
+
+def get_local_array_job_id() -> str | None:
+    # EASYSUBMIT_ARRAY_JOB_ID will be set to the id of the local job array.
+    if "EASYSUBMIT_ARRAY_JOB_ID" not in os.environ:
+        return None
+    return os.environ["EASYSUBMIT_ARRAY_JOB_ID"].strip()
+
+
+def get_local_array_task_id() -> int | None:
+    # EASYSUBMIT_ARRAY_TASK_ID will be set to the job array index value.
+    if "EASYSUBMIT_ARRAY_TASK_ID" not in os.environ:
+        return None
+    return int(os.environ["EASYSUBMIT_ARRAY_TASK_ID"])
+
+
+def get_local_job_end_time() -> float | None:
+    # EASYSUBMIT_JOB_END_TIME will be set to the UNIX timestamp of the job end.
+    if "EASYSUBMIT_JOB_END_TIME" not in os.environ:
+        return None
+    return float(os.environ["EASYSUBMIT_JOB_END_TIME"])
+
+
+def _expand_vars(value: str, variables: dict[str, str]) -> str:
+    # substitute $VAR and ${VAR} like the shell running a batch script would
+    def replace(match: re.Match) -> str:
+        name = match.group(1) or match.group(2)
+        return variables.get(name, match.group(0))
+
+    return re.sub(r"\$\{(\w+)\}|\$(\w+)", replace, value)
+
+
+def _expand_filename(pattern: str, job_id: str, array_job_id: str, index: int):
+    # subset of the sbatch filename patterns
+    return (
+        pattern.replace("%j", job_id)
+        .replace("%A", array_job_id)
+        .replace("%a", str(index))
+    )
+
+
+class LocalJob(Job):
+    def __init__(self, id: int | str, cluster: LocalCluster | None = None):
+        super().__init__(id)
+        self.cluster = cluster
+
+    def get_status(self) -> str:
+        if self.cluster is None:
+            return "UNKNOWN"
+        return collapse_slurm_states(self.get_array_states().values())
+
+    def get_array_states(self) -> dict[str, str]:
+        # state of each array element (or of the job itself) keyed by job id
+        if self.cluster is None:
+            return {}
+        return self.cluster._get_states(self.id)
+
+    def cancel(self):
+        if self.cluster is not None:
+            self.cluster._cancel(self.id)
+
+    def __repr__(self):
+        return f"LocalJob(job_id={self.id})"
+
+
+class LocalCluster(Cluster):
+    """Run scheduled job arrays as subprocesses on the local machine.
+
+    Array elements are started with the same environment contract as SLURM
+    (``EASYSUBMIT_JOB_ID``, ``EASYSUBMIT_ARRAY_JOB_ID`` and
+    ``EASYSUBMIT_ARRAY_TASK_ID``), with at most ``max_workers`` elements
+    running at a time across all arrays scheduled on this cluster. The
+    ``afterok``, ``aftercorr`` and ``afterany`` dependencies on jobs of the
+    same cluster are supported; elements whose dependency fails are
+    cancelled.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        time: str | None = None,
+        output: str | None = None,
+        error: str | None = None,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.time = time
+        self.output = output
+        self.error = error
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # array job id -> element job ids
+        self._arrays: dict[str, list[str]] = {}
+        self._futures: dict[str, Future] = {}
+        self._processes: dict[str, subprocess.Popen] = {}
+        self._states: dict[str, str] = {}
+
+    def get_job(self, id: str | None = None) -> Job:
+        if id is None:
+            id = get_local_job_id()
+        return LocalJob(id, self)
+
+    def get_array_job(self, id: str | None = None) -> Job:
+        if id is None:
+            id = get_local_array_job_id()
+        return LocalJob(id, self)
+
+    def get_array_task_id(self) -> int | None:
+        return get_local_array_task_id()
+
+    def get_deadline(self) -> float | None:
+        return get_local_job_end_time()
+
+    def get_worker_args(self) -> list[str] | None:
+        if type(self) is not LocalCluster:
+            return None  # subclasses may behave differently in the worker
+        # workers read everything they need from the environment
+        return ["--cluster=local"]
+
+    def schedule(
+        self, __args: Sequence[str], __format_hook: Callable | None = None, **kwargs
+    ) -> LocalJob:
+        array = kwargs.get("array")
+        indices = parse_slurm_array_arg(array) if array is not None else [None]
+        time_limit = parse_slurm_time(kwargs.get("time", self.time))
+        dependency = kwargs.get("dependency")
+        if __format_hook is not None:
+            __args = [__format_hook(arg) for arg in __args]
+        args = list(__args)
+        if args and args[0] == "python":
+            # use the interpreter of the scheduling process like the venv would
+            args[0] = sys.executable
+        array_job_id = f"{os.getpid()}{next(_job_counter):04d}"
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="easysubmit-local",
+                )
+            job_ids = []
+            for index in indices:
+                if index is None:
+                    job_id = array_job_id
+                else:
+                    job_id = f"{array_job_id}_{index}"
+                self._states[job_id] = "PENDING"
+                self._futures[job_id] = self._executor.submit(
+                    self._run,
+                    job_id,
+                    array_job_id,
+                    index,
+                    args,
+                    time_limit,
+                    __format_hook,
+                    dependency,
+                )
+                job_ids.append(job_id)
+            self._arrays[array_job_id] = job_ids
+        return LocalJob(array_job_id, self)
+
+    def _run(
+        self,
+        job_id: str,
+        array_job_id: str,
+        index: int | None,
+        args: list[str],
+        time_limit: int | None,
+        format_hook: Callable | None = None,
+        dependency: str | None = None,
+    ) -> int | None:
+        # jobs are started in submission order, so the jobs this one depends
+        # on are already running (or done) and waiting here cannot deadlock
+        if dependency and not self._wait_for_dependency(dependency, index):
+            with self._lock:
+                if self._states[job_id] == "PENDING":
+                    self._states[job_id] = "CANCELLED"
+            return None
+        with self._lock:
+            if self._states[job_id] == "CANCELLED":
+                return None
+            env = dict(os.environ)
+            env["EASYSUBMIT_JOB_ID"] = job_id
+            env["EASYSUBMIT_ARRAY_JOB_ID"] = array_job_id
+            if index is not None:
+                env["EASYSUBMIT_ARRAY_TASK_ID"] = str(index)
+            if time_limit is not None:
+                env["EASYSUBMIT_JOB_END_TIME"] = str(time.time() + time_limit)
+            # what the batch script records on SLURM, see `easysubmit.timing`
+            env["EASYSUBMIT_START_TIME"] = str(time.time())
+            # commands written for sbatch refer to the SLURM variables
+            variables = {
+                **env,
+                "SLURM_JOB_ID": job_id,
+                "SLURM_ARRAY_JOB_ID": array_job_id,
+                "SLURM_ARRAY_TASK_ID": str(index),
+            }
+            # the process keeps its own copies of the file descriptors
+            with ExitStack() as stack:
+                files = []
+                for pattern in (self.output, self.error):
+                    if pattern is None:
+                        files.append(None)
+                        continue
+                    if format_hook is not None:
+                        pattern = format_hook(pattern)
+                    path = _expand_filename(pattern, job_id, array_job_id, index or 0)
+                    files.append(stack.enter_context(open(path, "w", encoding="utf-8")))
+                proc = subprocess.Popen(
+                    [_expand_vars(arg, variables) for arg in args],
+                    env=env,
+                    stdout=files[0],
+                    stderr=files[1],
+                    start_new_session=True,
+                )
+            self._processes[job_id] = proc
+            self._states[job_id] = "RUNNING"
+        try:
+            returncode = proc.wait(timeout=time_limit)
+        except subprocess.TimeoutExpired:
+            self._kill(proc)
+            with self._lock:
+                self._states[job_id] = "TIMEOUT"
+            return None
+        with self._lock:
+            if self._states[job_id] != "CANCELLED":
+                self._states[job_id] = "COMPLETED" if returncode == 0 else "FAILED"
+        return returncode
+
+    @staticmethod
+    def _kill(proc: subprocess.Popen) -> None:
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+
+    def _wait_for_dependency(self, dependency: str, index: int | None) -> bool:
+        # whether the dependency was satisfied, e.g., "afterok:ID:ID"
+        for part in dependency.split(","):
+            kind, _, ids = part.partition(":")
+            job_ids = []
+            with self._lock:
+                for id in ids.split(":"):
+                    if kind == "aftercorr" and "_" not in id:
+                        id = f"{id}_{index}"
+                    job_ids.extend(self._arrays.get(id, [id]))
+                futures = [self._futures[i] for i in job_ids if i in self._futures]
+            wait(futures)
+            with self._lock:
+                states = [self._states.get(i, "UNKNOWN") for i in job_ids]
+            # jobs this cluster does not know about are taken as done
+            if kind != "afterany" and any(
+                state not in {"COMPLETED", "UNKNOWN"} for state in states
+            ):
+                return False
+        return True
+
+    def _get_states(self, id: str) -> dict[str, str]:
+        with self._lock:
+            job_ids = self._arrays.get(id, [id])
+            return {job_id: self._states.get(job_id, "UNKNOWN") for job_id in job_ids}
+
+    def _cancel(self, id: str) -> None:
+        with self._lock:
+            job_ids = self._arrays.get(id, [id])
+            procs = []
+            for job_id in job_ids:
+                if self._states.get(job_id) not in {"PENDING", "RUNNING"}:
+                    continue
+                self._states[job_id] = "CANCELLED"
+                self._futures[job_id].cancel()
+                if job_id in self._processes:
+                    procs.append(self._processes[job_id])
+        for proc in procs:
+            self._kill(proc)
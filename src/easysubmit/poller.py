@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import subprocess
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
+
+from easysubmit.entities import Job, JobGroup, collapse_job_statuses
+
+__all__ = [
+    "JobPoller",
+    "default_job_poller",
+]
+
+# statuses a job does not leave anymore
+TERMINAL_JOB_STATUSES = frozenset({"COMPLETED", "FAILED", "CANCELLED"})
+
+DEFAULT_MIN_POLL_INTERVAL = 5.0
+
+DEFAULT_MAX_POLL_INTERVAL = 60.0
+
+
+def _iter_leaf_jobs(job: Job) -> Iterator[Job]:
+    if isinstance(job, JobGroup):
+        for member in job:
+            yield from _iter_leaf_jobs(member)
+    else:
+        yield job
+
+
+def _get_statuses(jobs: Sequence[Job]) -> dict[str, str]:
+    # one `get_statuses` call per job class
+    groups: dict[type[Job], list[Job]] = {}
+    for job in jobs:
+        groups.setdefault(type(job), []).append(job)
+    statuses = {}
+    for cls, group in groups.items():
+        statuses.update(cls.get_statuses(group))
+    return statuses
+
+
+class JobPoller:
+    """Polls the status of all awaited jobs together.
+
+    Each tick queries every job that is still awaited at once (see
+    ``Job.get_statuses``) in a worker thread, every ``min_interval``
+    seconds at first and ``backoff`` times slower up to ``max_interval``
+    while no status changes. New jobs to wait for and any status change
+    bring it back to ``min_interval``.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = DEFAULT_MIN_POLL_INTERVAL,
+        max_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+        backoff: float = 2.0,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # awaited job, its leaf jobs and the future set to its final status
+        self._waiters: list[tuple[Job, list[Job], asyncio.Future]] = []
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def _add(self, job: Job) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # state of an event loop that is gone, e.g., an earlier asyncio.run
+            self._loop = loop
+            self._waiters = []
+            self._wake = asyncio.Event()
+            self._task = None
+        future = loop.create_future()
+        self._waiters.append((job, list(_iter_leaf_jobs(job)), future))
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        self._wake.set()
+        return future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        interval = self.min_interval
+        previous: dict[str, str] = {}
+        while True:
+            self._waiters = [w for w in self._waiters if not w[2].done()]
+            if not self._waiters:
+                return
+            self._wake.clear()
+            leaves = {leaf.id: leaf for _, ls, _ in self._waiters for leaf in ls}
+            last = loop.time()
+            try:
+                statuses = await loop.run_in_executor(
+                    None, _get_statuses, list(leaves.values())
+                )
+            except (OSError, subprocess.CalledProcessError) as e:
+                for _, _, future in self._waiters:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for job, ls, future in self._waiters:
+                job_statuses = [statuses.get(leaf.id, "UNKNOWN") for leaf in ls]
+                if future.done() or not all(
+                    status in TERMINAL_JOB_STATUSES for status in job_statuses
+                ):
+                    continue
+                future.set_result(collapse_job_statuses(job_statuses))
+            if any(previous.get(job_id) != s for job_id, s in statuses.items()):
+                interval = self.min_interval
+            else:
+                interval = min(interval * self.backoff, self.max_interval)
+            previous = statuses
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                continue
+            # new jobs are polled soon, yet no more often than min_interval
+            interval = self.min_interval
+            await asyncio.sleep(max(last + self.min_interval - loop.time(), 0))
+
+    async def wait(self, job: Job, timeout: float | None = None) -> str:
+        return await asyncio.wait_for(self._add(job), timeout)
+
+    async def as_completed(
+        self, jobs: Iterable[Job], timeout: float | None = None
+    ) -> AsyncIterator[Job]:
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        pending = {self._add(job): job for job in jobs}
+        try:
+            while pending:
+                remaining = None if deadline is None else deadline - loop.time()
+                done, _ = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError
+                # in the order they were given
+                for future in [f for f in pending if f in done]:
+                    job = pending.pop(future)
+                    future.result()  # raises if polling failed
+                    yield job
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+default_job_poller = JobPoller()
@@ -1,25 +1,39 @@
 from __future__ import annotations
 
-from collections.abc import Generator
+import argparse
+import cProfile
+import importlib
+import importlib.util
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections.abc import Generator, Sequence
 from contextlib import contextmanager
-
-try:
-    from scalene import scalene_profiler
-except ImportError:
-    scalene_profiler = None  # type: ignore[assignment]
+from pathlib import Path
+from typing import Any, ClassVar
 
 SCALENE_DEPENDENCY_MISSING_ERROR = "Scalene profiler is not installed. Please install it with `pip install easysubmit[scalene]`."
 
 
 def is_profiler_avilable() -> bool:
     """Check if the Scalene profiler is available."""
-    return scalene_profiler is not None
+    return importlib.util.find_spec("scalene") is not None
+
+
+def _get_scalene_profiler() -> Any:
+    # imported on first use, so workers that do not profile never load it
+    try:
+        return importlib.import_module("scalene.scalene_profiler")
+    except ImportError as e:
+        raise ImportError(SCALENE_DEPENDENCY_MISSING_ERROR) from e
 
 
 @contextmanager
 def enable_profiling() -> Generator[None, None, None]:
-    if scalene_profiler is None:
-        raise ImportError(SCALENE_DEPENDENCY_MISSING_ERROR)
+    scalene_profiler = _get_scalene_profiler()
     scalene_profiler.start()
     try:
         yield
@@ -28,12 +42,336 @@ def enable_profiling() -> Generator[None, None, None]:
 
 
 def start_profiling() -> None:
-    if scalene_profiler is None:
-        raise ImportError(SCALENE_DEPENDENCY_MISSING_ERROR)
-    scalene_profiler.start()
+    _get_scalene_profiler().start()
 
 
 def stop_profiling() -> None:
-    if scalene_profiler is None:
-        raise ImportError(SCALENE_DEPENDENCY_MISSING_ERROR)
-    scalene_profiler.stop()
+    _get_scalene_profiler().stop()
+
+
+# backends of `schedule(..., profiler=...)`: scalene wraps the whole worker
+# (one html report per job), the others profile the tasks in the worker and
+# write json that `merge_profiles` combines across the jobs of a run
+PROFILER_BACKENDS = ("scalene", "cprofile", "sample")
+
+# profiles of run {run_id} are in base_dir/profiles/{run_id}, one per job
+PROFILE_DIR = "profiles"
+
+DEFAULT_SAMPLING_INTERVAL = 0.005
+
+# allocation sites kept per job
+MEMORY_TOP_LINES = 50
+
+
+def get_profile_dir(base_dir: str | Path, run_id: str) -> Path:
+    return Path(base_dir) / PROFILE_DIR / run_id
+
+
+def _format_function(filename: str, lineno: int, name: str) -> str:
+    return f"{filename}:{lineno}({name})"
+
+
+class TaskProfiler:
+    """Profiles the tasks run by a worker, all of them into one profile.
+
+    With ``memory``, allocations are traced with tracemalloc: the peak of
+    each task and the allocation sites still holding memory when a task
+    returns (e.g., caches and leaks) are recorded.
+    """
+
+    backend: ClassVar[str]
+
+    def __init__(self, cpu: bool = True, memory: bool = False):
+        self.cpu = cpu
+        self.memory = memory
+        self.tasks = 0
+        self.memory_peak = 0
+        # allocation site -> {"size": bytes, "count": blocks}, largest seen
+        self.memory_lines: dict[str, dict[str, int]] = {}
+
+    def start(self) -> None:
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+    def stop(self) -> None:
+        if not self.memory:
+            return
+        self.memory_peak = max(self.memory_peak, tracemalloc.get_traced_memory()[1])
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ]
+        )
+        for stat in snapshot.statistics("lineno")[:MEMORY_TOP_LINES]:
+            frame = stat.traceback[0]
+            line = self.memory_lines.setdefault(
+                f"{frame.filename}:{frame.lineno}", {"size": 0, "count": 0}
+            )
+            if stat.size > line["size"]:
+                line.update(size=stat.size, count=stat.count)
+
+    @contextmanager
+    def profile(self) -> Generator[None, None, None]:
+        self.tasks += 1
+        self.start()
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def get_functions(self) -> dict[str, dict[str, float]]:
+        # {function: {"calls": ..., "self": seconds, "total": seconds}}
+        raise NotImplementedError
+
+    def save(self, path: Path) -> None:
+        if not self.tasks:
+            return  # e.g., the tasks ran in pool processes, profiled there
+        profile: dict[str, Any] = {"backend": self.backend, "tasks": self.tasks}
+        if self.cpu:
+            profile["functions"] = self.get_functions()
+        if self.memory:
+            profile["memory"] = {"peak": self.memory_peak, "lines": self.memory_lines}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(profile), encoding="utf-8")
+
+
+class ScaleneProfiler(TaskProfiler):
+    # the worker runs under scalene, which writes its own report on exit
+    backend = "scalene"
+
+    def start(self) -> None:
+        start_profiling()
+
+    def stop(self) -> None:
+        stop_profiling()
+
+    def save(self, path: Path) -> None:
+        pass
+
+
+class CProfileProfiler(TaskProfiler):
+    # deterministic: every call is counted and timed (cpu time)
+    backend = "cprofile"
+
+    def __init__(self, cpu: bool = True, memory: bool = False):
+        super().__init__(cpu, memory)
+        self._profile = cProfile.Profile() if cpu else None
+        self._enabled = False
+
+    def start(self) -> None:
+        super().start()
+        if self._profile is not None:
+            self._profile.enable()
+            self._enabled = True
+
+    def stop(self) -> None:
+        if self._profile is not None:
+            self._profile.disable()
+        super().stop()
+
+    def get_functions(self) -> dict[str, dict[str, float]]:
+        if not self._enabled:
+            return {}
+        functions = {}
+        stats = pstats.Stats(self._profile).stats  # type: ignore[attr-defined]
+        for (filename, lineno, name), (_, calls, tottime, cumtime, _) in stats.items():
+            functions[_format_function(filename, lineno, name)] = {
+                "calls": calls,
+                "self": tottime,
+                "total": cumtime,
+            }
+        return functions
+
+    def save(self, path: Path) -> None:
+        super().save(path)
+        if self.tasks and self._enabled:
+            # for pstats, snakeviz, ...
+            self._profile.dump_stats(path.with_suffix(".prof"))
+
+
+class SamplingProfiler(TaskProfiler):
+    # statistical: the stack of the task is sampled every `interval` seconds
+    # from a thread, so the overhead does not grow with the number of calls;
+    # times are wall-clock and calls are the number of samples
+    backend = "sample"
+
+    def __init__(
+        self,
+        cpu: bool = True,
+        memory: bool = False,
+        interval: float = DEFAULT_SAMPLING_INTERVAL,
+    ):
+        super().__init__(cpu, memory)
+        self.interval = interval
+        self._functions: dict[str, dict[str, float]] = {}
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sample(self, thread_id: int) -> None:
+        last = time.perf_counter()
+        while not self._stopped.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            frame = sys._current_frames().get(thread_id)
+            seen = set()
+            top = True
+            while frame is not None:
+                code = frame.f_code
+                # one entry per function, at the line it starts
+                name = _format_function(
+                    code.co_filename, code.co_firstlineno, code.co_name
+                )
+                entry = self._functions.setdefault(
+                    name, {"calls": 0, "self": 0.0, "total": 0.0}
+                )
+                if top:
+                    entry["calls"] += 1
+                    entry["self"] += elapsed
+                    top = False
+                if name not in seen:
+                    entry["total"] += elapsed
+                    seen.add(name)
+                frame = frame.f_back
+
+    def start(self) -> None:
+        super().start()
+        if self.cpu:
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._sample,
+                args=(threading.get_ident(),),
+                name="easysubmit-sampler",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+        super().stop()
+
+    def get_functions(self) -> dict[str, dict[str, float]]:
+        return self._functions
+
+
+TASK_PROFILERS: dict[str, type[TaskProfiler]] = {
+    "scalene": ScaleneProfiler,
+    "cprofile": CProfileProfiler,
+    "sample": SamplingProfiler,
+}
+
+
+def get_task_profiler(backend: str, profilers: Sequence[str]) -> TaskProfiler:
+    # profilers are the kinds to profile, "cpu" and "memory" ("gpu" is only
+    # supported by scalene)
+    if backend not in TASK_PROFILERS:
+        msg = f"unknown profiler: {backend}"
+        raise ValueError(msg)
+    return TASK_PROFILERS[backend](cpu="cpu" in profilers, memory="memory" in profilers)
+
+
+def merge_profiles(base_dir: str | Path, run_id: str) -> dict[str, Any]:
+    """Combine the profiles of all jobs of a run.
+
+    Function times and calls are summed over the profiles (one per job, or
+    per task for parallel workers; ``profiles`` is the number a function
+    showed up in), so the functions with the
+    largest ``self`` time are those that took most of the CPU-hours of the
+    run. For memory, the largest peak and the allocation sites summed over
+    the profiles are kept.
+    """
+    merged: dict[str, Any] = {
+        "run_id": run_id,
+        "profiles": 0,
+        "tasks": 0,
+        "functions": {},
+        "memory": {"peak": 0, "lines": {}},
+    }
+    for path in sorted(get_profile_dir(base_dir, run_id).glob("*.json")):
+        profile = json.loads(path.read_text(encoding="utf-8"))
+        merged["profiles"] += 1
+        merged["tasks"] += profile.get("tasks", 0)
+        for name, stats in profile.get("functions", {}).items():
+            entry = merged["functions"].setdefault(
+                name, {"calls": 0, "self": 0.0, "total": 0.0, "profiles": 0}
+            )
+            for key in ("calls", "self", "total"):
+                entry[key] += stats[key]
+            entry["profiles"] += 1
+        memory = profile.get("memory")
+        if memory:
+            merged["memory"]["peak"] = max(merged["memory"]["peak"], memory["peak"])
+            for line, stats in memory["lines"].items():
+                entry = merged["memory"]["lines"].setdefault(
+                    line, {"size": 0, "count": 0, "profiles": 0}
+                )
+                entry["size"] += stats["size"]
+                entry["count"] += stats["count"]
+                entry["profiles"] += 1
+    return merged
+
+
+def format_hotspots(merged: dict[str, Any], top: int = 20) -> str:
+    lines = [
+        (
+            f"run {merged['run_id']}: {merged['tasks']} tasks, "
+            f"{merged['profiles']} profiles"
+        )
+    ]
+    functions = sorted(
+        merged["functions"].items(), key=lambda item: item[1]["self"], reverse=True
+    )
+    total = sum(stats["self"] for _, stats in functions) or 1.0
+    if functions:
+        lines.append(
+            f"{'self (s)':>12}{'share':>8}{'total (s)':>12}{'calls':>10}"
+            f"{'prof':>6}  function"
+        )
+        for name, stats in functions[:top]:
+            lines.append(
+                f"{stats['self']:>12.2f}{stats['self'] / total:>8.1%}"
+                f"{stats['total']:>12.2f}{stats['calls']:>10d}"
+                f"{stats['profiles']:>6d}  {name}"
+            )
+    memory_lines = sorted(
+        merged["memory"]["lines"].items(),
+        key=lambda item: item[1]["size"],
+        reverse=True,
+    )
+    if memory_lines:
+        lines.append("")
+        lines.append(f"peak memory: {merged['memory']['peak'] / 2**20:.1f} MiB")
+        lines.append(f"{'size (MiB)':>12}{'blocks':>10}{'prof':>6}  line")
+        for name, stats in memory_lines[:top]:
+            lines.append(
+                f"{stats['size'] / 2**20:>12.2f}{stats['count']:>10d}"
+                f"{stats['profiles']:>6d}  {name}"
+            )
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m easysubmit.profiler",
+        description="Merge the profiles of the jobs of a run into one report.",
+    )
+    parser.add_argument("base_dir")
+    parser.add_argument("run_id")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args(argv)
+    merged = merge_profiles(args.base_dir, args.run_id)
+    if args.json:
+        print(json.dumps(merged, indent=2))
+    else:
+        print(format_hotspots(merged, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
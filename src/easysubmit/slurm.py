@@ -3,34 +3,83 @@ from __future__ import annotations
 import copy
 import os
 import subprocess  # noqa: S404
-from collections.abc import Sequence
+import threading
+import time
+from collections.abc import Iterable, Iterator, Sequence
 from dataclasses import asdict, dataclass, field
 from pathlib import Path
 from subprocess import CompletedProcess  # noqa: S404
 from tempfile import NamedTemporaryFile
-from typing import Callable
+from typing import Any, Callable, ClassVar
 
-from easysubmit.entities import Cluster, Job
+from easysubmit.checkpoint import PREEMPTION_SIGNAL_ENV
+from easysubmit.entities import Cluster, Job, JobGroup
 from easysubmit.helpers import get_current_venv
+from easysubmit.staging import EXTRACTED_MARKER, pack_venv
 
 __all__ = [
     "SLURMConfig",
     "build_sbatch_script",
     "sbatch",
     "SLURMJob",
+    "SLURMStatusService",
+    "collapse_slurm_states",
     "get_slurm_job_array",
     "parse_slurm_array_arg",
     "format_slurm_array_arg",
     "get_slurm_job_id",
     "get_slurm_array_job_id",
     "get_slurm_array_task_id",
+    "get_slurm_job_start_time",
+    "get_slurm_job_end_time",
+    "get_slurm_cpus_on_node",
+    "get_slurm_job_num_nodes",
+    "get_slurm_mem_per_node",
+    "get_slurm_restart_count",
+    "parse_slurm_time",
+    "parse_slurm_duration",
+    "parse_slurm_memory",
+    "get_slurm_max_array_size",
+    "get_slurm_max_submit_jobs",
+    "get_slurm_queued_job_count",
     "SLURMCluster",
 ]
 
 
 class Lmod:
+    # loaded modules per module environment, see `Lmod.list`
+    _cache: ClassVar[dict[tuple[tuple[str, str], ...], list[str]]] = {}
+
+    @staticmethod
+    def _get_environment() -> tuple[tuple[str, str], ...]:
+        # the module environment is fully described by these variables
+        return tuple(
+            sorted(
+                (key, value)
+                for key, value in os.environ.items()
+                if key == "LOADEDMODULES" or key.startswith("_ModuleTable")
+            )
+        )
+
+    @classmethod
+    def list(cls) -> list[str]:
+        key = cls._get_environment()
+        if key not in cls._cache:
+            cls._cache[key] = cls._discover()
+        # callers (e.g., SLURMConfig) may modify the returned list
+        return cls._cache[key].copy()
+
     @staticmethod
-    def list():
+    def _discover() -> list[str]:
+        loaded = os.environ.get("LOADEDMODULES")
+        if loaded is not None:
+            return [module for module in loaded.split(":") if module]
+        if "LMOD_PKG" not in os.environ:
+            return []
+        return Lmod._query()
+
+    @staticmethod
+    def _query() -> list[str]:
         command = "list"
         lsmod = os.path.join(os.environ["LMOD_PKG"], "libexec", "lmod")
         args = [lsmod, "python", command]
@@ -68,22 +117,59 @@ class SLURMConfig:
     error: str | None = None
     job_name: str = "default"
     array: None | list[int] | str = None
+    # maximum number of array elements running at once (the %N of --array)
+    array_throttle: int | None = None
+    # added to SLURM_ARRAY_TASK_ID by the worker, set for chunked arrays
+    array_offset: int | None = None
+    # e.g., "B:USR1@300" to let workers checkpoint 5 minutes before the limit
+    signal: str | None = None
+    # allow the job to be requeued, e.g., by a worker after it was preempted
+    requeue: bool | None = None
+    # e.g., "afterok:1234" or "aftercorr:1234" (element i after element i)
+    dependency: str | None = None
+    # "yes" cancels the job if its dependency can never be satisfied
+    kill_on_invalid_dep: str | None = None
     modules: list[str] | None = field(default_factory=Lmod.list)
     cwd: str | None = field(default_factory=Path.cwd)
     venv: str | None = field(default_factory=get_current_venv)
+    # run from a copy of venv extracted to node-local $TMPDIR, once per node,
+    # rather than importing everything from the shared filesystem
+    stage_venv: bool = False
+    # shared directory for the packed venvs, see `easysubmit.staging`
+    stage_dir: str | None = None
 
 
-def build_sbatch_script(args: Sequence[str], config: SLURMConfig) -> str:
+def build_sbatch_script(
+    args: Sequence[str], config: SLURMConfig, archive: Path | None = None
+) -> str:
+    # `archive` is the packed venv to extract on the nodes, see `pack_venv`
     slurm = ["#!/bin/sh"]
     for key, value in asdict(config).items():
-        if key in {"modules", "cwd", "venv"}:
+        if key in {
+            "modules",
+            "cwd",
+            "venv",
+            "array_throttle",
+            "array_offset",
+            "stage_venv",
+            "stage_dir",
+        }:
             continue
-        if value is None:
+        if value is None or value is False:
             continue
-        if key == "array" and not isinstance(value, str):
-            value = ",".join(map(str, value))
+        if key == "array":
+            if not isinstance(value, str):
+                value = format_slurm_array_arg(value)
+            if config.array_throttle:
+                value = f"{value.split('%')[0]}%{config.array_throttle}"
         key = key.replace("_", "-")
+        if value is True:
+            slurm.append(f"#SBATCH --{key}")
+            continue
         slurm.append(f"#SBATCH --{key}={value}")
+    # start of the job and of the command, see `easysubmit.timing`
+    slurm.append("")
+    slurm.append('export EASYSUBMIT_START_TIME="$(date +%s.%N)"')
     if config.modules:
         slurm.append("")
         if not isinstance(config.modules, str):
@@ -106,7 +192,10 @@ def build_sbatch_script(args: Sequence[str], config: SLURMConfig) -> str:
         ]
     )
     activate_path = Path(config.venv) / "bin" / "activate"
-    if config.venv and activate_path.exists():
+    if archive is not None:
+        slurm.append("")
+        slurm.extend(_build_stage_script(archive, config.nodes))
+    elif config.venv and activate_path.exists():
         # only required if venv is not activated
         slurm.append("")
         slurm.append(f"source {activate_path}")
@@ -120,12 +209,68 @@ def build_sbatch_script(args: Sequence[str], config: SLURMConfig) -> str:
     else:
         raise ValueError("no python environment found")
 
+    if config.array_offset:
+        slurm.append("")
+        slurm.append(f"export EASYSUBMIT_ARRAY_OFFSET={config.array_offset}")
+    if config.time:
+        # the time limit of this submission, which may differ from that of
+        # the cluster (see `TaskConfig.get_resources`)
+        slurm.append(f"export EASYSUBMIT_TIME_LIMIT={config.time}")
+    if config.signal:
+        # the only signal the worker checkpoints and requeues on, e.g., "USR1"
+        # of "B:USR1@300"
+        name = config.signal.split(":")[-1].split("@")[0]
+        slurm.append(f"export {PREEMPTION_SIGNAL_ENV}={name}")
+
     slurm.append("")
-    slurm.append(" ".join(args))
+    slurm.append('export EASYSUBMIT_EXEC_TIME="$(date +%s.%N)"')
+    if config.signal:
+        # the command replaces the batch shell, which receives "B:" signals
+        slurm.append(f"exec {' '.join(args)}")
+    else:
+        slurm.append(" ".join(args))
     return "\n".join(slurm)
 
 
-def sbatch(path: str | Path) -> SLURMJob:
+def _build_stage_script(archive: Path, nodes: int | None = None) -> list[str]:
+    # elements on the same node share the extracted venv: the first one
+    # extracts it while holding the lock, the others wait and reuse it
+    # (braces are doubled for the format hook)
+    venv = f"${{{{TMPDIR:-/tmp}}}}/easysubmit-{archive.name.split('.')[0]}"
+    marker = f"$EASYSUBMIT_VENV/{EXTRACTED_MARKER}"
+    extract = [
+        "(",
+        "    flock 9",
+        f'    if [ ! -f "{marker}" ]; then',
+        '        rm -rf "$EASYSUBMIT_VENV" && mkdir -p "$EASYSUBMIT_VENV" &&',
+        f'        tar -xzf "{archive}" -C "$EASYSUBMIT_VENV" && touch "{marker}"',
+        "    fi",
+        ') 9>"$EASYSUBMIT_VENV.lock"',
+    ]
+    if nodes and nodes > 1:
+        # job steps of the worker run on the other nodes, which need it too
+        extract = [
+            "srun --nodes=$SLURM_JOB_NUM_NODES --ntasks-per-node=1 sh -c '",
+            *extract,
+            "'",
+        ]
+    return [
+        f'export EASYSUBMIT_VENV="{venv}"',
+        *extract,
+        f'if [ ! -f "{marker}" ]; then',
+        '    echo "could not extract the venv to $EASYSUBMIT_VENV" >&2',
+        "    exit 1",
+        "fi",
+        # not `activate`, which points to the original location of the venv
+        'export VIRTUAL_ENV="$EASYSUBMIT_VENV"',
+        'export PATH="$EASYSUBMIT_VENV/bin:$PATH"',
+        'echo "Path to Python: `which python`"',
+    ]
+
+
+def sbatch(
+    path: str | Path, status_service: SLURMStatusService | None = None
+) -> SLURMJob:
     if isinstance(path, Path):
         path = str(path)
     command = ["sbatch", path]
@@ -139,46 +284,232 @@ def sbatch(path: str | Path) -> SLURMJob:
     if stderr:
         raise RuntimeError(stderr)
     job_id = stdout.decode().strip().split()[-1]
-    return SLURMJob(job_id)
+    return SLURMJob(job_id, status_service)
 
 
 class SLURMJob(Job):
+    def __init__(self, id: int | str, status_service: SLURMStatusService | None = None):
+        super().__init__(id)
+        self.status_service = status_service
+
     def get_status(self) -> str:
-        status = subprocess.run(
+        service = self.status_service or default_status_service
+        return service.get_status(self.id)
+
+    def get_array_states(self) -> dict[str, str]:
+        # state of each array element (or of the job itself) keyed by job id
+        service = self.status_service or default_status_service
+        return service.get_states(self.id)
+
+    @classmethod
+    def get_statuses(cls, jobs: Sequence[Job]) -> dict[str, str]:
+        # one refresh of all jobs per status service
+        services: dict[SLURMStatusService, list[str]] = {}
+        for job in jobs:
+            service = job.status_service or default_status_service
+            services.setdefault(service, []).append(job.id)
+        statuses = {}
+        for service, job_ids in services.items():
+            statuses.update(service.get_statuses(job_ids))
+        return statuses
+
+    def cancel(self):
+        subprocess.run(
+            ["scancel", self.id],  # noqa: S603, S607
+            check=False,
+        )
+
+    def requeue(self):
+        subprocess.run(
+            ["scontrol", "requeue", self.id],
+            check=False,
+        )
+
+    def __repr__(self):
+        return f"SLURMJob(job_id={self.id})"
+
+
+# collapsed job status and the raw job states it covers, in order of precedence
+SLURM_JOB_STATES: dict[str, set[str]] = {
+    "PENDING": {"PENDING", "REQUEUED", "REQUEUE_HOLD", "REQUEUE_FED", "SUSPENDED"},
+    "RUNNING": {"RUNNING", "CONFIGURING", "COMPLETING", "RESIZING", "STAGE_OUT"},
+    "CANCELLED": {"CANCELLED", "REVOKED"},
+    "FAILED": {
+        "FAILED",
+        "TIMEOUT",
+        "NODE_FAIL",
+        "OUT_OF_MEMORY",
+        "BOOT_FAIL",
+        "DEADLINE",
+        "PREEMPTED",
+    },
+    "COMPLETED": {"COMPLETED"},
+}
+
+SLURM_TERMINAL_STATES = (
+    SLURM_JOB_STATES["CANCELLED"]
+    | SLURM_JOB_STATES["FAILED"]
+    | SLURM_JOB_STATES["COMPLETED"]
+)
+
+DEFAULT_STATUS_TTL = 10.0
+
+# maximum number of job ids passed to a single sacct/squeue call
+STATUS_QUERY_SIZE = 500
+
+
+def collapse_slurm_states(states: Iterable[str]) -> str:
+    states = set(states)
+    for status, members in SLURM_JOB_STATES.items():
+        if states & members:
+            return status
+    return "UNKNOWN"
+
+
+class SLURMStatusService:
+    """Shared, cached view of the state of many SLURM jobs.
+
+    All watched jobs are refreshed together with one ``sacct`` call (and one
+    ``squeue`` call for jobs that are not in the accounting database yet)
+    whenever a cached state is older than ``ttl`` seconds. Jobs whose elements
+    all reached a terminal state are never queried again. With ``requeue``,
+    preempted jobs come back to the queue, so they count as pending.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_STATUS_TTL, requeue: bool = False):
+        self.ttl = ttl
+        self.requeue = requeue
+        self.terminal_states = (
+            SLURM_TERMINAL_STATES - {"PREEMPTED"} if requeue else SLURM_TERMINAL_STATES
+        )
+        # job id -> {job id of the job or array element: state}
+        self._states: dict[str, dict[str, str]] = {}
+        self._updated: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def watch(self, *job_ids: str) -> None:
+        with self._lock:
+            for job_id in job_ids:
+                self._states.setdefault(job_id, {})
+                self._updated.setdefault(job_id, 0.0)
+
+    def is_terminal(self, job_id: str) -> bool:
+        states = self._states.get(job_id)
+        if not states:
+            return False
+        return all(state in self.terminal_states for state in states.values())
+
+    def refresh(self, job_ids: Iterable[str] | None = None) -> None:
+        with self._lock:
+            if job_ids is None:
+                job_ids = list(self._states)
+            job_ids = [j for j in job_ids if not self.is_terminal(j)]
+            if not job_ids:
+                return
+            now = time.monotonic()
+            states = _query_sacct(job_ids)
+            missing = [job_id for job_id in job_ids if not states.get(job_id)]
+            if missing:
+                states.update(_query_squeue(missing))
+            for job_id in job_ids:
+                self._states[job_id] = states.get(job_id, {})
+                self._updated[job_id] = now
+
+    def get_states(self, job_id: str) -> dict[str, str]:
+        self.watch(job_id)
+        if (
+            not self.is_terminal(job_id)
+            and time.monotonic() - self._updated[job_id] > self.ttl
+        ):
+            # refresh every stale job at once rather than just this one
+            self.refresh(
+                j
+                for j, updated in self._updated.items()
+                if time.monotonic() - updated > self.ttl
+            )
+        return dict(self._states[job_id])
+
+    def get_status(self, job_id: str) -> str:
+        return self._collapse(self.get_states(job_id).values())
+
+    def get_statuses(self, job_ids: Sequence[str]) -> dict[str, str]:
+        # refreshes all of them at once, whatever the age of their states
+        self.watch(*job_ids)
+        self.refresh(job_ids)
+        return {
+            job_id: self._collapse(self._states[job_id].values()) for job_id in job_ids
+        }
+
+    def _collapse(self, states: Iterable[str]) -> str:
+        if self.requeue:
+            states = ["REQUEUED" if state == "PREEMPTED" else state for state in states]
+        return collapse_slurm_states(states)
+
+
+default_status_service = SLURMStatusService()
+
+
+def _match_job_ids(requested: set[str], job_id: str, job_id_raw: str) -> Iterator[str]:
+    # a row may be requested by its array id ("123_4"), its own job id ("130")
+    # or the id of the array it belongs to ("123")
+    for candidate in {job_id, job_id_raw, job_id.split("_")[0]}:
+        if candidate in requested:
+            yield candidate
+
+
+def _query_sacct(job_ids: Sequence[str]) -> dict[str, dict[str, str]]:
+    requested = set(job_ids)
+    states: dict[str, dict[str, str]] = {}
+    for i in range(0, len(job_ids), STATUS_QUERY_SIZE):
+        result = subprocess.run(
             [  # noqa: S603, S607
                 "sacct",
                 "-j",
-                self.id,
+                ",".join(job_ids[i : i + STATUS_QUERY_SIZE]),
                 "-X",
                 "--noheader",
-                "--format=state",
+                "--parsable2",
+                "--format=JobID,JobIDRaw,State",
             ],
             capture_output=True,
             check=False,
         )
-        status = status.stdout.decode("utf-8").strip().upper()
-        # in case of array job
-        status = set(status.split())
-        if "PENDING" in status:
-            return "PENDING"
-        if "RUNNING" in status:
-            return "RUNNING"
-        if "CANCELLED" in status:
-            return "CANCELLED"
-        if "FAILED" in status:
-            return "FAILED"
-        if "COMPLETED" in status:
-            return "COMPLETED"
-        return "UNKNOWN"
+        for line in result.stdout.decode("utf-8").splitlines():
+            parts = line.strip().split("|")
+            if len(parts) < 3:
+                continue
+            job_id, job_id_raw, state = parts[:3]
+            # e.g., "CANCELLED by 1234"
+            state = state.split()[0].upper() if state.strip() else "UNKNOWN"
+            for key in _match_job_ids(requested, job_id, job_id_raw):
+                states.setdefault(key, {})[job_id] = state
+    return states
 
-    def cancel(self):
-        subprocess.run(
-            ["scancel", self.id],  # noqa: S603, S607
+
+def _query_squeue(job_ids: Sequence[str]) -> dict[str, dict[str, str]]:
+    requested = set(job_ids)
+    states: dict[str, dict[str, str]] = {}
+    for i in range(0, len(job_ids), STATUS_QUERY_SIZE):
+        result = subprocess.run(
+            [
+                "squeue",
+                "-j",
+                ",".join(job_ids[i : i + STATUS_QUERY_SIZE]),
+                "--noheader",
+                "--array",
+                "--format=%i|%A|%T",
+            ],
+            capture_output=True,
             check=False,
         )
-
-    def __repr__(self):
-        return f"SLURMJob(job_id={self.id})"
+        for line in result.stdout.decode("utf-8").splitlines():
+            parts = line.strip().split("|")
+            if len(parts) < 3:
+                continue
+            job_id, job_id_raw, state = parts[:3]
+            for key in _match_job_ids(requested, job_id, job_id_raw):
+                states.setdefault(key, {})[job_id] = state.strip().upper()
+    return states
 
 
 def get_slurm_job_array(id: int | str) -> list[Job]:
@@ -203,7 +534,8 @@ def parse_slurm_array_arg(array: str) -> list[int]:
         return []
     if isinstance(array, list):
         return array
-    array = array.split(",")
+    # drop the throttle, e.g., "0-99%10"
+    array = array.split("%")[0].split(",")
     array_ids = []
     for job in array:
         if "-" in job:
@@ -267,31 +599,464 @@ def get_slurm_array_task_id() -> int | None:
     return int(os.environ["SLURM_ARRAY_TASK_ID"])
 
 
+def get_slurm_array_offset() -> int:
+    # EASYSUBMIT_ARRAY_OFFSET will be set to the first index of an array chunk.
+    if "EASYSUBMIT_ARRAY_OFFSET" not in os.environ:
+        return 0
+    return int(os.environ["EASYSUBMIT_ARRAY_OFFSET"])
+
+
+def get_easysubmit_time_limit() -> str | None:
+    # EASYSUBMIT_TIME_LIMIT will be set to the time limit the job was submitted with.
+    return os.environ.get("EASYSUBMIT_TIME_LIMIT") or None
+
+
+def get_slurm_job_start_time() -> float | None:
+    # SLURM_JOB_START_TIME will be set to the UNIX timestamp of the job start.
+    if "SLURM_JOB_START_TIME" not in os.environ:
+        return None
+    return float(os.environ["SLURM_JOB_START_TIME"])
+
+
+def get_slurm_job_end_time() -> float | None:
+    # SLURM_JOB_END_TIME will be set to the UNIX timestamp of the job end.
+    if "SLURM_JOB_END_TIME" not in os.environ:
+        return None
+    return float(os.environ["SLURM_JOB_END_TIME"])
+
+
+def get_slurm_cpus_on_node() -> int | None:
+    # SLURM_CPUS_ON_NODE will be set to the number of cpus allocated on the node.
+    if "SLURM_CPUS_ON_NODE" not in os.environ:
+        return None
+    return int(os.environ["SLURM_CPUS_ON_NODE"])
+
+
+def get_slurm_job_num_nodes() -> int | None:
+    # SLURM_JOB_NUM_NODES will be set to the number of nodes of the job.
+    if "SLURM_JOB_NUM_NODES" not in os.environ:
+        return None
+    return int(os.environ["SLURM_JOB_NUM_NODES"])
+
+
+def get_slurm_mem_per_node() -> int | None:
+    # SLURM_MEM_PER_NODE will be set to the memory (MB) per node with --mem.
+    if "SLURM_MEM_PER_NODE" not in os.environ:
+        return None
+    return int(os.environ["SLURM_MEM_PER_NODE"])
+
+
+def get_slurm_restart_count() -> int:
+    # SLURM_RESTART_COUNT will be set to the number of times the job was requeued.
+    if "SLURM_RESTART_COUNT" not in os.environ:
+        return 0
+    return int(os.environ["SLURM_RESTART_COUNT"])
+
+
+def parse_slurm_time(value: str | int | None) -> int | None:
+    # accepted formats are "minutes", "minutes:seconds", "hours:minutes:seconds",
+    # "days-hours", "days-hours:minutes" and "days-hours:minutes:seconds"
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value * 60
+    value = value.strip()
+    if value.upper() in {"", "INFINITE", "UNLIMITED"}:
+        return None
+    days = 0
+    if "-" in value:
+        days, value = value.split("-", 1)
+        days = int(days)
+        parts = [int(part) for part in value.split(":")]
+        # the first part after the day is always hours
+        parts += [0] * (3 - len(parts))
+        hours, minutes, seconds = parts
+    else:
+        parts = [int(part) for part in value.split(":")]
+        if len(parts) == 1:
+            hours, minutes, seconds = 0, parts[0], 0
+        elif len(parts) == 2:
+            hours, (minutes, seconds) = 0, parts
+        elif len(parts) == 3:
+            hours, minutes, seconds = parts
+        else:
+            msg = f"invalid time format: {value}"
+            raise ValueError(msg)
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def parse_slurm_duration(value: str | None) -> float | None:
+    # durations reported by sacct, e.g., "1-02:03:04", "02:03:04" or "03:04.567"
+    if value is None:
+        return None
+    value = value.strip()
+    if value.upper() in {"", "INVALID", "UNKNOWN", "INFINITE", "UNLIMITED"}:
+        return None
+    days = 0
+    if "-" in value:
+        days, value = value.split("-", 1)
+        days = int(days)
+    parts = [float(part) for part in value.split(":")]
+    hours, minutes, seconds = [0.0] * (3 - len(parts)) + parts
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def parse_slurm_memory(value: str | None) -> int | None:
+    # memory reported by sacct in bytes, e.g., "2048K" or "1.50G"
+    if value is None:
+        return None
+    value = value.strip().upper()
+    if not value:
+        return None
+    units = {"K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+    if value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(float(value))
+
+
+def _query_usage(
+    job_ids: Sequence[str], terminal_states: set[str] = SLURM_TERMINAL_STATES
+) -> dict[str, dict[str, Any]]:
+    requested = set(job_ids)
+    usage: dict[str, dict[str, Any]] = {}
+    for i in range(0, len(job_ids), STATUS_QUERY_SIZE):
+        # without -X, so that the steps (which carry MaxRSS) are included
+        result = subprocess.run(
+            [
+                "sacct",
+                "-j",
+                ",".join(job_ids[i : i + STATUS_QUERY_SIZE]),
+                "--noheader",
+                "--parsable2",
+                "--format=JobID,JobIDRaw,State,Elapsed,TotalCPU,MaxRSS",
+            ],
+            capture_output=True,
+            check=False,
+        )
+        for line in result.stdout.decode("utf-8").splitlines():
+            parts = line.strip().split("|")
+            if len(parts) < 6:
+                continue
+            job_id, job_id_raw, state, elapsed, total_cpu, max_rss = parts[:6]
+            step = "." in job_id_raw
+            job_id, job_id_raw = job_id.split(".")[0], job_id_raw.split(".")[0]
+            # unlike status queries, an array id does not stand for its elements
+            for key in {job_id, job_id_raw} & requested:
+                record = usage.setdefault(key, {"max_rss": None})
+                rss = parse_slurm_memory(max_rss)
+                if rss is not None:
+                    record["max_rss"] = max(record["max_rss"] or 0, rss)
+                if step:
+                    continue
+                record["state"] = state.split()[0].upper() if state else "UNKNOWN"
+                record["elapsed"] = parse_slurm_duration(elapsed)
+                record["total_cpu"] = parse_slurm_duration(total_cpu)
+    # only finished jobs have final numbers
+    return {
+        job_id: record
+        for job_id, record in usage.items()
+        if record.get("state") in terminal_states
+    }
+
+
+def _run_command(args: Sequence[str]) -> str | None:
+    # output of a SLURM client command, None if it is not available
+    try:
+        result = subprocess.run(
+            args,
+            capture_output=True,
+            check=False,
+        )
+    except FileNotFoundError:
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.decode("utf-8")
+
+
+def _parse_limit(value: str) -> int | None:
+    value = value.strip()
+    if not value.isdigit():
+        # empty or "UNLIMITED"
+        return None
+    return int(value)
+
+
+def get_slurm_max_array_size() -> int | None:
+    # the largest array index allowed is MaxArraySize - 1
+    output = _run_command(["scontrol", "show", "config"])
+    if output is None:
+        return None
+    for line in output.splitlines():
+        key, _, value = line.partition("=")
+        if key.strip() == "MaxArraySize":
+            return _parse_limit(value)
+    return None
+
+
+def get_slurm_max_submit_jobs(qos: str | None = None) -> int | None:
+    # smallest per-user limit of queued jobs, each array element counts as one
+    user = os.environ.get("USER")
+    if user is None:
+        return None
+    limits = []
+    output = _run_command(
+        [
+            "sacctmgr",
+            "--noheader",
+            "--parsable2",
+            "show",
+            "assoc",
+            f"where user={user}",
+            "format=MaxSubmit",
+        ]
+    )
+    if output is not None:
+        limits.extend(_parse_limit(line) for line in output.splitlines())
+    if qos:
+        output = _run_command(
+            [
+                "sacctmgr",
+                "--noheader",
+                "--parsable2",
+                "show",
+                "qos",
+                f"where name={qos}",
+                "format=MaxSubmitPU",
+            ]
+        )
+        if output is not None:
+            limits.extend(_parse_limit(line) for line in output.splitlines())
+    limits = [limit for limit in limits if limit is not None]
+    return min(limits) if limits else None
+
+
+def get_slurm_queued_job_count() -> int | None:
+    # pending and running jobs of the current user, counting array elements
+    user = os.environ.get("USER")
+    if user is None:
+        return None
+    output = _run_command(["squeue", "-u", user, "-h", "-r", "-o", "%i"])
+    if output is None:
+        return None
+    return sum(1 for line in output.splitlines() if line.strip())
+
+
+# sbatch errors meaning the job would exceed the submit limit of the user
+SUBMIT_LIMIT_ERRORS = (
+    "AssocMaxSubmitJobLimit",
+    "QOSMaxSubmitJobPerUserLimit",
+    "job submit limit",
+)
+
+DEFAULT_SUBMIT_INTERVAL = 60.0
+
+
+def _split_array(
+    array: Sequence[int], max_array_size: int | None
+) -> list[tuple[int, list[int]]]:
+    # chunks re-based to start at 0 so that every index stays below
+    # max_array_size; returns (offset, indices) pairs
+    chunks: list[tuple[int, list[int]]] = []
+    offset = None
+    chunk: list[int] = []
+    for index in sorted(set(array)):
+        if (
+            offset is not None
+            and max_array_size is not None
+            and index - offset >= max_array_size
+        ):
+            chunks.append((offset, chunk))
+            offset, chunk = None, []
+        if offset is None:
+            # arrays that already fit keep their original indices
+            fits = max_array_size is None or index < max_array_size
+            offset = 0 if not chunks and fits else index
+        chunk.append(index - offset)
+    if chunk:
+        chunks.append((offset, chunk))
+    return chunks
+
+
 class SLURMCluster(Cluster):
-    def __init__(self, config: SLURMConfig):
+    """Submits jobs with ``sbatch``.
+
+    Arrays larger than the site allows are split into several submissions:
+    each holds at most ``max_array_size`` elements (indices are re-based and
+    restored by the worker) and no more than ``max_submit_jobs`` elements are
+    queued at a time, so each submission takes as many elements as there is
+    room for under that limit and ``schedule`` waits, checking every
+    ``submit_interval`` seconds, for earlier chunks to drain when the queue is
+    full. Limits that are not given are read from ``scontrol`` and
+    ``sacctmgr`` on first use.
+    """
+
+    def __init__(
+        self,
+        config: SLURMConfig,
+        status_ttl: float = DEFAULT_STATUS_TTL,
+        max_array_size: int | None = None,
+        max_submit_jobs: int | None = None,
+        submit_interval: float = DEFAULT_SUBMIT_INTERVAL,
+    ):
         self.config = config
+        # jobs of this cluster share one cached status snapshot
+        self.status = SLURMStatusService(ttl=status_ttl, requeue=bool(config.requeue))
+        self.max_array_size = max_array_size
+        self.max_submit_jobs = max_submit_jobs
+        self.submit_interval = submit_interval
+        self._limits_discovered = False
+
+    def get_limits(self) -> tuple[int | None, int | None]:
+        # (max array size, max submitted jobs), None if there is no limit
+        if not self._limits_discovered:
+            if self.max_array_size is None:
+                self.max_array_size = get_slurm_max_array_size()
+            if self.max_submit_jobs is None:
+                self.max_submit_jobs = get_slurm_max_submit_jobs(self.config.qos)
+            self._limits_discovered = True
+        return self.max_array_size, self.max_submit_jobs
 
-    def get_job(self, id: str | None = None) -> Job:  # noqa: PLR6301
+    def get_job(self, id: str | None = None) -> Job:
         if id is None:
             id = get_slurm_job_id()
-        return SLURMJob(id)
+        return SLURMJob(id, self.status)
 
     def get_array_job(self, id: str | None = None) -> Job:
         if id is None:
             id = get_slurm_array_job_id()
-        return SLURMJob(id)
+        return SLURMJob(id, self.status)
+
+    def get_array_task_id(self) -> int | None:
+        array_task_id = get_slurm_array_task_id()
+        if array_task_id is None:
+            return None
+        # index in the original array when it was submitted in chunks
+        return array_task_id + get_slurm_array_offset()
+
+    def get_deadline(self) -> float | None:
+        end_time = get_slurm_job_end_time()
+        if end_time is not None:
+            return end_time
+        time_limit = parse_slurm_time(get_easysubmit_time_limit() or self.config.time)
+        if time_limit is None:
+            return None
+        start_time = get_slurm_job_start_time()
+        if start_time is None:
+            start_time = time.time()
+        return start_time + time_limit
+
+    def get_cpu_count(self) -> int:
+        cpu_count = get_slurm_cpus_on_node()
+        if cpu_count is not None:
+            return cpu_count
+        if self.config.ntasks_per_node:
+            return self.config.ntasks_per_node
+        return super().get_cpu_count()
+
+    def get_usage(self, job_ids: Sequence[str]) -> dict[str, dict[str, Any]]:
+        return _query_usage(list(job_ids), self.status.terminal_states)
+
+    def get_node_count(self) -> int:
+        return get_slurm_job_num_nodes() or 1
+
+    def get_restart_count(self) -> int:
+        return get_slurm_restart_count()
+
+    def get_step_command(self, args: Sequence[str], slots: int = 1) -> list[str]:
+        # the cpus (and memory, if requested per node) of a node are split
+        # between its steps; --exclusive keeps steps from sharing cpus, so a
+        # step waits for a free slot rather than oversubscribing the node
+        cpus = max(self.get_cpu_count() // slots, 1)
+        command = [
+            "srun",
+            "--exclusive",
+            "--nodes=1",
+            "--ntasks=1",
+            f"--cpus-per-task={cpus}",
+        ]
+        mem = get_slurm_mem_per_node()
+        if mem:
+            command.append(f"--mem={max(mem // slots, 1)}M")
+        return [*command, *args]
+
+    def get_worker_args(self) -> list[str] | None:
+        if type(self) is not SLURMCluster:
+            return None  # subclasses may behave differently in the worker
+        # everything else, including the time limit of the submission, comes
+        # from the environment of the job
+        return ["--cluster=slurm"]
 
     def schedule(
         self, __args: Sequence[str], __format_hook: Callable | None = None, **kwargs
-    ) -> SLURMJob:
+    ) -> SLURMJob | JobGroup:
         config = copy.deepcopy(self.config)
         for key, value in kwargs.items():
             if not hasattr(config, key):
                 continue
             setattr(config, key, value)
-        script = build_sbatch_script(__args, config)
-        if __format_hook is not None:
-            script = __format_hook(script)
+        # packed once for all the chunks of an array
+        archive = None
+        if config.venv and config.stage_venv:
+            archive = pack_venv(config.venv, config.stage_dir)
+        if not config.array:
+            return self._submit(__args, __format_hook, config, archive)
+        if (
+            isinstance(config.array, str)
+            and "%" in config.array
+            and config.array_throttle is None
+        ):
+            config.array_throttle = int(config.array.split("%")[1])
+        max_array_size, _ = self.get_limits()
+        chunks = _split_array(parse_slurm_array_arg(config.array), max_array_size)
+        jobs = []
+        for offset, array in chunks:
+            while array:
+                # elements that fit under the submit limit now, the rest are
+                # submitted once earlier ones drained
+                count = self._wait_for_capacity(len(array))
+                chunk = copy.deepcopy(config)
+                chunk.array = array[:count]
+                chunk.array_offset = offset or None
+                split = len(chunks) > 1 or jobs or count < len(array)
+                if chunk.dependency and split:
+                    # aftercorr pairs elements by index, which chunks
+                    # number from 0
+                    chunk.dependency = chunk.dependency.replace(
+                        "aftercorr:", "afterok:"
+                    )
+                jobs.append(self._submit(__args, __format_hook, chunk, archive))
+                array = array[count:]
+        if len(jobs) == 1:
+            return jobs[0]
+        return JobGroup(jobs)
+
+    def _wait_for_capacity(self, count: int) -> int:
+        # how many of `count` jobs fit under the submit limit of the user,
+        # after waiting for room for a tenth of the limit (or all of them),
+        # so that a draining queue is not refilled one job at a time
+        if self.max_submit_jobs is None:
+            return count
+        wanted = min(count, max(self.max_submit_jobs // 10, 1))
+        while True:
+            queued = get_slurm_queued_job_count()
+            if queued is None:
+                return min(count, self.max_submit_jobs)
+            room = self.max_submit_jobs - queued
+            if room >= wanted:
+                return min(count, room)
+            time.sleep(self.submit_interval)
+
+    def _submit(
+        self,
+        args: Sequence[str],
+        format_hook: Callable | None,
+        config: SLURMConfig,
+        archive: Path | None = None,
+    ) -> SLURMJob:
+        script = build_sbatch_script(args, config, archive)
+        if format_hook is not None:
+            script = format_hook(script)
         with NamedTemporaryFile(
             "w",
             dir=Path.cwd(),
@@ -301,5 +1066,15 @@ class SLURMCluster(Cluster):
         ) as file:
             file.write(script)
             file.flush()
-            job = sbatch(file.name)
+            while True:
+                try:
+                    job = sbatch(file.name, self.status)
+                except RuntimeError as e:
+                    # limits that could not be discovered show up as errors
+                    if not any(error in str(e) for error in SUBMIT_LIMIT_ERRORS):
+                        raise
+                    time.sleep(self.submit_interval)
+                else:
+                    break
+        self.status.watch(job.id)
         return job
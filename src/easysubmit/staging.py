@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import os
+import tarfile
+from pathlib import Path
+
+from easysubmit.helpers import get_fingerprint
+
+__all__ = [
+    "get_stage_dir",
+    "get_venv_key",
+    "pack_venv",
+]
+
+# file created in the extracted venv once it is complete
+EXTRACTED_MARKER = ".easysubmit-extracted"
+
+
+def get_stage_dir() -> Path:
+    # archives are reused by later sweeps, so they are kept outside base_dir
+    return Path.home() / ".cache" / "easysubmit" / "venvs"
+
+
+def get_venv_key(venv: str | Path) -> str:
+    """Identify the contents of a venv without reading all of it.
+
+    Installing or removing packages changes the modification time of the
+    site-packages (and bin) directories, so those, and the path of the venv,
+    are enough to tell whether an archive is still current.
+    """
+    venv = Path(venv).absolute()
+    paths = [venv / "bin", *sorted(venv.glob("lib*/python*/site-packages"))]
+    # e.g., editable installs add .pth and dist-info entries
+    paths.extend(p for d in paths[1:] for p in sorted(d.iterdir()))
+    mtimes = {str(p): p.stat().st_mtime_ns for p in paths if p.exists()}
+    return get_fingerprint({"venv": str(venv), "mtimes": mtimes})
+
+
+def pack_venv(venv: str | Path, stage_dir: str | Path | None = None) -> Path:
+    """Pack a venv into an archive that can be extracted anywhere.
+
+    The archive is named after `get_venv_key`, so a venv is only packed
+    again after it changed. Symlinks (e.g., ``bin/python`` to the base
+    interpreter) are kept as they are and ``__pycache__`` is included, so
+    imports from the extracted venv do not have to compile anything. Scripts
+    in ``bin`` keep the shebang of the original venv, so the worker is run
+    with ``python`` from the extracted venv instead.
+    """
+    venv = Path(venv).absolute()
+    if not (venv / "pyvenv.cfg").exists():
+        # e.g., a conda environment or the system prefix, which cannot be
+        # moved to another path
+        msg = f"not a venv (no pyvenv.cfg): {venv}"
+        raise ValueError(msg)
+    stage_dir = Path(stage_dir) if stage_dir else get_stage_dir()
+    archive = stage_dir / f"venv-{get_venv_key(venv)}.tar.gz"
+    if archive.exists():
+        return archive
+    stage_dir.mkdir(parents=True, exist_ok=True)
+    # write and rename so concurrent sweeps never extract a partial archive
+    tmp = archive.with_name(f".{archive.name}.{os.getpid()}")
+    try:
+        # level 1: the archive is read by every node, extracting is the cost
+        with tarfile.open(tmp, "w:gz", compresslevel=1) as tar:
+            for path in sorted(venv.iterdir()):
+                tar.add(path, arcname=path.name)
+        tmp.replace(archive)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return archive
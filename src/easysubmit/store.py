@@ -0,0 +1,479 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from collections.abc import Generator, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+__all__ = [
+    "FileTaskStore",
+    "SQLiteTaskStore",
+    "TaskStore",
+    "get_task_store",
+    "migrate",
+]
+
+# journal modes of `SQLiteTaskStore`, see https://sqlite.org/pragma.html
+SQLITE_JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+
+
+class TaskStore:
+    """Storage for task configs, claims, states and run manifests.
+
+    ``schedule`` adds tasks and manifests, and workers claim tasks and
+    record their state. A claim must be atomic: for a given fingerprint,
+    exactly one ``claim`` call may succeed until the claim is released.
+    """
+
+    def add_task(self, fingerprint: str, config: dict[str, Any]) -> bool:
+        # returns False if the task was already in the store
+        raise NotImplementedError
+
+    def get_task(self, fingerprint: str) -> dict[str, Any]:
+        # raises KeyError if the task is not in the store
+        raise NotImplementedError
+
+    def iter_tasks(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def claim(self, fingerprint: str, job_id: str) -> bool:
+        raise NotImplementedError
+
+    def get_claim(self, fingerprint: str) -> str | None:
+        # job id of the worker that claimed the task
+        raise NotImplementedError
+
+    def release(self, fingerprint: str) -> None:
+        raise NotImplementedError
+
+    def set_state(self, fingerprint: str, state: str) -> None:
+        raise NotImplementedError
+
+    def get_state(self, fingerprint: str) -> str | None:
+        raise NotImplementedError
+
+    def set_heartbeat(
+        self,
+        fingerprint: str,
+        job_id: str,
+        progress: Any = None,
+        timestamp: float | None = None,
+    ) -> None:
+        # written periodically by the worker running the task, at `timestamp`
+        # (now by default)
+        raise NotImplementedError
+
+    def get_heartbeat(self, fingerprint: str) -> dict[str, Any] | None:
+        # {"job_id": ..., "time": ..., "progress": ...} of the last heartbeat
+        raise NotImplementedError
+
+    def delete_heartbeat(self, fingerprint: str) -> None:
+        raise NotImplementedError
+
+    def iter_heartbeats(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def add_manifest(self, run_id: str, manifest: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def get_manifest(self, run_id: str) -> dict[str, Any]:
+        raise NotImplementedError
+
+    def iter_manifests(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def get_value(self, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set_value(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def iter_values(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    @contextmanager
+    def batch(self) -> Generator[None, None, None]:
+        # group many writes, e.g., adding the tasks of a run
+        yield
+
+
+class FileTaskStore(TaskStore):
+    """One file per task, claim and manifest in ``base_dir``.
+
+    This is the original layout: ``{fingerprint}-task.json``, the claim file
+    ``{fingerprint}-worker.txt`` holding the job id, the heartbeat of running
+    tasks ``{fingerprint}-heartbeat.json``, ``manifest-{run_id}.json`` and
+    ``{key}.json`` for other values.
+    """
+
+    def __init__(self, base_dir: str | Path):
+        self.base_dir = Path(base_dir)
+
+    def add_task(self, fingerprint: str, config: dict[str, Any]) -> bool:
+        try:
+            with open(
+                self.base_dir / f"{fingerprint}-task.json", "x", encoding="utf-8"
+            ) as f:
+                json.dump(config, f, indent=4)
+        except FileExistsError:
+            return False
+        return True
+
+    def get_task(self, fingerprint: str) -> dict[str, Any]:
+        try:
+            with open(
+                self.base_dir / f"{fingerprint}-task.json", "r", encoding="utf-8"
+            ) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(fingerprint) from None
+
+    def iter_tasks(self) -> Iterator[str]:
+        for path in self.base_dir.glob("*-task.json"):
+            yield path.name[: -len("-task.json")]
+
+    def claim(self, fingerprint: str, job_id: str) -> bool:
+        try:
+            with open(
+                self.base_dir / f"{fingerprint}-worker.txt", "x", encoding="utf-8"
+            ) as f:
+                f.write(str(job_id))
+        except FileExistsError:
+            return False
+        return True
+
+    def get_claim(self, fingerprint: str) -> str | None:
+        try:
+            with open(
+                self.base_dir / f"{fingerprint}-worker.txt", "r", encoding="utf-8"
+            ) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def release(self, fingerprint: str) -> None:
+        (self.base_dir / f"{fingerprint}-worker.txt").unlink(missing_ok=True)
+
+    def set_state(self, fingerprint: str, state: str) -> None:
+        path = self.base_dir / f"{fingerprint}-state.txt"
+        # write and rename so readers never see a partial state
+        tmp = path.with_name(f".{path.name}.{os.getpid()}")
+        tmp.write_text(state, encoding="utf-8")
+        tmp.replace(path)
+
+    def get_state(self, fingerprint: str) -> str | None:
+        try:
+            return (self.base_dir / f"{fingerprint}-state.txt").read_text(
+                encoding="utf-8"
+            )
+        except FileNotFoundError:
+            return None
+
+    def set_heartbeat(
+        self,
+        fingerprint: str,
+        job_id: str,
+        progress: Any = None,
+        timestamp: float | None = None,
+    ) -> None:
+        path = self.base_dir / f"{fingerprint}-heartbeat.json"
+        if timestamp is None:
+            timestamp = time.time()
+        heartbeat = {"job_id": str(job_id), "time": timestamp, "progress": progress}
+        tmp = path.with_name(f".{path.name}.{os.getpid()}")
+        tmp.write_text(json.dumps(heartbeat), encoding="utf-8")
+        tmp.replace(path)
+
+    def get_heartbeat(self, fingerprint: str) -> dict[str, Any] | None:
+        try:
+            with open(
+                self.base_dir / f"{fingerprint}-heartbeat.json", "r", encoding="utf-8"
+            ) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def delete_heartbeat(self, fingerprint: str) -> None:
+        (self.base_dir / f"{fingerprint}-heartbeat.json").unlink(missing_ok=True)
+
+    def iter_heartbeats(self) -> Iterator[str]:
+        for path in self.base_dir.glob("*-heartbeat.json"):
+            yield path.name[: -len("-heartbeat.json")]
+
+    def add_manifest(self, run_id: str, manifest: dict[str, Any]) -> None:
+        with open(
+            self.base_dir / f"manifest-{run_id}.json", "w", encoding="utf-8"
+        ) as f:
+            json.dump(manifest, f)
+
+    def get_manifest(self, run_id: str) -> dict[str, Any]:
+        with open(
+            self.base_dir / f"manifest-{run_id}.json", "r", encoding="utf-8"
+        ) as f:
+            return json.load(f)
+
+    def iter_manifests(self) -> Iterator[str]:
+        for path in self.base_dir.glob("manifest-*.json"):
+            yield path.name[len("manifest-") : -len(".json")]
+
+    def get_value(self, key: str, default: Any = None) -> Any:
+        try:
+            with open(self.base_dir / f"{key}.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    def set_value(self, key: str, value: Any) -> None:
+        with open(self.base_dir / f"{key}.json", "w", encoding="utf-8") as f:
+            json.dump(value, f)
+
+    def iter_values(self) -> Iterator[str]:
+        for path in self.base_dir.glob("*.json"):
+            if path.name.endswith(("-task.json", "-heartbeat.json")):
+                continue
+            if path.name.startswith("manifest-"):
+                continue
+            yield path.name[: -len(".json")]
+
+
+class SQLiteTaskStore(TaskStore):
+    """All tasks, claims, states and manifests in a single SQLite database.
+
+    Claims are a conditional update in one transaction, so they stay atomic
+    across processes and nodes as long as the filesystem supports POSIX
+    locks. The default rollback journal (``journal_mode="DELETE"``) works on
+    network filesystems such as NFS; WAL mode is faster but needs shared
+    memory between readers, so only use it when all workers share the
+    filesystem of the database locally (``store="sqlite:wal"``).
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        fingerprint TEXT PRIMARY KEY,
+        config TEXT NOT NULL,
+        job_id TEXT,
+        state TEXT,
+        updated_at REAL
+    );
+    CREATE TABLE IF NOT EXISTS heartbeats (
+        fingerprint TEXT PRIMARY KEY,
+        job_id TEXT NOT NULL,
+        time REAL NOT NULL,
+        progress TEXT
+    );
+    CREATE TABLE IF NOT EXISTS manifests (
+        run_id TEXT PRIMARY KEY,
+        manifest TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS kv (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, path: str | Path, journal_mode: str = "DELETE"):
+        self.path = Path(path)
+        self.journal_mode = journal_mode
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # connections must not be shared with forked processes
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(
+                self.path, timeout=60, isolation_level=None, check_same_thread=False
+            )
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            conn.executescript(self.SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"path": self.path, "journal_mode": self.journal_mode}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def add_task(self, fingerprint: str, config: dict[str, Any]) -> bool:
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO tasks (fingerprint, config) VALUES (?, ?)",
+            (fingerprint, json.dumps(config)),
+        )
+        return cursor.rowcount == 1
+
+    def get_task(self, fingerprint: str) -> dict[str, Any]:
+        row = self.conn.execute(
+            "SELECT config FROM tasks WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(fingerprint)
+        return json.loads(row[0])
+
+    def iter_tasks(self) -> Iterator[str]:
+        for (fingerprint,) in self.conn.execute("SELECT fingerprint FROM tasks"):
+            yield fingerprint
+
+    def claim(self, fingerprint: str, job_id: str) -> bool:
+        cursor = self.conn.execute(
+            "UPDATE tasks SET job_id = ?, updated_at = ?"
+            " WHERE fingerprint = ? AND job_id IS NULL",
+            (str(job_id), time.time(), fingerprint),
+        )
+        return cursor.rowcount == 1
+
+    def get_claim(self, fingerprint: str) -> str | None:
+        row = self.conn.execute(
+            "SELECT job_id FROM tasks WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def release(self, fingerprint: str) -> None:
+        self.conn.execute(
+            "UPDATE tasks SET job_id = NULL, updated_at = ? WHERE fingerprint = ?",
+            (time.time(), fingerprint),
+        )
+
+    def set_state(self, fingerprint: str, state: str) -> None:
+        self.conn.execute(
+            "UPDATE tasks SET state = ?, updated_at = ? WHERE fingerprint = ?",
+            (state, time.time(), fingerprint),
+        )
+
+    def get_state(self, fingerprint: str) -> str | None:
+        row = self.conn.execute(
+            "SELECT state FROM tasks WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set_heartbeat(
+        self,
+        fingerprint: str,
+        job_id: str,
+        progress: Any = None,
+        timestamp: float | None = None,
+    ) -> None:
+        if timestamp is None:
+            timestamp = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO heartbeats (fingerprint, job_id, time, progress)"
+            " VALUES (?, ?, ?, ?)",
+            (fingerprint, str(job_id), timestamp, json.dumps(progress)),
+        )
+
+    def get_heartbeat(self, fingerprint: str) -> dict[str, Any] | None:
+        row = self.conn.execute(
+            "SELECT job_id, time, progress FROM heartbeats WHERE fingerprint = ?",
+            (fingerprint,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"job_id": row[0], "time": row[1], "progress": json.loads(row[2])}
+
+    def delete_heartbeat(self, fingerprint: str) -> None:
+        self.conn.execute(
+            "DELETE FROM heartbeats WHERE fingerprint = ?", (fingerprint,)
+        )
+
+    def iter_heartbeats(self) -> Iterator[str]:
+        for (fingerprint,) in self.conn.execute(
+            "SELECT fingerprint FROM heartbeats"
+        ).fetchall():
+            yield fingerprint
+
+    def add_manifest(self, run_id: str, manifest: dict[str, Any]) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO manifests (run_id, manifest) VALUES (?, ?)",
+            (run_id, json.dumps(manifest)),
+        )
+
+    def get_manifest(self, run_id: str) -> dict[str, Any]:
+        row = self.conn.execute(
+            "SELECT manifest FROM manifests WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(run_id)
+        return json.loads(row[0])
+
+    def iter_manifests(self) -> Iterator[str]:
+        for (run_id,) in self.conn.execute("SELECT run_id FROM manifests"):
+            yield run_id
+
+    def get_value(self, key: str, default: Any = None) -> Any:
+        row = self.conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set_value(self, key: str, value: Any) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)",
+            (key, json.dumps(value)),
+        )
+
+    def iter_values(self) -> Iterator[str]:
+        for (key,) in self.conn.execute("SELECT key FROM kv"):
+            yield key
+
+    @contextmanager
+    def batch(self) -> Generator[None, None, None]:
+        if self.conn.in_transaction:
+            yield
+            return
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+
+def get_task_store(base_dir: str | Path, store: TaskStore | str | None) -> TaskStore:
+    if isinstance(store, TaskStore):
+        return store
+    if store is None or store == "file":
+        return FileTaskStore(base_dir)
+    if store == "sqlite" or store.startswith("sqlite:"):
+        # e.g., "sqlite:wal" for the journal mode
+        journal_mode = (store.partition(":")[2] or "delete").upper()
+        if journal_mode in SQLITE_JOURNAL_MODES:
+            return SQLiteTaskStore(Path(base_dir) / "tasks.db", journal_mode)
+    msg = f"unknown task store: {store}"
+    raise ValueError(msg)
+
+
+def migrate(source: TaskStore, target: TaskStore) -> int:
+    """Copy all tasks, claims, states, heartbeats, manifests and values.
+
+    Tasks already in the target are left as they are. Returns the number of
+    tasks copied, e.g., ``migrate(FileTaskStore(d), SQLiteTaskStore(d /
+    "tasks.db"))`` moves an existing ``base_dir`` to the SQLite store.
+    """
+    count = 0
+    for fingerprint in source.iter_tasks():
+        if not target.add_task(fingerprint, source.get_task(fingerprint)):
+            continue
+        job_id = source.get_claim(fingerprint)
+        if job_id is not None:
+            target.claim(fingerprint, job_id)
+        state = source.get_state(fingerprint)
+        if state is not None:
+            target.set_state(fingerprint, state)
+        heartbeat = source.get_heartbeat(fingerprint)
+        if heartbeat is not None:
+            # with its time, or a lost task would look alive for a while
+            target.set_heartbeat(
+                fingerprint,
+                heartbeat["job_id"],
+                heartbeat["progress"],
+                heartbeat["time"],
+            )
+        count += 1
+    for run_id in source.iter_manifests():
+        target.add_manifest(run_id, source.get_manifest(run_id))
+    for key in source.iter_values():
+        target.set_value(key, source.get_value(key))
+    return count
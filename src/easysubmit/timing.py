@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from collections.abc import Generator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, TextIO
+
+from typing_extensions import Self
+
+from easysubmit.helpers import get_percentile
+
+__all__ = [
+    "TimingLog",
+    "get_timing_dir",
+    "read_timings",
+    "summarize_timings",
+]
+
+# events of run {run_id} are in base_dir/timing/{run_id}, one file per job
+# (array element) and one for the submission
+TIMING_DIR = "timing"
+
+SUBMIT_FILE = "submit.jsonl"
+
+PERCENTILES = (50.0, 90.0, 99.0)
+
+# phases of a worker, in the order they happen
+PHASES = (
+    "queue",
+    "setup",
+    "import",
+    "manifest",
+    "modules",
+    "claim",
+    "run",
+    "total",
+)
+
+
+def get_timing_dir(base_dir: str | Path, run_id: str) -> Path:
+    return Path(base_dir) / TIMING_DIR / run_id
+
+
+def _get_env_time(name: str) -> float | None:
+    # set by the batch script with `date +%s.%N`
+    try:
+        return float(os.environ[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def get_job_start_time() -> float | None:
+    # EASYSUBMIT_START_TIME is set when the batch script starts
+    return _get_env_time("EASYSUBMIT_START_TIME")
+
+
+def get_job_exec_time() -> float | None:
+    # EASYSUBMIT_EXEC_TIME is set right before the worker command runs
+    return _get_env_time("EASYSUBMIT_EXEC_TIME")
+
+
+class TimingLog:
+    """Appends timing events to a JSONL file, while used as a context manager.
+
+    Each line is one event, ``{"event": ..., "time": ..., ...}``, with the
+    ``duration`` in seconds and the ``status`` ("ok" or the name of the
+    exception raised) of timed phases. Lines are flushed as they are
+    written, so the events of a worker that was killed are kept.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._file: TextIO | None = None
+
+    def __enter__(self) -> Self:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def write(self, event: str, **fields: Any) -> None:
+        if self._file is None:
+            msg = "TimingLog is not open, use it in a with statement"
+            raise RuntimeError(msg)
+        record = {"event": event, "time": time.time(), **fields}
+        self._file.write(json.dumps(record, default=str) + "\n")
+        self._file.flush()
+
+    @contextmanager
+    def phase(self, event: str, **fields: Any) -> Generator[None, None, None]:
+        start = time.monotonic()
+        status = "ok"
+        try:
+            yield
+        except BaseException as e:
+            status = type(e).__name__
+            raise
+        finally:
+            duration = time.monotonic() - start
+            self.write(event, duration=duration, status=status, **fields)
+
+
+def read_timings(base_dir: str | Path, run_id: str) -> list[dict[str, Any]]:
+    # events of all jobs of a run, each with the id of the job that wrote it
+    events = []
+    for path in sorted(get_timing_dir(base_dir, run_id).glob("*.jsonl")):
+        job_id = None if path.name == SUBMIT_FILE else path.stem
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # cut off when the job was killed
+                event.setdefault("job_id", job_id)
+                events.append(event)
+    return events
+
+
+def _get_durations(events: list[dict[str, Any]]) -> dict[str, list[float]]:
+    durations: dict[str, list[float]] = defaultdict(list)
+    submitted = [e["time"] for e in events if e["event"] == "submit"]
+    submit_time = min(submitted) if submitted else None
+    # start of the batch script of each job (again if it was requeued)
+    started: dict[str, float] = {}
+    for event in events:
+        name = event["event"]
+        if name == "start":
+            start, exec_time = event.get("start_time"), event.get("exec_time")
+            if start is not None and submit_time is not None:
+                durations["queue"].append(start - submit_time)
+            if start is not None and exec_time is not None:
+                durations["setup"].append(exec_time - start)
+            # from the worker command to `schedule` being called
+            since = exec_time if exec_time is not None else start
+            if since is not None:
+                durations["import"].append(event["time"] - since)
+            started[event["job_id"]] = start if start is not None else event["time"]
+        elif name in {"manifest", "modules", "claim", "run"}:
+            if event.get("duration") is not None:
+                durations[name].append(event["duration"])
+        elif name == "worker" and event["job_id"] in started:
+            durations["total"].append(event["time"] - started[event["job_id"]])
+    return durations
+
+
+def summarize_timings(
+    base_dir: str | Path, run_id: str | None = None
+) -> dict[str, dict[str, Any]]:
+    """Percentiles of the duration of each phase of the workers of runs.
+
+    Phases are the time spent in the queue (from submission to the start of
+    the batch script), setting up the environment (modules and venv),
+    starting Python and importing the script, reading the manifest, importing
+    the modules of the tasks, claiming tasks, running tasks and the whole
+    job. Returns ``{run_id: {"phases":
+    {phase: {"count", "p50", "p90", "p99", "max", "sum"}}, "runs": {status:
+    count}, "exits": {status: count}}}`` for one or all runs in
+    ``base_dir``.
+    """
+    if run_id is None:
+        timing_dir = Path(base_dir) / TIMING_DIR
+        run_ids = (
+            sorted(p.name for p in timing_dir.iterdir()) if timing_dir.exists() else []
+        )
+    else:
+        run_ids = [run_id]
+    summary = {}
+    for run in run_ids:
+        events = read_timings(base_dir, run)
+        phases = {}
+        for phase, values in _get_durations(events).items():
+            phases[phase] = {
+                "count": len(values),
+                **{f"p{p:g}": get_percentile(values, p) for p in PERCENTILES},
+                "max": max(values),
+                "sum": sum(values),
+            }
+        runs: dict[str, int] = defaultdict(int)
+        exits: dict[str, int] = defaultdict(int)
+        for event in events:
+            if event["event"] == "run":
+                runs[event["status"]] += 1
+            elif event["event"] == "worker":
+                exits[event["status"]] += 1
+        summary[run] = {
+            "phases": {p: phases[p] for p in PHASES if p in phases},
+            "runs": dict(runs),
+            "exits": dict(exits),
+        }
+    return summary
+
+
+def _format_summary(summary: dict[str, dict[str, Any]]) -> str:
+    columns = ["count", *(f"p{p:g}" for p in PERCENTILES), "max", "sum"]
+    lines = []
+    for run_id, run in summary.items():
+        lines.append(f"run {run_id}")
+        lines.append(f"  {'phase':<10}" + "".join(f"{c:>10}" for c in columns))
+        for phase, stats in run["phases"].items():
+            values = [f"{stats['count']:>10d}"]
+            values.extend(f"{stats[c]:>10.2f}" for c in columns[1:])
+            lines.append(f"  {phase:<10}" + "".join(values))
+        for key in ("runs", "exits"):
+            if run[key]:
+                counts = ", ".join(f"{s}: {n}" for s, n in sorted(run[key].items()))
+                lines.append(f"  {key}: {counts}")
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m easysubmit.timing",
+        description="Summarize the timing events of the workers of runs.",
+    )
+    parser.add_argument("base_dir")
+    parser.add_argument("--run-id", default=None)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args(argv)
+    summary = summarize_timings(args.base_dir, args.run_id)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(_format_summary(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
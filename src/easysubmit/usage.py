@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from typing import Any
+
+from easysubmit.entities import Cluster
+from easysubmit.helpers import get_percentile
+from easysubmit.store import TaskStore
+
+__all__ = [
+    "collect_usage",
+    "get_usage",
+    "suggest_resources",
+]
+
+# usage records of a config class are stored as "usage-{name}" values
+USAGE_KEY_PREFIX = "usage-"
+
+DEFAULT_PERCENTILE = 95.0
+
+# requested = percentile * margin, so slightly larger tasks still fit
+DEFAULT_MARGIN = 1.2
+
+# fewer finished tasks than this are not enough to size new submissions
+MIN_SAMPLES = 5
+
+
+def get_usage(store: TaskStore, name: str) -> dict[str, dict[str, Any]]:
+    # usage records of the tasks of a config class keyed by fingerprint
+    return store.get_value(f"{USAGE_KEY_PREFIX}{name}", {})
+
+
+def collect_usage(cluster: Cluster, store: TaskStore) -> int:
+    """Record the resource usage of finished tasks that have none yet.
+
+    Usage is read once per job through ``cluster.get_usage`` and stored per
+    config class with the fingerprint of each task the job ran. Returns the
+    number of tasks recorded.
+    """
+    recorded = set()
+    for key in store.iter_values():
+        if key.startswith(USAGE_KEY_PREFIX):
+            recorded.update(store.get_value(key, {}))
+    # tasks of each job, a multi-task worker runs several
+    claims: dict[str, list[str]] = defaultdict(list)
+    for fingerprint in store.iter_tasks():
+        if fingerprint in recorded:
+            continue
+        if store.get_state(fingerprint) not in {"completed", "failed"}:
+            continue
+        job_id = store.get_claim(fingerprint)
+        if job_id is not None:
+            claims[job_id].append(fingerprint)
+    if not claims:
+        return 0
+    usage = cluster.get_usage(list(claims))
+    records: dict[str, dict[str, dict[str, Any]]] = defaultdict(dict)
+    for job_id, fingerprints in claims.items():
+        if job_id not in usage:
+            continue  # still running or not in the accounting database
+        for fingerprint in fingerprints:
+            name = store.get_task(fingerprint)["name"]
+            records[name][fingerprint] = {
+                **usage[job_id],
+                "job_id": job_id,
+                "tasks": len(fingerprints),
+            }
+    for name, new in records.items():
+        store.set_value(f"{USAGE_KEY_PREFIX}{name}", {**get_usage(store, name), **new})
+    return sum(map(len, records.values()))
+
+
+def _format_memory(value: float) -> str:
+    return f"{math.ceil(value / 2**20)}M"
+
+
+def _format_time(value: float) -> str:
+    # whole minutes, as "days-hours:minutes:seconds"
+    minutes = max(math.ceil(value / 60), 1)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    time = f"{hours:02d}:{minutes:02d}:00"
+    return f"{days}-{time}" if days else time
+
+
+def suggest_resources(
+    store: TaskStore,
+    name: str,
+    percentile: float = DEFAULT_PERCENTILE,
+    margin: float = DEFAULT_MARGIN,
+    min_samples: int = MIN_SAMPLES,
+) -> dict[str, str]:
+    """Suggest ``mem`` and ``time`` for new tasks of a config class.
+
+    Based on the completed tasks recorded by ``collect_usage``: the given
+    percentile of their peak memory and run time times ``margin``. Run times
+    only come from jobs that ran a single task. Returns an empty dict (or
+    leaves out ``time``) until there are ``min_samples`` tasks to go by.
+    """
+    completed = [
+        record
+        for record in get_usage(store, name).values()
+        if record.get("state") == "COMPLETED"
+    ]
+    suggestion = {}
+    memory = [r["max_rss"] for r in completed if r.get("max_rss")]
+    if len(memory) >= min_samples:
+        suggestion["mem"] = _format_memory(get_percentile(memory, percentile) * margin)
+    elapsed = [
+        r["elapsed"]
+        for r in completed
+        if r.get("elapsed") is not None and r.get("tasks") == 1
+    ]
+    if len(elapsed) >= min_samples:
+        suggestion["time"] = _format_time(get_percentile(elapsed, percentile) * margin)
+    return suggestion
@@ -0,0 +1,79 @@
+"""Entry point of workers: ``python -m easysubmit.worker BASE_DIR --run-id=ID``.
+
+Rather than running the submitting script again, which imports everything it
+imports and parses its arguments, the worker only imports the modules that
+define the task classes of the run, as recorded in its manifest by
+`schedule`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+
+from easysubmit.base import run_step, run_worker
+from easysubmit.entities import Cluster
+from easysubmit.local import LocalCluster
+from easysubmit.slurm import SLURMCluster, SLURMConfig
+
+__all__ = [
+    "get_cluster",
+    "main",
+]
+
+CLUSTERS = ("slurm", "local")
+
+
+def get_cluster(name: str, time: str | None = None) -> Cluster:
+    # the cluster as seen from a worker, see `Cluster.get_worker_args`
+    if name == "slurm":
+        # modules and venv are set up by the batch script already
+        config = SLURMConfig(modules=[], venv=None)
+        if time is not None:
+            config.time = time
+        return SLURMCluster(config)
+    if name == "local":
+        return LocalCluster()
+    msg = f"unknown cluster: {name}"
+    raise ValueError(msg)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m easysubmit.worker",
+        description="Run the tasks of an array element of a run.",
+    )
+    parser.add_argument("base_dir")
+    parser.add_argument("--run-id", required=True)
+    parser.add_argument("--cluster", choices=CLUSTERS, required=True)
+    parser.add_argument(
+        "--time", default=None, help="time limit of the job, if not in its environment"
+    )
+    parser.add_argument("--store", default=None)
+    parser.add_argument("--cache", nargs="?", const=True, default=None)
+    parser.add_argument("--task", default=None, help="run a task as a job step")
+    args = parser.parse_args(argv)
+    cluster = get_cluster(args.cluster, args.time)
+    if args.task is not None:
+        run_step(
+            cluster,
+            Path(args.base_dir),
+            args.run_id,
+            args.task,
+            store=args.store,
+            cache=args.cache,
+        )
+    run_worker(
+        cluster,
+        Path(args.base_dir),
+        args.run_id,
+        store=args.store,
+        cache=args.cache,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+import sys
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def argv(monkeypatch: pytest.MonkeyPatch):
+    # `schedule` reads its own arguments, not those of pytest
+    monkeypatch.setattr(sys, "argv", ["easysubmit-test"])
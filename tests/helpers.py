@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any, Callable, ClassVar
+
+from easysubmit.entities import Cluster, Job, Task, TaskConfig
+
+
+class RecordingCluster(Cluster):
+    """Records submissions instead of running them."""
+
+    def __init__(self, usage: dict[str, dict[str, Any]] | None = None):
+        self.submitted: list[dict[str, Any]] = []
+        self.usage = usage or {}
+
+    def schedule(
+        self,
+        __args: Sequence[str],
+        __format_hook: Callable | None = None,
+        **kwargs,
+    ) -> Job:
+        self.submitted.append({"args": list(__args), **kwargs})
+        return Job(str(len(self.submitted)))
+
+    def get_usage(self, job_ids: Sequence[str]) -> dict[str, dict[str, Any]]:
+        return {
+            job_id: self.usage[job_id] for job_id in job_ids if job_id in self.usage
+        }
+
+
+class SizedConfig(TaskConfig):
+    name: ClassVar[str] = "SizedConfig"
+    index: int = 0
+    size: str = "small"
+
+    def get_resources(self) -> dict[str, Any]:
+        if self.size == "large":
+            return {"mem": "8G", "time": "2:00:00"}
+        return {"mem": "1G"}
+
+
+class SizedTask(Task):
+    config: SizedConfig
+
+    def run(self):
+        return self.config.index
+
+
+class DependentConfig(TaskConfig):
+    name: ClassVar[str] = "DependentConfig"
+    parent: int = 0
+
+    def get_dependencies(self) -> list[TaskConfig | str]:
+        return [SizedConfig(index=self.parent)]
+
+    def get_resources(self) -> dict[str, Any]:
+        return {"mem": "8G"}
+
+
+class DependentTask(Task):
+    config: DependentConfig
+
+    def run(self):
+        return self.config.parent
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import ClassVar
+
+import pytest
+
+from easysubmit.base import MAX_STEAL_MISSES, _iter_candidates, schedule
+from easysubmit.entities import Task, TaskConfig
+from easysubmit.store import FileTaskStore
+from tests.helpers import DependentConfig, RecordingCluster, SizedConfig
+
+
+class CycleConfig(TaskConfig):
+    name: ClassVar[str] = "CycleConfig"
+    index: int = 0
+
+    def get_dependencies(self) -> list[TaskConfig | str]:
+        return [CycleConfig(index=1 - self.index)]
+
+
+class CycleTask(Task):
+    config: CycleConfig
+
+    def run(self):
+        return self.config.index
+
+
+class CountingStore(FileTaskStore):
+    def __init__(self, base_dir: Path):
+        super().__init__(base_dir)
+        self.reads = 0
+
+    def get_claim(self, fingerprint: str) -> str | None:
+        self.reads += 1
+        return super().get_claim(fingerprint)
+
+
+def _add_tasks(store: FileTaskStore, count: int) -> list[str]:
+    fingerprints = [f"task{i:04d}" for i in range(count)]
+    for fingerprint in fingerprints:
+        store.add_task(fingerprint, {})
+    return fingerprints
+
+
+def test_iter_candidates_own_share_first(tmp_path: Path):
+    store = FileTaskStore(tmp_path)
+    fingerprints = _add_tasks(store, 10)
+    candidates = list(_iter_candidates(fingerprints, 1, 3, store))
+    assert candidates[:3] == fingerprints[1::3]
+    # nothing is claimed, so every task is a candidate exactly once
+    assert sorted(candidates) == fingerprints
+
+
+def test_iter_candidates_without_index(tmp_path: Path):
+    fingerprints = _add_tasks(FileTaskStore(tmp_path), 5)
+    assert list(_iter_candidates(fingerprints, None, 5)) == fingerprints
+
+
+def test_iter_candidates_skips_claimed_shares(tmp_path: Path):
+    store = CountingStore(tmp_path)
+    step = 100
+    fingerprints = _add_tasks(store, 10 * step)
+    # every other worker already claimed all of its tasks
+    for index, fingerprint in enumerate(fingerprints):
+        if index % step:
+            store.claim(fingerprint, str(index % step))
+    candidates = list(_iter_candidates(fingerprints, 0, step, store))
+    assert candidates == fingerprints[::step]
+    # one read per element until MAX_STEAL_MISSES in a row are taken,
+    # rather than one per task of the run
+    assert store.reads == MAX_STEAL_MISSES
+
+
+def test_iter_candidates_steals_unclaimed_tail(tmp_path: Path):
+    store = FileTaskStore(tmp_path)
+    step = 4
+    fingerprints = _add_tasks(store, 12)
+    # worker 1 finished the first two of its tasks, not its last one
+    store.claim(fingerprints[1], "1")
+    store.claim(fingerprints[5], "1")
+    candidates = list(_iter_candidates(fingerprints, 0, step, store))
+    assert fingerprints[9] in candidates
+    assert fingerprints[5] not in candidates
+
+
+def test_schedule_one_array_per_resource_profile(tmp_path: Path):
+    cluster = RecordingCluster()
+    configs = [
+        SizedConfig(index=i, size="large" if i % 3 == 0 else "small") for i in range(6)
+    ]
+    schedule(cluster, configs, tmp_path)
+    submitted = sorted(cluster.submitted, key=lambda s: s["mem"])
+    assert [(s["mem"], s.get("time"), s["array"]) for s in submitted] == [
+        ("1G", None, [0, 1, 2, 3]),
+        ("8G", "2:00:00", [0, 1]),
+    ]
+
+
+def test_schedule_twice_does_not_resubmit_pending_tasks(tmp_path: Path):
+    cluster = RecordingCluster()
+    configs = [SizedConfig(index=i) for i in range(5)]
+    schedule(cluster, configs, tmp_path)
+    # the workers of the first call did not start yet
+    with pytest.raises(RuntimeError, match="no tasks to run"):
+        schedule(cluster, configs, tmp_path)
+    assert len(cluster.submitted) == 1
+
+
+def test_schedule_requeues_failed_tasks(tmp_path: Path):
+    cluster = RecordingCluster()
+    configs = [SizedConfig(index=i) for i in range(3)]
+    schedule(cluster, configs, tmp_path)
+    store = FileTaskStore(tmp_path)
+    for i, config in enumerate(configs):
+        store.claim(config.fingerprint, "1")
+        store.set_state(config.fingerprint, "failed" if i == 1 else "completed")
+    schedule(cluster, configs, tmp_path)
+    assert cluster.submitted[-1]["array"] == [0]
+    assert store.get_state(configs[1].fingerprint) == "queued"
+    assert store.get_claim(configs[1].fingerprint) is None
+
+
+def test_schedule_pairs_dependent_arrays(tmp_path: Path):
+    cluster = RecordingCluster()
+    schedule(cluster, [DependentConfig(parent=i) for i in range(3)], tmp_path)
+    first, second = cluster.submitted
+    assert (first["mem"], first["array"], first.get("dependency")) == (
+        "1G",
+        [0, 1, 2],
+        None,
+    )
+    # element i needs element i of the first array only
+    assert (second["mem"], second["array"]) == ("8G", [0, 1, 2])
+    assert second["dependency"] == "aftercorr:1"
+
+
+def test_schedule_multi_task_workers_wait_for_whole_array(tmp_path: Path):
+    cluster = RecordingCluster()
+    configs = [DependentConfig(parent=i) for i in range(3)]
+    schedule(cluster, configs, tmp_path, worker_count=2)
+    # workers claim any task, so elements cannot be paired
+    assert cluster.submitted[1]["dependency"] == "afterok:1"
+
+
+def test_schedule_rejects_dependency_cycles(tmp_path: Path):
+    with pytest.raises(ValueError, match="dependency cycle"):
+        schedule(RecordingCluster(), [CycleConfig(index=0)], tmp_path)
+
+
+def test_sweep_continues_after_previous_batch(tmp_path: Path):
+    consumed = []
+
+    def configs():
+        for i in range(10):
+            consumed.append(i)
+            yield SizedConfig(index=i)
+
+    cluster = RecordingCluster()
+    store = FileTaskStore(tmp_path)
+    schedule(cluster, configs(), tmp_path, max_task_count=2, sweep="grid")
+    # only as far as needed to fill the batch
+    assert max(consumed) <= 2
+    schedule(cluster, configs(), tmp_path, max_task_count=2, sweep="grid")
+    for i in range(4):
+        store.get_task(SizedConfig(index=i).fingerprint)
+    with pytest.raises(KeyError):
+        store.get_task(SizedConfig(index=4).fingerprint)
+    assert [s["array"] for s in cluster.submitted] == [[0, 1], [0, 1]]
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from easysubmit.base import _should_requeue
+from easysubmit.cache import ResultCache, get_result_cache
+from easysubmit.store import FileTaskStore
+
+
+@pytest.mark.parametrize("serializer", ["pickle", "json"])
+def test_result_hit(tmp_path: Path, serializer: str):
+    cache = ResultCache(tmp_path, serializer=serializer)
+    assert not cache.has_result("a")
+    cache.set_result("a", {"loss": 0.5})
+    assert cache.has_result("a")
+    assert cache.get_result("a") == {"loss": 0.5}
+    cache.set_failure("b", "Traceback ...")
+    assert not cache.has_result("b")
+    with pytest.raises(KeyError):
+        cache.get_result("b")
+
+
+def _age(cache: ResultCache, fingerprint: str, seconds: float) -> None:
+    path = cache._get_path(fingerprint)
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_evict_oldest_until_size_fits(tmp_path: Path):
+    cache = ResultCache(tmp_path)
+    for i, fingerprint in enumerate("abc"):
+        cache.set_result(fingerprint, "x" * 100)
+        _age(cache, fingerprint, 30 - i)
+    size = cache._get_path("a").stat().st_size
+    cache.max_size = 2 * size
+    assert cache.evict() == 1
+    assert not cache.has_result("a")
+    assert cache.has_result("b")
+    assert cache.has_result("c")
+
+
+def test_evict_expired(tmp_path: Path):
+    cache = ResultCache(tmp_path, max_age=60)
+    cache.set_result("old", 1)
+    cache.set_result("new", 2)
+    _age(cache, "old", 120)
+    # expired entries are missing even before they are evicted
+    assert not cache.has_result("old")
+    assert cache.evict() == 1
+    assert cache.get_result("new") == 2
+    assert not cache._get_path("old").exists()
+
+
+def test_completed_task_runs_again_once_evicted(tmp_path: Path):
+    store = FileTaskStore(tmp_path)
+    cache = get_result_cache(tmp_path, True)
+    store.add_task("a", {})
+    store.set_state("a", "completed")
+    cache.set_result("a", 1)
+    assert not _should_requeue(store, cache, "a")
+    cache.delete("a")
+    assert _should_requeue(store, cache, "a")
+    # without a cache, completed tasks never run again
+    assert not _should_requeue(store, None, "a")
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import os
+import signal
+import time
+from pathlib import Path
+from typing import ClassVar
+
+import pytest
+
+from easysubmit.base import MAX_REQUEUES, PREEMPTED_EXIT_CODE, run_worker
+from easysubmit.checkpoint import PREEMPTION_SIGNAL_ENV, get_preemption_signals
+from easysubmit.entities import Cluster, Job, Task, TaskConfig
+from easysubmit.store import FileTaskStore
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(signal, "SIGUSR1"), reason="no SIGUSR1 on this platform"
+)
+
+
+@pytest.fixture(autouse=True)
+def preemption_signal(monkeypatch: pytest.MonkeyPatch):
+    # as exported by the batch script of `SLURMConfig(signal="B:USR1@300")`
+    monkeypatch.setenv(PREEMPTION_SIGNAL_ENV, "USR1")
+
+
+class PreemptedTaskConfig(TaskConfig):
+    name: ClassVar[str] = "PreemptedTaskConfig"
+    signal: bool = False
+    # signal the worker from a pool process, as SLURM signals the batch shell
+    signal_worker: bool = False
+
+
+class PreemptedTask(Task):
+    config: PreemptedTaskConfig
+
+    def run(self):
+        if self.config.signal:
+            # as SLURM does ahead of the time limit
+            os.kill(os.getpid(), signal.SIGUSR1)
+        if self.config.signal_worker:
+            os.kill(os.getppid(), signal.SIGUSR1)
+            # until the worker passes the signal on
+            time.sleep(30)
+
+
+class SingleJobCluster(Cluster):
+    restart_count = 0
+
+    def get_job(self, job_id: str | None = None) -> Job:
+        return Job("1")
+
+    def get_restart_count(self) -> int:
+        return self.restart_count
+
+
+class SignalOnClaimStore(FileTaskStore):
+    def claim(self, fingerprint: str, job_id: str) -> bool:
+        # the signal arrives between two tasks
+        os.kill(os.getpid(), signal.SIGUSR1)
+        return super().claim(fingerprint, job_id)
+
+
+def _add_run(
+    store: FileTaskStore, configs: list[PreemptedTaskConfig], **manifest
+) -> list[str]:
+    fingerprints = []
+    for config in configs:
+        fingerprint = config.fingerprint
+        store.add_task(fingerprint, config.to_dict())
+        fingerprints.append(fingerprint)
+    store.add_manifest("run", {"tasks": fingerprints, "workers": 1, **manifest})
+    return fingerprints
+
+
+def _assert_requeued(store: FileTaskStore, fingerprint: str) -> None:
+    assert store.get_state(fingerprint) == "queued"
+    assert store.get_claim(fingerprint) is None
+    assert store.get_heartbeat(fingerprint) is None
+
+
+def _run_worker(tmp_path: Path, store: FileTaskStore) -> int:
+    previous = {sig: signal.getsignal(sig) for sig in get_preemption_signals()}
+    try:
+        with pytest.raises(SystemExit) as info:
+            run_worker(SingleJobCluster(), tmp_path, "run", store=store)
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    return info.value.code
+
+
+def test_preempted_task_is_requeued(tmp_path: Path):
+    store = FileTaskStore(tmp_path)
+    first, second = _add_run(
+        store, [PreemptedTaskConfig(signal=True), PreemptedTaskConfig()]
+    )
+    assert _run_worker(tmp_path, store) == PREEMPTED_EXIT_CODE
+    _assert_requeued(store, first)
+    # never claimed, the next job takes it
+    assert store.get_claim(second) is None
+
+
+def test_signal_while_claiming_requeues_task(tmp_path: Path):
+    store = SignalOnClaimStore(tmp_path)
+    (fingerprint,) = _add_run(store, [PreemptedTaskConfig()])
+    assert _run_worker(tmp_path, store) == PREEMPTED_EXIT_CODE
+    _assert_requeued(store, fingerprint)
+
+
+def test_only_configured_signal_preempts(monkeypatch: pytest.MonkeyPatch):
+    assert get_preemption_signals() == (signal.SIGUSR1,)
+    monkeypatch.setenv(PREEMPTION_SIGNAL_ENV, str(int(signal.SIGUSR2)))
+    assert get_preemption_signals() == (signal.SIGUSR2,)
+    # TERM (e.g., of scancel) only counts if it was asked for
+    monkeypatch.delenv(PREEMPTION_SIGNAL_ENV)
+    assert get_preemption_signals() == ()
+
+
+def test_no_preemption_after_max_requeues(tmp_path: Path):
+    store = FileTaskStore(tmp_path)
+    (fingerprint,) = _add_run(store, [PreemptedTaskConfig()])
+    cluster = SingleJobCluster()
+    cluster.restart_count = MAX_REQUEUES
+    run_worker(cluster, tmp_path, "run", store=store)
+    assert store.get_state(fingerprint) == "completed"
+    # the signal now stops the worker, its tasks are recovered as lost ones
+    assert get_preemption_signals() == ()
+
+
+def test_worker_passes_signal_to_pool_processes(tmp_path: Path):
+    store = FileTaskStore(tmp_path)
+    (fingerprint,) = _add_run(
+        store, [PreemptedTaskConfig(signal_worker=True)], parallel=2, run_id="run"
+    )
+    start = time.monotonic()
+    assert _run_worker(tmp_path, store) == PREEMPTED_EXIT_CODE
+    _assert_requeued(store, fingerprint)
+    # stopped by the signal rather than after its sleep
+    assert time.monotonic() - start < 20
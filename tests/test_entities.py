@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from typing import Any, ClassVar
+
+from easysubmit.entities import TaskConfig
+
+
+class ParamsConfig(TaskConfig):
+    name: ClassVar[str] = "ParamsConfig"
+    params: dict[str, Any] | None = None
+    layers: tuple[int, ...] = ()
+
+
+def test_equal_configs_share_fingerprint_and_hash():
+    a = ParamsConfig(params={"lr": 0.1}, layers=(1, 2))
+    b = ParamsConfig(params={"lr": 0.1}, layers=(1, 2))
+    assert a == b
+    assert hash(a) == hash(b)
+    assert len({a, b}) == 1
+
+
+def test_compare_with_other_types():
+    config = ParamsConfig()
+    assert config != None  # noqa: E711
+    assert config != "ParamsConfig"
+    # dict and set lookups with keys of other types
+    assert {config: 1, "other": 2}["other"] == 2
+    assert "other" not in {config}
+
+
+def test_fingerprint_follows_assignment():
+    config = ParamsConfig(layers=(1,))
+    before = config.fingerprint
+    config.layers = (1, 2)
+    assert config.fingerprint != before
+
+
+def test_fingerprint_follows_in_place_changes():
+    config = ParamsConfig(params={"lr": 0.1})
+    before = config.fingerprint
+    config.params["lr"] = 0.2
+    assert config.fingerprint != before
+    assert config == ParamsConfig(params={"lr": 0.2})
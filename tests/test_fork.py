@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import os
+import signal
+from pathlib import Path
+from typing import ClassVar
+
+import pytest
+
+from easysubmit.base import _get_task_output, run_worker
+from easysubmit.entities import Cluster, Job, Task, TaskConfig
+from easysubmit.store import FileTaskStore
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="no fork")
+
+
+class ForkedTaskConfig(TaskConfig):
+    name: ClassVar[str] = "ForkedTaskConfig"
+    index: int = 0
+    # "ok", "raise" or "kill"
+    outcome: str = "ok"
+
+
+class ForkedTask(Task):
+    config: ForkedTaskConfig
+
+    def run(self):
+        # as an extension would, below sys.stdout
+        os.write(1, f"pid {os.getpid()}\n".encode())
+        if self.config.outcome == "raise":
+            raise ValueError("failed on purpose")
+        if self.config.outcome == "kill":
+            # e.g., by the out of memory killer
+            os.kill(os.getpid(), signal.SIGKILL)
+        return os.getpid()
+
+
+class SingleJobCluster(Cluster):
+    def get_job(self, job_id: str | None = None) -> Job:
+        return Job("1")
+
+
+def test_forked_tasks_end_on_their_own(tmp_path: Path):
+    store = FileTaskStore(tmp_path)
+    outcomes = ["ok", "raise", "kill", "ok"]
+    configs = [ForkedTaskConfig(index=i, outcome=o) for i, o in enumerate(outcomes)]
+    fingerprints = [config.fingerprint for config in configs]
+    for config in configs:
+        store.add_task(config.fingerprint, config.to_dict())
+    manifest = {"tasks": fingerprints, "workers": 1, "fork": [], "run_id": "run"}
+    store.add_manifest("run", {**manifest, "parallel": 2})
+    # the worker survives the task killed by a signal and reports both failures
+    with pytest.raises(RuntimeError, match="2 of 4 tasks failed"):
+        run_worker(SingleJobCluster(), tmp_path, "run", store=store)
+    states = [store.get_state(fingerprint) for fingerprint in fingerprints]
+    assert states == ["completed", "failed", "failed", "completed"]
+    # each in a process of its own, with its output in files of its own
+    pids = set()
+    for fingerprint in fingerprints:
+        outfile, _ = _get_task_output(tmp_path, fingerprint)
+        pids.add(int(outfile.read_text().split()[-1]))
+    assert len(pids) == 4
+    assert os.getpid() not in pids
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from easysubmit.base import schedule
+from easysubmit.entities import Cluster
+from easysubmit.heartbeat import Heartbeat, get_lost_tasks, recover_lost_tasks
+from easysubmit.store import FileTaskStore
+from tests.helpers import RecordingCluster, SizedConfig
+
+
+class FinishedJobsCluster(Cluster):
+    def __init__(self, finished: Sequence[str] = ()):
+        self.finished = set(finished)
+
+    def get_usage(self, job_ids: Sequence[str]) -> dict[str, dict[str, Any]]:
+        return {job_id: {} for job_id in job_ids if job_id in self.finished}
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> FileTaskStore:
+    store = FileTaskStore(tmp_path)
+    store.add_task("a", {})
+    return store
+
+
+def _start(store: FileTaskStore, fingerprint: str, job_id: str) -> None:
+    # what a worker records when it claims a task
+    assert store.claim(fingerprint, job_id)
+    store.set_heartbeat(fingerprint, job_id)
+    store.set_state(fingerprint, "running")
+
+
+def test_running_task_is_not_lost(store: FileTaskStore):
+    _start(store, "a", "1")
+    with Heartbeat(store, "a", "1", interval=0.01):
+        time.sleep(0.05)
+        assert recover_lost_tasks(FinishedJobsCluster(), store) == []
+    assert store.get_claim("a") == "1"
+    assert store.get_state("a") == "running"
+
+
+def test_task_of_finished_job_is_requeued(store: FileTaskStore):
+    _start(store, "a", "1")
+    assert recover_lost_tasks(FinishedJobsCluster(["1"]), store) == ["a"]
+    assert store.get_claim("a") is None
+    assert store.get_state("a") == "queued"
+    assert store.get_heartbeat("a") is None
+    # submitted again, so not due a second time
+    assert recover_lost_tasks(FinishedJobsCluster(["1"]), store) == []
+
+
+def test_stale_heartbeat_is_lost(store: FileTaskStore):
+    _start(store, "a", "1")
+    time.sleep(0.05)
+    assert recover_lost_tasks(FinishedJobsCluster(), store, stale_after=0.01) == ["a"]
+
+
+def test_retries_back_off_then_give_up(store: FileTaskStore):
+    cluster = FinishedJobsCluster(["1", "2", "3"])
+    backoff = 0.2
+    _start(store, "a", "1")
+    # the first retry is immediate
+    assert recover_lost_tasks(cluster, store, max_retries=2, backoff=backoff) == ["a"]
+    _start(store, "a", "2")
+    assert recover_lost_tasks(cluster, store, max_retries=2, backoff=backoff) == []
+    entry = get_lost_tasks(store)["a"]
+    assert entry["attempts"] == 2
+    assert entry["retry_at"] > time.time()
+    time.sleep(backoff)
+    assert recover_lost_tasks(cluster, store, max_retries=2, backoff=backoff) == ["a"]
+    # lost for the third time, more than max_retries
+    _start(store, "a", "3")
+    assert recover_lost_tasks(cluster, store, max_retries=2, backoff=backoff) == []
+    assert store.get_state("a") == "lost"
+    assert store.get_claim("a") is None
+
+
+def test_completed_task_is_forgotten(store: FileTaskStore):
+    _start(store, "a", "1")
+    recover_lost_tasks(FinishedJobsCluster(["1"]), store)
+    _start(store, "a", "2")
+    store.delete_heartbeat("a")
+    store.set_state("a", "completed")
+    recover_lost_tasks(FinishedJobsCluster(["1", "2"]), store)
+    assert get_lost_tasks(store) == {}
+
+
+def test_due_tasks_beyond_max_count_wait_for_next_call(tmp_path: Path):
+    store = FileTaskStore(tmp_path)
+    for i in range(5):
+        store.add_task(f"t{i}", {})
+        _start(store, f"t{i}", "1")
+    cluster = FinishedJobsCluster(["1"])
+    first = recover_lost_tasks(cluster, store, max_count=2)
+    assert len(first) == 2
+    # the others are still due, not dropped
+    second = recover_lost_tasks(cluster, store, max_count=2)
+    third = recover_lost_tasks(cluster, store, max_count=2)
+    assert sorted(first + second + third) == [f"t{i}" for i in range(5)]
+    assert recover_lost_tasks(cluster, store) == []
+
+
+def test_schedule_with_max_task_count_retries_all_lost(tmp_path: Path):
+    cluster = RecordingCluster()
+    configs = [SizedConfig(index=i) for i in range(4)]
+    schedule(cluster, configs, tmp_path)
+    store = FileTaskStore(tmp_path)
+    for config in configs:
+        _start(store, config.fingerprint, "1")
+    # the job of all of them finished without completing them
+    cluster.usage["1"] = {"state": "NODE_FAIL"}
+    for _ in range(2):
+        schedule(cluster, configs, tmp_path, max_task_count=2)
+    assert [s["array"] for s in cluster.submitted] == [[0, 1, 2, 3], [0, 1], [0, 1]]
+    assert all(store.get_state(c.fingerprint) == "queued" for c in configs)
+    assert get_lost_tasks(store) == {
+        c.fingerprint: {"attempts": 1, "job_id": "1", "retry_at": None} for c in configs
+    }
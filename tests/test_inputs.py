@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from easysubmit import inputs
+from easysubmit.inputs import InputCache, get_input_key
+
+
+@pytest.fixture
+def source(tmp_path: Path) -> Path:
+    source = tmp_path / "data"
+    (source / "part").mkdir(parents=True)
+    (source / "part" / "a.txt").write_text("a")
+    return source
+
+
+def test_input_key_changes_with_nested_files(source: Path):
+    key = get_input_key(source)
+    assert get_input_key(source) == key
+    file = source / "part" / "a.txt"
+    file.write_text("ab")
+    assert get_input_key(source) != key
+
+
+def test_stage_copies_once(
+    tmp_path: Path, source: Path, monkeypatch: pytest.MonkeyPatch
+):
+    cache = InputCache(tmp_path / "cache", max_size=10**9)
+    keys = []
+    monkeypatch.setattr(
+        inputs, "get_input_key", lambda path: keys.append(path) or get_input_key(path)
+    )
+    with cache.stage({"train": source}) as staged:
+        path = staged["train"]
+        assert (path / "part" / "a.txt").read_text() == "a"
+    with cache.stage({"train": source}) as staged:
+        assert staged["train"] == path
+    # the files of an input are walked once per process
+    assert len(keys) == 1
+    # another job sees the change and copies the input again
+    (source / "part" / "a.txt").write_text("ab")
+    with InputCache(tmp_path / "cache").stage({"train": source}) as staged:
+        assert staged["train"] != path
+        assert (staged["train"] / "part" / "a.txt").read_text() == "ab"
+
+
+@pytest.mark.skipif(inputs.fcntl is None, reason="no file locks on this platform")
+def test_evict_skips_inputs_in_use(tmp_path: Path, source: Path):
+    cache = InputCache(tmp_path / "cache", max_size=10**9)
+    other = InputCache(tmp_path / "cache", max_size=0)
+    with cache.stage({"train": source}) as staged:
+        assert other.evict() == 0
+        assert staged["train"].exists()
+    assert other.evict() == 1
+    assert not staged["train"].exists()
+    assert not [p for p in (tmp_path / "cache").iterdir() if p.suffix != ".lock"]
+
+
+def test_stage_resumes_after_cut_short_copy(tmp_path: Path, source: Path):
+    cache = InputCache(tmp_path / "cache", max_size=10**9)
+    key = get_input_key(source)
+    # copied, but without its metadata, e.g., the task was stopped
+    (tmp_path / "cache" / key).mkdir(parents=True)
+    with cache.stage({"train": source}) as staged:
+        assert (staged["train"] / "part" / "a.txt").read_text() == "a"
+    assert os.path.exists(tmp_path / "cache" / f"{key}.json")
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+from easysubmit.entities import Job
+from easysubmit.local import LocalCluster
+
+
+def _wait(job: Job, timeout: float = 30.0) -> str:
+    deadline = time.monotonic() + timeout
+    while job.get_status() in {"PENDING", "RUNNING"}:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    return job.get_status()
+
+
+def test_array_elements_get_their_index(tmp_path: Path):
+    cluster = LocalCluster(max_workers=2, output=str(tmp_path / "out-%A_%a.txt"))
+    code = "import os; print(os.environ['EASYSUBMIT_ARRAY_TASK_ID'])"
+    job = cluster.schedule([sys.executable, "-c", code], array="0-2")
+    assert _wait(job) == "COMPLETED"
+    outputs = sorted(path.read_text().strip() for path in tmp_path.glob("out-*"))
+    assert outputs == ["0", "1", "2"]
+
+
+def test_failed_dependency_cancels_dependents(tmp_path: Path):
+    cluster = LocalCluster(max_workers=2)
+    failed = cluster.schedule([sys.executable, "-c", "raise SystemExit(1)"])
+    marker = tmp_path / "ran"
+    dependent = cluster.schedule(
+        [sys.executable, "-c", f"open({str(marker)!r}, 'w')"],
+        dependency=f"afterok:{failed.id}",
+    )
+    assert _wait(failed) == "FAILED"
+    assert _wait(dependent) == "CANCELLED"
+    assert not marker.exists()
+
+
+def test_time_limit_stops_element():
+    cluster = LocalCluster(time="0:01")
+    job = cluster.schedule([sys.executable, "-c", "import time; time.sleep(30)"])
+    assert _wait(job) == "FAILED"
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+import subprocess
+import sys
+from collections.abc import Sequence
+
+import pytest
+
+from easysubmit.entities import Job, JobGroup
+from easysubmit.poller import JobPoller
+
+
+class ScriptedJob(Job):
+    # statuses of all jobs, advanced by one step per `get_statuses` call
+    steps: list[dict[str, str]] = []
+    calls: list[list[str]] = []
+
+    def get_status(self) -> str:
+        raise AssertionError("polled one by one")
+
+    @classmethod
+    def get_statuses(cls, jobs: Sequence[Job]) -> dict[str, str]:
+        cls.calls.append(sorted(job.id for job in jobs))
+        statuses = cls.steps[min(len(cls.calls), len(cls.steps)) - 1]
+        return {job.id: statuses[job.id] for job in jobs}
+
+
+@pytest.fixture
+def poller() -> JobPoller:
+    ScriptedJob.calls = []
+    return JobPoller(min_interval=0.01, max_interval=0.01)
+
+
+def test_jobs_are_polled_together(poller: JobPoller):
+    ScriptedJob.steps = [
+        {"1": "RUNNING", "2": "PENDING", "3": "PENDING"},
+        {"1": "COMPLETED", "2": "RUNNING", "3": "FAILED"},
+        {"1": "COMPLETED", "2": "COMPLETED", "3": "FAILED"},
+    ]
+    group = JobGroup([ScriptedJob("2"), ScriptedJob("3")])
+
+    async def main():
+        return await asyncio.gather(poller.wait(ScriptedJob("1")), poller.wait(group))
+
+    assert asyncio.run(main()) == ["COMPLETED", "FAILED"]
+    assert ScriptedJob.calls[0] == ["1", "2", "3"]
+    assert len(ScriptedJob.calls) == 3
+
+
+def test_as_completed_yields_finished_jobs_first(poller: JobPoller):
+    ScriptedJob.steps = [
+        {"1": "RUNNING", "2": "COMPLETED"},
+        {"1": "COMPLETED", "2": "COMPLETED"},
+    ]
+
+    async def main():
+        jobs = [ScriptedJob("1"), ScriptedJob("2")]
+        return [job.id async for job in poller.as_completed(jobs)]
+
+    assert asyncio.run(main()) == ["2", "1"]
+
+
+def test_wait_times_out(poller: JobPoller):
+    ScriptedJob.steps = [{"1": "RUNNING"}]
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(poller.wait(ScriptedJob("1"), timeout=0.05))
+
+
+def test_worker_does_not_import_asyncio():
+    # only waiting for jobs needs it, see `easysubmit.poller`
+    code = "import sys, easysubmit.worker; print('asyncio' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from easysubmit.helpers import get_percentile
+from easysubmit.profiler import (
+    format_hotspots,
+    get_profile_dir,
+    get_task_profiler,
+    merge_profiles,
+)
+
+
+def _busy(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+def test_percentile_is_nearest_rank():
+    values = [float(v) for v in range(1, 11)]
+    assert get_percentile(values, 50) == 5.0
+    assert get_percentile(values, 90) == 9.0
+    assert get_percentile(values, 99) == 10.0
+    assert get_percentile([3.0], 0) == 3.0
+
+
+def test_unknown_profiler():
+    with pytest.raises(ValueError, match="unknown profiler"):
+        get_task_profiler("perf", ["cpu"])
+
+
+@pytest.mark.parametrize("backend", ["cprofile", "sample"])
+def test_profiles_of_jobs_are_merged(tmp_path: Path, backend: str):
+    profile_dir = get_profile_dir(tmp_path, "run")
+    for job_id in ("1", "2"):
+        profiler = get_task_profiler(backend, ["cpu", "memory"])
+        with profiler.profile():
+            _busy(300_000)
+        profiler.save(profile_dir / f"{job_id}.json")
+    merged = merge_profiles(tmp_path, "run")
+    assert (merged["profiles"], merged["tasks"]) == (2, 2)
+    assert merged["functions"]
+    assert merged["memory"]["peak"] > 0
+    assert format_hotspots(merged).startswith("run run: 2 tasks, 2 profiles")
+
+
+def test_profiler_without_tasks_saves_nothing(tmp_path: Path):
+    path = tmp_path / "1.json"
+    get_task_profiler("cprofile", ["cpu"]).save(path)
+    assert not path.exists()
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import pytest
+
+from easysubmit import slurm
+from easysubmit.slurm import (
+    SLURMCluster,
+    SLURMConfig,
+    SLURMJob,
+    SLURMStatusService,
+    _split_array,
+    build_sbatch_script,
+)
+
+
+def test_split_array_keeps_arrays_that_fit():
+    assert _split_array([0, 3, 7], 10) == [(0, [0, 3, 7])]
+
+
+def test_split_array_rebases_chunks():
+    chunks = _split_array(range(25), 10)
+    assert [offset for offset, _ in chunks] == [0, 10, 20]
+    assert chunks[0][1] == list(range(10))
+    assert chunks[1][1] == list(range(10))
+    assert chunks[2][1] == list(range(5))
+    # offset + index gives back every original index exactly once
+    indices = [offset + index for offset, array in chunks for index in array]
+    assert indices == list(range(25))
+
+
+def test_split_array_sparse_indices():
+    chunks = _split_array([5, 1500, 1501, 2600], 1000)
+    assert chunks == [(0, [5]), (1500, [0, 1]), (2600, [0])]
+    for _, array in chunks:
+        assert all(index < 1000 for index in array)
+
+
+def test_array_task_id_adds_offset(monkeypatch: pytest.MonkeyPatch):
+    cluster = SLURMCluster(SLURMConfig())
+    monkeypatch.delenv("SLURM_ARRAY_TASK_ID", raising=False)
+    assert cluster.get_array_task_id() is None
+    monkeypatch.setenv("SLURM_ARRAY_TASK_ID", "3")
+    monkeypatch.delenv("EASYSUBMIT_ARRAY_OFFSET", raising=False)
+    assert cluster.get_array_task_id() == 3
+    monkeypatch.setenv("EASYSUBMIT_ARRAY_OFFSET", "1500")
+    assert cluster.get_array_task_id() == 1503
+
+
+def test_schedule_sizes_chunks_to_room(monkeypatch: pytest.MonkeyPatch):
+    cluster = SLURMCluster(
+        SLURMConfig(), max_array_size=10, max_submit_jobs=20, submit_interval=0
+    )
+    # jobs already queued when each submission is sized
+    queued = iter([5, 15, 15, 10, 0])
+    monkeypatch.setattr(slurm, "get_slurm_queued_job_count", lambda: next(queued))
+    submitted = []
+
+    def submit(args, format_hook, config, archive=None):
+        submitted.append(config)
+        return SLURMJob(str(len(submitted)), cluster.status)
+
+    monkeypatch.setattr(cluster, "_submit", submit)
+    cluster.schedule(["true"], array=list(range(25)), dependency="aftercorr:1")
+    # 15 free: a whole chunk of 10; 5 free: 5 of the next; 5 free again: the
+    # rest of it; 10 free: the last chunk
+    assert [(c.array_offset, c.array) for c in submitted] == [
+        (None, list(range(10))),
+        (10, list(range(5))),
+        (10, list(range(5, 10))),
+        (20, list(range(5))),
+    ]
+    indices = [(c.array_offset or 0) + index for c in submitted for index in c.array]
+    assert indices == list(range(25))
+    # chunks are numbered from 0, so aftercorr would pair the wrong elements
+    assert all(c.dependency == "afterok:1" for c in submitted)
+
+
+def test_deadline_from_submission_time_limit(monkeypatch: pytest.MonkeyPatch):
+    # the batch script of each resource profile exports its own time limit
+    script = build_sbatch_script(["true"], SLURMConfig(venv="/usr", time="0:30:00"))
+    assert "export EASYSUBMIT_TIME_LIMIT=0:30:00" in script.splitlines()
+    cluster = SLURMCluster(SLURMConfig(time="2:00:00"))
+    assert cluster.get_worker_args() == ["--cluster=slurm"]
+    monkeypatch.delenv("SLURM_JOB_END_TIME", raising=False)
+    monkeypatch.setenv("SLURM_JOB_START_TIME", "1000")
+    monkeypatch.setenv("EASYSUBMIT_TIME_LIMIT", "0:30:00")
+    assert cluster.get_deadline() == 1000 + 30 * 60
+    # jobs submitted before the variable existed
+    monkeypatch.delenv("EASYSUBMIT_TIME_LIMIT")
+    assert cluster.get_deadline() == 1000 + 2 * 60 * 60
+
+
+def test_preempted_jobs_pending_when_requeued(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        slurm, "_query_sacct", lambda job_ids: {"1": {"1": "PREEMPTED"}}
+    )
+    service = SLURMStatusService(ttl=0)
+    assert service.get_status("1") == "FAILED"
+    assert service.is_terminal("1")
+    # the job comes back, so it is queried again
+    service = SLURMStatusService(ttl=0, requeue=True)
+    assert service.get_status("1") == "PENDING"
+    assert not service.is_terminal("1")
+
+
+def test_script_exports_preemption_signal(monkeypatch: pytest.MonkeyPatch):
+    script = build_sbatch_script(["true"], SLURMConfig(venv="/usr"))
+    assert "EASYSUBMIT_PREEMPTION_SIGNAL" not in script
+    config = SLURMConfig(venv="/usr", signal="B:USR1@300", requeue=True)
+    script = build_sbatch_script(["true"], config)
+    assert "export EASYSUBMIT_PREEMPTION_SIGNAL=USR1" in script.splitlines()
+    cluster = SLURMCluster(config)
+    monkeypatch.delenv("SLURM_RESTART_COUNT", raising=False)
+    assert cluster.get_restart_count() == 0
+    monkeypatch.setenv("SLURM_RESTART_COUNT", "2")
+    assert cluster.get_restart_count() == 2
+
+
+def test_step_command_splits_node(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("SLURM_CPUS_ON_NODE", "8")
+    monkeypatch.setenv("SLURM_MEM_PER_NODE", "16000")
+    cluster = SLURMCluster(SLURMConfig())
+    command = cluster.get_step_command(["python", "-m", "worker", "--task=a"], 2)
+    assert command[: command.index("python")] == [
+        "srun",
+        "--exclusive",
+        "--nodes=1",
+        "--ntasks=1",
+        "--cpus-per-task=4",
+        "--mem=8000M",
+    ]
+    assert command[-1] == "--task=a"
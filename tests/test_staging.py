@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from easysubmit import slurm
+from easysubmit.slurm import SLURMCluster, SLURMConfig, SLURMJob, build_sbatch_script
+from easysubmit.staging import pack_venv
+
+
+def _make_venv(path: Path) -> Path:
+    site_packages = path / "lib" / "python3.11" / "site-packages"
+    site_packages.mkdir(parents=True)
+    (path / "bin").mkdir()
+    (path / "bin" / "python").write_text("")
+    (path / "pyvenv.cfg").write_text("home = /usr/bin\n")
+    (site_packages / "module.py").write_text("")
+    return path
+
+
+def test_pack_venv_needs_pyvenv_cfg(tmp_path: Path):
+    (tmp_path / "prefix" / "bin").mkdir(parents=True)
+    with pytest.raises(ValueError, match="pyvenv.cfg"):
+        pack_venv(tmp_path / "prefix", tmp_path / "stage")
+
+
+def test_pack_venv_again_only_after_changes(tmp_path: Path):
+    venv = _make_venv(tmp_path / "venv")
+    archive = pack_venv(venv, tmp_path / "stage")
+    assert archive.exists()
+    assert pack_venv(venv, tmp_path / "stage") == archive
+    # installing a package touches site-packages
+    site_packages = venv / "lib" / "python3.11" / "site-packages"
+    (site_packages / "package.py").write_text("")
+    stat = site_packages.stat()
+    os.utime(site_packages, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert pack_venv(venv, tmp_path / "stage") != archive
+
+
+def test_schedule_packs_venv_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    venv = _make_venv(tmp_path / "venv")
+    config = SLURMConfig(venv=str(venv), stage_venv=True, stage_dir=str(tmp_path))
+    cluster = SLURMCluster(config, max_array_size=2, max_submit_jobs=None)
+    packed = []
+
+    def pack(venv, stage_dir=None):
+        packed.append(venv)
+        return pack_venv(venv, stage_dir)
+
+    scripts = []
+
+    def submit(args, format_hook, config, archive=None):
+        scripts.append(build_sbatch_script(args, config, archive))
+        return SLURMJob(str(len(scripts)), cluster.status)
+
+    monkeypatch.setattr(slurm, "pack_venv", pack)
+    monkeypatch.setattr(cluster, "_submit", submit)
+    cluster.schedule(["python", "-m", "easysubmit.worker"], array=list(range(5)))
+    assert len(packed) == 1
+    assert len(scripts) == 3
+    (archive,) = tmp_path.glob("venv-*.tar.gz")
+    assert all(f'tar -xzf "{archive}"' in script for script in scripts)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from easysubmit.store import (
+    FileTaskStore,
+    SQLiteTaskStore,
+    TaskStore,
+    get_task_store,
+    migrate,
+)
+
+WORKER_COUNT = 8
+
+TASK_COUNT = 200
+
+
+def _get_store(kind: str, base_dir: Path) -> TaskStore:
+    if kind == "file":
+        return FileTaskStore(base_dir)
+    return SQLiteTaskStore(base_dir / "tasks.db")
+
+
+def _claim_all(store: TaskStore, fingerprints: list[str], job_id: str) -> list[str]:
+    # every worker tries every task, in its own order
+    fingerprints = list(fingerprints)
+    random.Random(job_id).shuffle(fingerprints)
+    return [fp for fp in fingerprints if store.claim(fp, job_id)]
+
+
+@pytest.mark.parametrize("kind", ["file", "sqlite"])
+def test_claim_is_unique_across_workers(tmp_path: Path, kind: str):
+    store = _get_store(kind, tmp_path)
+    fingerprints = [f"task{i:04d}" for i in range(TASK_COUNT)]
+    for fingerprint in fingerprints:
+        store.add_task(fingerprint, {"i": fingerprint})
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(WORKER_COUNT, mp_context=context) as executor:
+        futures = {
+            str(job_id): executor.submit(_claim_all, store, fingerprints, str(job_id))
+            for job_id in range(WORKER_COUNT)
+        }
+    claimed = {job_id: future.result() for job_id, future in futures.items()}
+    owners = [fp for fps in claimed.values() for fp in fps]
+    assert sorted(owners) == fingerprints
+    for job_id, fps in claimed.items():
+        for fingerprint in fps:
+            assert store.get_claim(fingerprint) == job_id
+
+
+@pytest.mark.parametrize("kind", ["file", "sqlite"])
+def test_release_allows_claim_again(tmp_path: Path, kind: str):
+    store = _get_store(kind, tmp_path)
+    store.add_task("a", {})
+    assert store.claim("a", "1")
+    assert not store.claim("a", "2")
+    store.release("a")
+    assert store.get_claim("a") is None
+    assert store.claim("a", "2")
+    assert store.get_claim("a") == "2"
+
+
+def _dump(store: TaskStore) -> dict:
+    # everything `migrate` copies
+    return {
+        "tasks": {
+            fp: (
+                store.get_task(fp),
+                store.get_claim(fp),
+                store.get_state(fp),
+                store.get_heartbeat(fp),
+            )
+            for fp in store.iter_tasks()
+        },
+        "manifests": {
+            run_id: store.get_manifest(run_id) for run_id in store.iter_manifests()
+        },
+        "values": {key: store.get_value(key) for key in store.iter_values()},
+    }
+
+
+def test_migrate_round_trip(tmp_path: Path):
+    for name in ("source", "sqlite", "target"):
+        (tmp_path / name).mkdir()
+    source = FileTaskStore(tmp_path / "source")
+    source.add_task("a", {"x": 1})
+    source.add_task("b", {"x": [2, 3]})
+    source.add_task("c", {"x": None})
+    source.claim("a", "123_4")
+    source.set_state("a", "completed")
+    source.claim("b", "123_5")
+    source.set_state("b", "running")
+    source.set_heartbeat("b", "123_5", {"step": 3}, 1000.0)
+    source.add_manifest("run1", {"tasks": ["a", "b", "c"], "worker_count": 2})
+    source.set_value("lost-tasks", {"b": {"attempts": 1}})
+
+    sqlite = SQLiteTaskStore(tmp_path / "sqlite" / "tasks.db")
+    assert migrate(source, sqlite) == 3
+    assert _dump(sqlite) == _dump(source)
+    target = FileTaskStore(tmp_path / "target")
+    assert migrate(sqlite, target) == 3
+    assert _dump(target) == _dump(source)
+    # tasks already in the target are left as they are
+    source.add_task("d", {})
+    assert migrate(source, sqlite) == 1
+    assert sqlite.get_state("a") == "completed"
+
+
+@pytest.mark.parametrize("kind", ["file", "sqlite"])
+def test_missing_task_raises_key_error(tmp_path: Path, kind: str):
+    store = _get_store(kind, tmp_path)
+    with pytest.raises(KeyError):
+        store.get_task("missing")
+
+
+def test_get_task_store_journal_mode(tmp_path: Path):
+    store = get_task_store(tmp_path, "sqlite")
+    assert isinstance(store, SQLiteTaskStore)
+    # the rollback journal works on network filesystems
+    assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    store = get_task_store(tmp_path / "wal", "sqlite:wal")
+    (tmp_path / "wal").mkdir()
+    assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with pytest.raises(ValueError):
+        get_task_store(tmp_path, "sqlite:nfs")
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from easysubmit.timing import (
+    SUBMIT_FILE,
+    TimingLog,
+    get_timing_dir,
+    read_timings,
+    summarize_timings,
+)
+
+
+def test_phases_are_written_as_jsonl(tmp_path: Path):
+    path = get_timing_dir(tmp_path, "run") / "7.jsonl"
+    with TimingLog(path) as timing:
+        with timing.phase("run", fingerprint="a"):
+            pass
+        with pytest.raises(KeyError), timing.phase("run", fingerprint="b"):
+            raise KeyError("b")
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(r["event"], r["fingerprint"], r["status"]) for r in records] == [
+        ("run", "a", "ok"),
+        ("run", "b", "KeyError"),
+    ]
+    assert all(r["duration"] >= 0 for r in records)
+
+
+def test_write_needs_open_log(tmp_path: Path):
+    with pytest.raises(RuntimeError, match="not open"):
+        TimingLog(tmp_path / "1.jsonl").write("start")
+
+
+def test_summary_of_worker_phases(tmp_path: Path):
+    timing_dir = get_timing_dir(tmp_path, "run")
+    with TimingLog(timing_dir / SUBMIT_FILE) as timing:
+        timing.write("submit", time=100.0, job_id="7")
+    with TimingLog(timing_dir / "7.jsonl") as timing:
+        timing.write("start", time=112.0, start_time=110.0, exec_time=111.0)
+        timing.write("run", duration=2.0, status="ok")
+        timing.write("run", duration=4.0, status="ValueError")
+        timing.write("worker", time=120.0, status="ok")
+    # a line cut off when the job was killed
+    with open(timing_dir / "7.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"event": "run", "dur')
+    assert len(read_timings(tmp_path, "run")) == 5
+    summary = summarize_timings(tmp_path)["run"]
+    phases = summary["phases"]
+    assert phases["queue"]["max"] == 10.0
+    assert phases["setup"]["max"] == 1.0
+    assert phases["import"]["max"] == 1.0
+    assert phases["run"]["count"] == 2
+    assert phases["run"]["sum"] == 6.0
+    assert phases["total"]["max"] == 10.0
+    assert summary["runs"] == {"ok": 1, "ValueError": 1}
+    assert summary["exits"] == {"ok": 1}
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from easysubmit.base import schedule
+from easysubmit.store import FileTaskStore
+from easysubmit.usage import collect_usage, get_usage, suggest_resources
+from tests.helpers import RecordingCluster, SizedConfig
+
+
+def _add_finished(store: FileTaskStore, count: int) -> RecordingCluster:
+    usage = {}
+    for i in range(count):
+        config = SizedConfig(index=i)
+        store.add_task(config.fingerprint, config.to_dict())
+        store.claim(config.fingerprint, str(i))
+        store.set_state(config.fingerprint, "completed")
+        usage[str(i)] = {
+            "state": "COMPLETED",
+            "elapsed": 600 + 60 * i,
+            "total_cpu": 60,
+            "max_rss": (i + 1) * 2**30,
+        }
+    return RecordingCluster(usage)
+
+
+def test_collect_usage_once_per_task(tmp_path: Path):
+    store = FileTaskStore(tmp_path)
+    cluster = _add_finished(store, 5)
+    assert collect_usage(cluster, store) == 5
+    assert collect_usage(cluster, store) == 0
+    records = get_usage(store, "SizedConfig")
+    assert {record["job_id"] for record in records.values()} == set(cluster.usage)
+
+
+def test_suggest_resources_from_percentile(tmp_path: Path):
+    store = FileTaskStore(tmp_path)
+    cluster = _add_finished(store, 5)
+    collect_usage(cluster, store)
+    # 95th percentile (the largest of 5) times the margin of 1.2
+    assert suggest_resources(store, "SizedConfig") == {
+        "mem": f"{6 * 1024}M",
+        "time": "00:17:00",
+    }
+    assert suggest_resources(store, "SizedConfig", min_samples=6) == {}
+
+
+def test_autosize_fills_in_undeclared_resources(tmp_path: Path):
+    store = FileTaskStore(tmp_path)
+    cluster = _add_finished(store, 5)
+    schedule(cluster, [SizedConfig(index=10)], tmp_path, autosize=True)
+    (submitted,) = cluster.submitted
+    # mem is declared by the task, time is not
+    assert submitted["mem"] == "1G"
+    assert submitted["time"] == "00:17:00"